@@ -0,0 +1,250 @@
+# --- CAMADA ANALÍTICA OPCIONAL (DUCKDB) SOBRE O SQLITE E O HISTÓRICO PARQUET ---
+# Um DuckDB em memória anexa o fiis_data.db (só leitura, extensão sqlite) e enxerga os arquivos
+# de historico_parquet/ como uma view, então uma consulta SQL cruza "todos os tickers x anos"
+# direto nos arquivos: varredura colunar multi-thread, filtros empurrados para partições e row
+# groups, e spill em disco (temp_directory) quando o resultado intermediário não cabe em memória.
+# Nada é carregado num DataFrame antes: só o resultado final vira pandas ou Arrow.
+# Sem a extensão sqlite (instalação offline), as tabelas do SQLite são copiadas uma vez para o
+# DuckDB na abertura do motor (cópia do momento; o Parquet continua sendo lido direto do disco).
+#
+# Views criadas no DuckDB:
+#   local.<tabela>  tabelas e views do SQLite (fiis, fiis_fatos, dividendos, cvm_*...)
+#   historico       arquivos Parquet (com as colunas de partição 'classe' e 'mes')
+#   snapshots       fii_snapshots com Ticker/Setor em texto e data_coleta como TIMESTAMP
+#   barras          fii_barras (histórico já compactado, ver compactacao.py) com Ticker em texto
+#   coletas         historico + snapshots + fechamento das barras (Ticker, data_coleta, valores, Setor, classe)
+#
+# Uso: python analise_duckdb.py sql "SELECT Setor, avg(DY_12M) FROM local.fiis GROUP BY 1"
+#      python analise_duckdb.py setores --coluna DY_12M --periodo month
+
+import argparse
+import glob
+import os
+from typing import Any, List, Optional, Sequence
+
+import pandas as pd
+
+from banco import DB_FILE, COLUNAS_VALORES, conexoes
+from historico_parquet import CLASSE_PADRAO, DIR_PARQUET
+from dividendos import TIPOS_FORA_DO_YIELD
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+LIMITE_MEMORIA = "1GB" # Acima disso o DuckDB despeja em DIR_TEMPORARIO em vez de estourar a memória
+DIR_TEMPORARIO = ".duckdb_tmp"
+PERIODOS = ('day', 'week', 'month', 'quarter', 'year') # Granularidades aceitas por date_trunc
+
+def duckdb_disponivel() -> bool:
+    return duckdb is not None
+
+def _literal(texto: str) -> str:
+    """Texto como literal SQL (ATTACH e read_parquet não aceitam parâmetro preparado no caminho)."""
+    return "'" + texto.replace("'", "''") + "'"
+
+def _validar(coluna: str, periodo: str):
+    if coluna not in COLUNAS_VALORES: raise ValueError(f"Coluna '{coluna}' inválida (use uma de {COLUNAS_VALORES}).")
+    if periodo not in PERIODOS: raise ValueError(f"Período '{periodo}' inválido (use um de {PERIODOS}).")
+
+class MotorAnalitico:
+    """DuckDB em memória com o SQLite anexado e o histórico Parquet como views; um por processo basta."""
+
+    def __init__(self, db_file: str = DB_FILE, diretorio_parquet: str = DIR_PARQUET, threads: Optional[int] = None,
+                 limite_memoria: str = LIMITE_MEMORIA, diretorio_temporario: str = DIR_TEMPORARIO):
+        if duckdb is None: raise RuntimeError("Instale o duckdb (pip install duckdb) para usar a camada analítica.")
+        self.db_file = db_file
+        self.diretorio_parquet = diretorio_parquet
+        self.conn = duckdb.connect(':memory:', config={
+            'threads': threads or os.cpu_count() or 1,
+            'memory_limit': limite_memoria,
+            'temp_directory': diretorio_temporario,
+        })
+        self.sqlite_direto = self._anexar_sqlite()
+        self.tem_parquet = self._criar_view_historico()
+        self._criar_views_coletas()
+
+    def _anexar_sqlite(self) -> bool:
+        """ATTACH só leitura pela extensão sqlite; sem ela, copia as tabelas (True = leitura direta do arquivo)."""
+        try:
+            self.conn.execute("INSTALL sqlite; LOAD sqlite")
+            self.conn.execute(f"ATTACH {_literal(self.db_file)} AS local (TYPE sqlite, READ_ONLY)")
+            return True
+        except duckdb.Error as e:
+            print(f"[DUCKDB] Extensão sqlite indisponível ({str(e).splitlines()[0]}); copiando as tabelas do SQLite.")
+        self.conn.execute("ATTACH ':memory:' AS local")
+        with conexoes(self.db_file).leitura() as sqlite_conn:
+            nomes = [n for (n,) in sqlite_conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'")]
+            for nome in nomes:
+                tabela = pd.read_sql(f'SELECT * FROM "{nome}"', sqlite_conn)
+                self.conn.register('_copia', tabela)
+                self.conn.execute(f'CREATE TABLE local."{nome}" AS SELECT * FROM _copia')
+                self.conn.unregister('_copia')
+        return False
+
+    def _criar_view_historico(self) -> bool:
+        if not glob.glob(os.path.join(self.diretorio_parquet, '**', '*.parquet'), recursive=True): return False
+        arquivos = _literal(os.path.join(self.diretorio_parquet, '**', '*.parquet'))
+        # Partições como texto, como em historico_parquet ('mes=2026-10' não vira data)
+        self.conn.execute(f"""
+        CREATE VIEW historico AS SELECT * FROM read_parquet({arquivos}, hive_partitioning = true,
+                                                           hive_types = {{'classe': VARCHAR, 'mes': VARCHAR}})
+        """)
+        return True
+
+    def _criar_views_coletas(self):
+        valores = ', '.join(COLUNAS_VALORES)
+        self.conn.execute(f"""
+        CREATE VIEW snapshots AS
+        SELECT t.Ticker, CAST(s.data_coleta AS TIMESTAMP) AS data_coleta, {', '.join(f's.{c}' for c in COLUNAS_VALORES)},
+               se.Setor, {_literal(CLASSE_PADRAO)} AS classe
+        FROM local.fii_snapshots s JOIN local.tickers t ON t.id = s.ticker_id LEFT JOIN local.setores se ON se.id = s.setor_id
+        """)
+        # Parquet e snapshots podem repetir a mesma coleta: as análises pegam o último valor por período, então não conta dobrado
+        parquet = f"SELECT Ticker, CAST(data_coleta AS TIMESTAMP) AS data_coleta, {valores}, Setor, classe FROM historico UNION ALL " if self.tem_parquet else ""
+        barras = ""
+        if self.conn.execute("SELECT 1 FROM duckdb_tables() WHERE database_name = 'local' AND table_name = 'fii_barras'").fetchone():
+            self.conn.execute("""
+            CREATE VIEW barras AS
+            SELECT t.Ticker, b.metrica, b.escala, CAST(b.periodo AS DATE) AS periodo, b.abertura, b.maxima, b.minima, b.fechamento, b.coletas
+            FROM local.fii_barras b JOIN local.tickers t ON t.id = b.ticker_id
+            """)
+            # Uma "coleta" por barra com os fechamentos, no último segundo do dia/semana (é o valor vigente no fim da barra)
+            fechamentos = ', '.join(f"max(fechamento) FILTER (WHERE metrica = '{c}') AS {c}" for c in COLUNAS_VALORES)
+            barras = f""" UNION ALL
+            SELECT Ticker, CAST(periodo AS TIMESTAMP) + CASE escala WHEN 'W' THEN INTERVAL 7 DAY ELSE INTERVAL 1 DAY END - INTERVAL 1 SECOND,
+                   {fechamentos}, NULL, {_literal(CLASSE_PADRAO)}
+            FROM barras GROUP BY Ticker, escala, periodo"""
+        self.conn.execute(f"CREATE VIEW coletas AS {parquet}SELECT Ticker, data_coleta, {valores}, Setor, classe FROM snapshots{barras}")
+
+    def _executar(self, sql: str, parametros: Optional[Sequence[Any]]):
+        # cursor() = conexão nova na mesma base: várias threads consultando sem dividir estado
+        return self.conn.cursor().execute(sql, parametros or [])
+
+    def consultar(self, sql: str, parametros: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+        """SQL livre (com '?' para parâmetros) -> DataFrame."""
+        return self._executar(sql, parametros).df()
+
+    def consultar_arrow(self, sql: str, parametros: Optional[Sequence[Any]] = None) -> "pa.Table":
+        """SQL livre -> pyarrow.Table (sem passar pelo pandas)."""
+        return self._executar(sql, parametros).fetch_arrow_table()
+
+    def _ultimos_por_periodo(self, coluna: str, periodo: str) -> str:
+        """
+        CTEs 'ultimos' (último valor de cada ticker em cada período, repetido nos períodos sem coleta,
+        já que snapshots só têm o que mudou) e 'setor_atual' (último Setor conhecido de cada ticker).
+        Parâmetros: classe, inicio, inicio, fim, fim.
+        """
+        return f"""
+        base AS (
+            SELECT Ticker, date_trunc('{periodo}', data_coleta) AS periodo, data_coleta, {coluna} AS valor, Setor
+            FROM coletas WHERE classe = ?
+              AND (CAST(? AS TIMESTAMP) IS NULL OR data_coleta >= CAST(? AS TIMESTAMP))
+              AND (CAST(? AS DATE) IS NULL OR data_coleta < CAST(? AS DATE) + INTERVAL 1 DAY) -- 'fim' inclusive (o dia todo)
+        ),
+        por_periodo AS (
+            SELECT Ticker, periodo, arg_max(valor, data_coleta) FILTER (WHERE valor IS NOT NULL) AS valor
+            FROM base GROUP BY ALL
+        ),
+        grade AS (
+            SELECT t.Ticker, p.periodo FROM (SELECT DISTINCT Ticker FROM base) t
+            CROSS JOIN (SELECT DISTINCT periodo FROM base) p
+        ),
+        ultimos AS (
+            SELECT g.Ticker, g.periodo,
+                   last_value(p.valor IGNORE NULLS) OVER (PARTITION BY g.Ticker ORDER BY g.periodo) AS valor
+            FROM grade g LEFT JOIN por_periodo p USING (Ticker, periodo)
+        ),
+        setor_atual AS (
+            SELECT Ticker, arg_max(Setor, data_coleta) FILTER (WHERE Setor IS NOT NULL) AS Setor FROM base GROUP BY Ticker
+        )"""
+
+    def medias_por_setor(self, coluna: str = 'DY_12M', periodo: str = 'month', inicio: Optional[str] = None,
+                         fim: Optional[str] = None, classe: str = CLASSE_PADRAO) -> pd.DataFrame:
+        """Média, mediana e nº de FIIs de 'coluna' por Setor em cada período (último valor de cada ticker no período)."""
+        _validar(coluna, periodo)
+        return self.consultar(f"""
+        WITH {self._ultimos_por_periodo(coluna, periodo)}
+        SELECT s.Setor, u.periodo, avg(u.valor) AS media, median(u.valor) AS mediana, count(u.valor) AS fiis
+        FROM ultimos u JOIN setor_atual s USING (Ticker)
+        WHERE u.valor IS NOT NULL AND s.Setor IS NOT NULL
+        GROUP BY ALL ORDER BY s.Setor, u.periodo
+        """, [classe, inicio, inicio, fim, fim])
+
+    def mudancas_ranking(self, coluna: str = 'DY_12M', periodo: str = 'month', inicio: Optional[str] = None,
+                         fim: Optional[str] = None, classe: str = CLASSE_PADRAO, crescente: bool = False) -> pd.DataFrame:
+        """
+        Posição de cada ticker no ranking de 'coluna' em cada período e quantas posições subiu desde
+        o período anterior ('subiu' > 0 = melhorou). Maior valor = 1º, ou o menor com 'crescente'.
+        """
+        _validar(coluna, periodo)
+        ordem = 'ASC' if crescente else 'DESC'
+        return self.consultar(f"""
+        WITH {self._ultimos_por_periodo(coluna, periodo)},
+        posicoes AS (
+            SELECT Ticker, periodo, valor, rank() OVER (PARTITION BY periodo ORDER BY valor {ordem}) AS posicao
+            FROM ultimos WHERE valor IS NOT NULL
+        )
+        SELECT Ticker, periodo, valor, posicao,
+               lag(posicao) OVER (PARTITION BY Ticker ORDER BY periodo) AS posicao_anterior,
+               posicao_anterior - posicao AS subiu
+        FROM posicoes ORDER BY periodo, posicao
+        """, [classe, inicio, inicio, fim, fim])
+
+    def yields_moveis(self, meses: int = 12, inicio: Optional[str] = None, fim: Optional[str] = None,
+                      classe: str = CLASSE_PADRAO) -> pd.DataFrame:
+        """
+        Yield móvel de 'meses' de cada ticker mês a mês: proventos com data com na janela (sem
+        amortização, tabela 'dividendos') sobre o último preço do mês no histórico de coletas.
+        """
+        fora = ', '.join(_literal(t) for t in TIPOS_FORA_DO_YIELD)
+        return self.consultar(f"""
+        WITH {self._ultimos_por_periodo('Preco_Atual', 'month')},
+        proventos AS (
+            SELECT Ticker, date_trunc('month', CAST(data_com AS DATE)) AS periodo, sum(valor) AS valor
+            FROM local.dividendos WHERE upper(tipo) NOT IN ({fora}) GROUP BY ALL
+        )
+        SELECT u.Ticker, u.periodo, u.valor AS preco, coalesce(sum(p.valor), 0) AS proventos,
+               100 * coalesce(sum(p.valor), 0) / u.valor AS yield_percent
+        FROM ultimos u
+        LEFT JOIN proventos p ON p.Ticker = u.Ticker AND p.periodo <= u.periodo
+                             AND p.periodo > u.periodo - INTERVAL {int(meses)} MONTH
+        WHERE u.valor > 0
+        GROUP BY u.Ticker, u.periodo, u.valor
+        ORDER BY u.Ticker, u.periodo
+        """, [classe, inicio, inicio, fim, fim])
+
+    def fechar(self):
+        self.conn.close()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Análises SQL (DuckDB) sobre o SQLite e o histórico Parquet.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=DIR_PARQUET)
+    parser.add_argument("--threads", type=int, default=None)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_sql = sub.add_parser("sql", help="Executa uma consulta livre")
+    p_sql.add_argument("consulta")
+    for nome, ajuda in (("setores", "Médias por setor ao longo do tempo"), ("ranking", "Mudanças de posição no ranking")):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument("--coluna", default="DY_12M", choices=COLUNAS_VALORES)
+        p.add_argument("--periodo", default="month", choices=PERIODOS)
+        p.add_argument("--inicio"); p.add_argument("--fim")
+    p_yield = sub.add_parser("yields", help="Yield móvel mês a mês")
+    p_yield.add_argument("--meses", type=int, default=12)
+    p_yield.add_argument("--inicio"); p_yield.add_argument("--fim")
+    args = parser.parse_args(argv)
+
+    if duckdb is None: raise SystemExit("Instale o duckdb (pip install duckdb).")
+    motor = MotorAnalitico(args.db, args.dir, threads=args.threads)
+    if args.comando == "sql": resultado = motor.consultar(args.consulta)
+    elif args.comando == "setores": resultado = motor.medias_por_setor(args.coluna, args.periodo, args.inicio, args.fim)
+    elif args.comando == "ranking": resultado = motor.mudancas_ranking(args.coluna, args.periodo, args.inicio, args.fim)
+    else: resultado = motor.yields_moveis(args.meses, args.inicio, args.fim)
+    print(resultado.to_string(index=False))
+    motor.fechar()
+
+if __name__ == "__main__":
+    main()
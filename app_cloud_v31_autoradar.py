@@ -9,67 +9,120 @@ import sqlite3
 import os
 import math
 import time
-import re
 from typing import List, Dict, Tuple, Any # Para type hints
+from brapi_cliente import COLUNAS_LINHA_FII, COLUNAS_COTACAO, REGEX_FII_VALIDO, buscar_lista_fundos, extrair_cotacoes_lista, buscar_lotes_quote, montar_linha_fii, montar_linhas_fiis, LatenciaRolante, HedgeLotes
+from micro_lote import MicroLoteBrapi
+from prefetch import PrefetcherPicos, registrar_acesso
+from provedores import SaudeProvedores, criar_provedor, buscar_em_paralelo, buscar_por_fonte
+from banco import DB_FILE, GerenciadorConexoes, conexoes, inicializar_db, ler_fiis, salvar_dados_fiis, salvar_precos_rapido
+from dividendos import extrair_dividendos_brapi, salvar_dividendos, atualizar_janelas, ler_yields_locais
+from importador_cvm import ler_vp_por_cota, calcular_pvp_local, ler_indicadores_trimestrais
+from reconciliacao import reconciliar, salvar_consolidado, ler_fontes_consolidadas
+from historico_parquet import gravar_coleta, parquet_disponivel
+from compactacao import compactar
 
 st.set_page_config(layout="wide", page_title="FII AutoRadar")
 
-# --- PARTE 1: API DIRETA E BANCO DE DADOS ---
-DB_FILE = "fiis_data.db"
+# --- PARTE 1: API DIRETA E BANCO DE DADOS (escrita em banco.py) ---
 TAMANHO_DO_LOTE = 10
-BRAPI_BASE_URL = "https://brapi.dev/api"
+PRECOS_TTL_HORAS = 4 # Preço/volume/variação: modo rápido (1 requisição em /quote/list)
+FUNDAMENTOS_TTL_HORAS = 24 # DY, Mín 52s e P/VP: lotes /quote completos
+MICRO_LOTE_JANELA_S = 0.2 # Janela para juntar pedidos de FIIs individuais em um lote /quote
+PREFETCH_ANTECEDENCIA_MIN = 10 # Minutos antes de um pico de acessos para atualizar os dados
+PROVEDORES_RECONCILIACAO = ("fundamentus",) # Fontes do universo inteiro reconciliadas campo a campo com a Brapi e a CVM
+PROVEDORES_PVP = ("statusinvest",) # Completam (por ticker) o P/VP que continuar vazio depois da reconciliação
+TIMEOUT_PROVEDORES_S = 30
+HEDGE_ATIVO = True # Duplica o lote que passar do p95 de latência (corta a cauda lenta)
+HEDGE_MAX_EXTRAS = 5 # Máximo de requisições extras (cópias) por atualização
+DIVIDENDOS_NA_COLETA = True # Pede o histórico de proventos nos mesmos lotes /quote (DY local por janela)
+HISTORICO_PARQUET = True # Cada atualização (completa ou de preços) também vira um arquivo Parquet (historico_parquet.py)
+COMPACTAR_HISTORICO = True # Depois da atualização completa em segundo plano: intradiário -> diário -> semanal (compactacao.py)
+
+# Conexões do SQLite (WAL): 1 de escrita + pool só-leitura, abertas uma vez e compartilhadas por todas as sessões
+@st.cache_resource(show_spinner=False)
+def get_conexoes() -> GerenciadorConexoes:
+    inicializar_db(DB_FILE) # Migrações criam todas as tabelas lidas pela página (os leitores são só-leitura)
+    return conexoes(DB_FILE)
+
+# Latências dos lotes ficam guardadas entre atualizações (o p95 já vale desde o 1º lote)
+@st.cache_resource(show_spinner=False)
+def get_latencias_brapi() -> LatenciaRolante:
+    return LatenciaRolante(tamanho=50, minimo_amostras=5)
 
 # Cache para a lista de FIIs
 @st.cache_data(ttl=3600 * 4) # Cache por 4 horas
 def get_fii_tickers(api_key: str) -> List[Tuple[str, str]]:
     """Busca e retorna a lista limpa de tickers e setores de FIIs da API Brapi."""
-    headers = {'Authorization': f'Bearer {api_key}'}
-    list_url = f"{BRAPI_BASE_URL}/quote/list?type=fund&limit=1000&token={api_key}"
     try:
-        response_list = requests.get(list_url, headers=headers, timeout=30)
-        response_list.raise_for_status()
-        fii_list_data = response_list.json()
-        if 'stocks' not in fii_list_data: return []
-
-        regex_fii_valid = re.compile(r"^[A-Z]{4}11$")
-        valid_fiis = [(item.get('stock'), item.get('sector', "Desconhecido"))
-                      for item in fii_list_data['stocks']
-                      if isinstance(item.get('stock'), str) and regex_fii_valid.match(item.get('stock'))]
+        itens_lista = buscar_lista_fundos(api_key)
+        valid_fiis = [(item.get('stock'), item.get('sector', "Desconhecido")) for item in itens_lista]
         print(f"[V31 Cache Miss] Lista de {len(valid_fiis)} FIIs obtida da API.")
         return valid_fiis
     except requests.exceptions.RequestException as req_err: st.error(f"Erro (Lista FIIs): {req_err}"); return []
     except Exception as e: st.error(f"Erro (Lista FIIs): {e}"); return []
 
-def inicializar_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    # V31: Schema com dados brutos para o Score V3 + P/VP (se disponível)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS fiis (
-        Ticker TEXT PRIMARY KEY,
-        DY_12M REAL,              -- Dividend Yield (principal * 100)
-        Liquidez_Diaria REAL,     -- regularMarketVolume
-        Preco_Atual REAL,         -- regularMarketPrice
-        Min_52_Semanas REAL,      -- fiftyTwoWeekLow
-        Var_Dia_Percent REAL,     -- regularMarketChangePercent
-        P_VP REAL,                -- priceToBook (do módulo, pode ser NULL)
-        Setor TEXT,
-        data_coleta TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    # Adiciona colunas se não existirem (para migração de DBs antigos)
-    cols = ['DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP', 'Setor']
-    existing_cols = [info[1] for info in cursor.execute(f"PRAGMA table_info(fiis)").fetchall()]
-    for col in cols:
-        if col not in existing_cols:
-            try: cursor.execute(f"ALTER TABLE fiis ADD COLUMN {col} REAL")
-            except: pass # Ignora erro se coluna já existir ou tipo diferente
-    if 'Setor' not in existing_cols: # Setor é TEXT
-         try: cursor.execute(f"ALTER TABLE fiis ADD COLUMN Setor TEXT")
-         except: pass
-
-    conn.commit()
-    conn.close()
+# Latência e falhas de cada provedor ficam guardadas entre atualizações
+@st.cache_resource(show_spinner=False)
+def get_saude_provedores() -> SaudeProvedores:
+    return SaudeProvedores()
+
+def salvar_proventos(resultados_api: List[Dict]):
+    """Grava os proventos que vieram nos lotes e recalcula as janelas só dos FIIs com eventos novos."""
+    if not DIVIDENDOS_NA_COLETA: return
+    try:
+        alterados = salvar_dividendos(extrair_dividendos_brapi(resultados_api))
+        recalculados = atualizar_janelas(alterados)
+        print(f"[V31] Proventos: {len(alterados)} FIIs com eventos novos, {recalculados} janelas recalculadas.")
+    except Exception as e: print(f"[AVISO V31] Falha ao gravar proventos: {e}")
+
+def gravar_historico_colunar(linhas: pd.DataFrame):
+    """Cópia colunar da coleta para as análises de histórico (falha aqui não derruba a atualização)."""
+    if not HISTORICO_PARQUET or not parquet_disponivel(): return
+    try: gravar_coleta(linhas)
+    except Exception as e: print(f"[AVISO V31] Falha ao gravar o histórico Parquet: {e}")
+
+def compactar_historico():
+    """Retenção do histórico (SQLite e Parquet); incremental, então só custa os dias novos. Falha aqui não derruba a atualização."""
+    if not COMPACTAR_HISTORICO: return
+    try:
+        resultado = compactar()
+        print(f"[V31] Compactação: {resultado['barras_diarias']} barras diárias, {resultado['barras_semanais']} semanais, "
+              f"{resultado['particoes_parquet']} partições Parquet.")
+    except Exception as e: print(f"[AVISO V31] Falha ao compactar o histórico: {e}")
+
+def consolidar_fontes(dados_para_db: List[Tuple]) -> List[Tuple]:
+    """
+    Reconcilia P/VP, DY e preço da Brapi com a CVM (P/VP local) e os PROVEDORES_RECONCILIACAO,
+    grava 'fiis_consolidado' (valor + fonte vencedora + divergências) e devolve as tuplas com o P/VP reconciliado.
+    """
+    if not dados_para_db: return dados_para_db
+    try:
+        brapi = pd.DataFrame(dados_para_db, columns=COLUNAS_LINHA_FII)
+        with get_conexoes().leitura() as conn: pvp_cvm = calcular_pvp_local(brapi, ler_vp_por_cota(conn))
+        fontes = {'brapi': brapi.set_index('Ticker')[['P_VP', 'DY_12M', 'Preco_Atual']],
+                  'cvm': pd.DataFrame({'P_VP': pvp_cvm.to_numpy()}, index=brapi['Ticker'])}
+        provedores = [criar_provedor(nome) for nome in PROVEDORES_RECONCILIACAO]
+        fontes.update(buscar_por_fonte(provedores, brapi['Ticker'].tolist(), TIMEOUT_PROVEDORES_S, get_saude_provedores()))
+        agora = pd.Timestamp.now()
+        consolidado = reconciliar(fontes, coletado_em={nome: agora for nome in fontes if nome != 'cvm'})
+        salvar_consolidado(consolidado)
+    except Exception as e: print(f"[AVISO V31] Falha na reconciliação: {e}"); return dados_para_db
+    divergentes = consolidado['Campos_Divergentes'].notna().sum()
+    print(f"[V31] Reconciliação: P/VP por fonte {consolidado['P_VP_fonte'].value_counts().to_dict()}, {divergentes} FIIs com divergência.")
+    pvp = consolidado['P_VP'].dropna().to_dict()
+    return [linha[:6] + (pvp.get(linha[0], linha[6]),) + linha[7:] for linha in dados_para_db]
+
+def completar_pvp(dados_para_db: List[Tuple]) -> List[Tuple]:
+    """Preenche o P/VP (posição 6 da tupla) que veio NULL da Brapi usando os PROVEDORES_PVP."""
+    sem_pvp = [linha[0] for linha in dados_para_db if linha[6] is None]
+    if not sem_pvp or not PROVEDORES_PVP: return dados_para_db
+    try:
+        provedores = [criar_provedor(nome) for nome in PROVEDORES_PVP]
+        pvp_df, fontes = buscar_em_paralelo(provedores, sem_pvp, ['P_VP'], TIMEOUT_PROVEDORES_S, get_saude_provedores())
+    except Exception as e: print(f"[AVISO V31] Falha ao completar P/VP: {e}"); return dados_para_db
+    pvp_validos = pvp_df['P_VP'][pvp_df['P_VP'] > 0].to_dict()
+    print(f"[V31] P/VP completado para {len(pvp_validos)} de {len(sem_pvp)} FIIs ({fontes['P_VP'].value_counts().to_dict()}).")
+    return [linha[:6] + (pvp_validos.get(linha[0], linha[6]),) + linha[7:] for linha in dados_para_db]
 
 # --- FUNÇÃO ATUALIZAR_DADOS (V31 - DADOS PARA SCORE V3) ---
 def atualizar_dados_fiis() -> bool:
@@ -79,7 +132,6 @@ def atualizar_dados_fiis() -> bool:
 
     try:
         api_key = st.secrets["BRAPI_API_KEY"]
-        headers = {'Authorization': f'Bearer {api_key}'}
 
         # 1. Pega a lista de FIIs (Ticker, Setor)
         lista_fiis_com_setor = get_fii_tickers(api_key)
@@ -89,83 +141,32 @@ def atualizar_dados_fiis() -> bool:
         setor_map = {ticker: setor for ticker, setor in lista_fiis_com_setor}
 
         status_placeholder.info(f"Lista de {len(fii_tickers)} FIIs válidos recebida. Fatiando em lotes...")
-        lotes_de_fiis = [fii_tickers[i:i + TAMANHO_DO_LOTE] for i in range(0, len(fii_tickers), TAMANHO_DO_LOTE)]
 
-        todos_os_resultados_api: List[Dict] = []
         progress_bar = st.progress(0)
-        erros_lote = 0
+        hedge = HedgeLotes(get_latencias_brapi(), max_extras=HEDGE_MAX_EXTRAS) if HEDGE_ATIVO else None
 
-        # 2. Busca dados em lotes (com módulo defaultKeyStatistics)
-        for i, lote in enumerate(lotes_de_fiis):
-            lote_bem_sucedido = False
-            try:
-                lote_limpo = [str(t).strip() for t in lote if isinstance(t, str)]
-                if not lote_limpo: continue
-
-                tickers_param = ",".join(lote_limpo)
-                quote_url = f"{BRAPI_BASE_URL}/quote/{tickers_param}?modules=defaultKeyStatistics&token={api_key}"
-
-                response_quote = requests.get(quote_url, headers=headers, timeout=45)
-                response_quote.raise_for_status()
-                quote_data = response_quote.json()
-
-                if 'results' in quote_data and quote_data['results']:
-                    todos_os_resultados_api.extend(quote_data['results'])
-                    lote_bem_sucedido = True
-                else: erros_lote += 1; print(f"[ERRO V31] Lote {i+1}: 'results' vazio.")
-
-            except requests.exceptions.HTTPError as http_err:
-                erros_lote += 1; status_code = http_err.response.status_code if http_err.response else 'N/A'
-                print(f"[AVISO V31] Lote {i+1} erro HTTP {status_code}: {lote_limpo}. Erro: {http_err}")
-            except Exception as e_lote:
-                erros_lote += 1; print(f"[ERRO V31] Falha genérica lote {i+1}: {lote_limpo}. Erro: {e_lote}")
-
-            percentual = (i + 1) / len(lotes_de_fiis)
-            status_texto = f"Buscando Lote {i+1}/{len(lotes_de_fiis)}..."
+        def ao_progredir(lote_atual: int, total_lotes: int, lote_bem_sucedido: bool):
+            status_texto = f"Buscando Lote {lote_atual}/{total_lotes}..."
             if not lote_bem_sucedido: status_texto += " [ERRO]"
-            progress_bar.progress(percentual, text=status_texto)
-            time.sleep(0.1)
+            progress_bar.progress(lote_atual / total_lotes, text=status_texto)
+
+        # 2. Busca dados em lotes (com módulo defaultKeyStatistics)
+        todos_os_resultados_api, erros_lote = buscar_lotes_quote(api_key, fii_tickers, TAMANHO_DO_LOTE, hedge=hedge, ao_progredir=ao_progredir,
+                                                                 dividendos=DIVIDENDOS_NA_COLETA)
 
         progress_bar.empty()
+        if hedge:
+            hedge.encerrar()
+            if hedge.extras_disparados: print(f"[HEDGE V31] {hedge.extras_disparados} cópias disparadas, {hedge.extras_vencedores} venceram o original.")
         status_placeholder.info(f"Lotes processados ({erros_lote} falharam). Formatando {len(todos_os_resultados_api)} resultados...")
 
         # --- PARTE 3: PROCESSAMENTO (V31 - DADOS PARA SCORE V3) ---
         if not todos_os_resultados_api:
              st.error("Nenhum dado foi coletado com sucesso."); print("[ERRO V31] Lista 'todos_os_resultados_api' vazia."); return False
 
-        for fii_result in todos_os_resultados_api:
-            ticker = fii_result.get('symbol')
-            if not ticker: continue # Pula se não tiver ticker
-
-            # Dados Principais (Confiáveis)
-            dy_decimal = fii_result.get('dividendYield')
-            liquidez = fii_result.get('regularMarketVolume')
-            preco = fii_result.get('regularMarketPrice')
-            min_52w = fii_result.get('fiftyTwoWeekLow')
-            var_dia = fii_result.get('regularMarketChangePercent')
-            setor = setor_map.get(ticker, "Desconhecido")
-
-            # Dados do Módulo (Menos Confiáveis para P/VP)
-            pvp = None # Começa como None
-            stats_module = fii_result.get('defaultKeyStatistics')
-            if isinstance(stats_module, dict):
-                pvp_raw = stats_module.get('priceToBook')
-                if pvp_raw is not None and isinstance(pvp_raw, (int, float)) and pvp_raw > 0:
-                    pvp = float(pvp_raw) # Só guarda se for válido
-
-            # Validação Mínima: Precisa ter ticker, preço, liquidez e mín 52 semanas
-            if ticker and preco and liquidez is not None and min_52w is not None and var_dia is not None:
-                dy = (float(dy_decimal) * 100) if dy_decimal is not None and isinstance(dy_decimal, (int, float)) else 0.0
-                liq_val = float(liquidez)
-                preco_val = float(preco)
-                min_52w_val = float(min_52w)
-                var_dia_val = float(var_dia) # Já vem em percentual? A API sugere que sim.
-
-                # Adiciona mesmo que P/VP seja None
-                dados_para_db.append((ticker, dy, liq_val, preco_val, min_52w_val, var_dia_val, pvp, setor))
-
-            else:
-                 print(f"[AVISO V31] FII {ticker}: Dados essenciais (preço, liq, min52w, varDia) ausentes. Descartado.")
+        dados_para_db = montar_linhas_fiis(todos_os_resultados_api, setor_map)
+        status_placeholder.info("Reconciliando P/VP, DY e preço entre as fontes...")
+        dados_para_db = completar_pvp(consolidar_fontes(dados_para_db))
 
     except requests.exceptions.RequestException as req_err: st.error(f"Erro CRÍTICO (Conexão): {req_err}"); print(f"Erro CRÍTICO V31 (Conexão): {req_err}"); return False
     except Exception as e: st.error(f"Erro CRÍTICO (Coleta): {e}"); print(f"Erro CRÍTICO V31: {e}"); return False
@@ -176,35 +177,128 @@ def atualizar_dados_fiis() -> bool:
         st.error("Dados foram coletados, mas nenhum FII continha os dados mínimos necessários após o processamento."); print("[ERRO V31] Lista 'dados_para_db' vazia."); return False
 
     # 4. Salva no Banco de Dados
-    conn = sqlite3.connect(DB_FILE); cursor = conn.cursor()
-    cursor.executemany("""
-    REPLACE INTO fiis (Ticker, DY_12M, Liquidez_Diaria, Preco_Atual, Min_52_Semanas, Var_Dia_Percent, P_VP, Setor, data_coleta)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-    """, dados_para_db)
-    conn.commit(); conn.close()
+    salvar_dados_fiis(dados_para_db)
+    salvar_proventos(todos_os_resultados_api)
+    gravar_historico_colunar(pd.DataFrame(dados_para_db, columns=COLUNAS_LINHA_FII))
 
     st.success(f"Busca finalizada! {len(dados_para_db)} FIIs com dados válidos foram atualizados.")
     return True
 
+# --- MODO RÁPIDO: PREÇO, VOLUME E VARIAÇÃO DE TODOS OS FIIs EM 1 REQUISIÇÃO ---
+def atualizar_precos_rapido() -> bool:
+    """Atualiza só Preco_Atual, Liquidez_Diaria e Var_Dia_Percent a partir de /quote/list (sem lotes)."""
+    try:
+        api_key = st.secrets["BRAPI_API_KEY"]
+        itens_lista = buscar_lista_fundos(api_key) # Sem cache: queremos o preço de agora
+    except requests.exceptions.RequestException as req_err: st.error(f"Erro (Modo Rápido): {req_err}"); return False
+    except Exception as e: st.error(f"Erro (Modo Rápido): {e}"); return False
+
+    cotacoes = extrair_cotacoes_lista(itens_lista)
+    if not cotacoes:
+        st.error("A lista da API não trouxe preços válidos."); print("[ERRO V31 Rápido] Nenhuma cotação válida em /quote/list."); return False
+
+    atualizados = salvar_precos_rapido(cotacoes)
+    gravar_historico_colunar(pd.DataFrame(cotacoes, columns=COLUNAS_COTACAO))
+    print(f"[V31 Rápido] {len(cotacoes)} cotações recebidas, {atualizados} FIIs atualizados.")
+    st.success(f"Preços atualizados (1 requisição)! {atualizados} FIIs.")
+    return atualizados > 0
+
+# --- MICRO-LOTES: PEDIDOS DE 1 FII (DE TODAS AS SESSÕES) VIRAM 1 CHAMADA /quote ---
+@st.cache_resource(show_spinner=False)
+def get_micro_lote() -> MicroLoteBrapi:
+    return MicroLoteBrapi(st.secrets["BRAPI_API_KEY"], tamanho_lote=TAMANHO_DO_LOTE, janela_segundos=MICRO_LOTE_JANELA_S)
+
+def atualizar_fii_individual(ticker: str) -> bool:
+    """Atualiza um único FII sob demanda, passando pelo micro-lote compartilhado."""
+    ticker = ticker.strip().upper()
+    if not REGEX_FII_VALIDO.match(ticker): st.warning(f"Ticker inválido: {ticker}"); return False
+    try: fii_result = get_micro_lote().solicitar(ticker)
+    except requests.exceptions.RequestException as req_err: st.error(f"Erro ({ticker}): {req_err}"); return False
+    except Exception as e: st.error(f"Erro ({ticker}): {e}"); return False
+    if not fii_result: st.warning(f"{ticker} não foi encontrado na API."); return False
+
+    with get_conexoes().leitura() as conn: setor_row = conn.execute("SELECT Setor FROM fiis WHERE Ticker = ?", (ticker,)).fetchone()
+    linha = montar_linha_fii(fii_result, setor_row[0] if setor_row and setor_row[0] else "Desconhecido")
+    if not linha: st.warning(f"{ticker}: dados essenciais ausentes na API."); return False
+    salvar_dados_fiis([linha])
+    st.success(f"{ticker} atualizado.")
+    return True
+
+# --- PREFETCH: ATUALIZAÇÃO EM SEGUNDO PLANO ANTES DOS PICOS DE ACESSO ---
+def atualizar_em_segundo_plano(api_key: str) -> bool:
+    """
+    Versão sem interface da atualização (roda na thread do prefetch). Se os fundamentos vão
+    expirar antes do fim do pico, faz a atualização completa; senão, só o modo rápido de preços.
+    """
+    itens_lista = buscar_lista_fundos(api_key) # Os dois modos começam pela lista (1 requisição)
+    setor_map = {item['stock']: item.get('sector', "Desconhecido") for item in itens_lista}
+    # Idade dos fundamentos só do universo atual: FII deslistado fica em 'fiis_fatos' com a coleta
+    # antiga para sempre e, no MIN da tabela toda, forçaria a atualização completa em todo pico
+    with get_conexoes().leitura() as conn:
+        ultima_coleta = conn.execute(f"SELECT MIN(data_coleta) FROM fiis WHERE Ticker IN ({', '.join('?' * len(setor_map))})",
+                                     list(setor_map)).fetchone()[0] if setor_map else None
+    # data_coleta é CURRENT_TIMESTAMP (UTC, sem fuso): compara com o agora em UTC
+    fim_do_pico = pd.Timestamp.now(tz='UTC').tz_localize(None) + pd.Timedelta(minutes=PREFETCH_ANTECEDENCIA_MIN + 60)
+    completa = ultima_coleta is None or (fim_do_pico - pd.to_datetime(ultima_coleta) > pd.Timedelta(hours=FUNDAMENTOS_TTL_HORAS))
+
+    if not completa:
+        cotacoes = extrair_cotacoes_lista(itens_lista)
+        atualizados = salvar_precos_rapido(cotacoes)
+        gravar_historico_colunar(pd.DataFrame(cotacoes, columns=COLUNAS_COTACAO))
+        print(f"[PREFETCH V31] Modo rápido: {atualizados} FIIs com preço novo.")
+        return atualizados > 0
+
+    hedge = HedgeLotes(get_latencias_brapi(), max_extras=HEDGE_MAX_EXTRAS) if HEDGE_ATIVO else None
+    resultados, erros_lote = buscar_lotes_quote(api_key, list(setor_map), TAMANHO_DO_LOTE, hedge=hedge,
+                                                dividendos=DIVIDENDOS_NA_COLETA)
+    if hedge: hedge.encerrar()
+    dados_para_db = completar_pvp(consolidar_fontes(montar_linhas_fiis(resultados, setor_map)))
+    if not dados_para_db: print("[PREFETCH V31] Nenhum FII válido coletado."); return False
+    salvar_dados_fiis(dados_para_db)
+    salvar_proventos(resultados)
+    gravar_historico_colunar(pd.DataFrame(dados_para_db, columns=COLUNAS_LINHA_FII))
+    print(f"[PREFETCH V31] Atualização completa: {len(dados_para_db)} FIIs ({erros_lote} lotes falharam).")
+    compactar_historico()
+    return True
+
+def aquecer_caches():
+    """Recarrega DB e Score nos caches, para o pico ser servido sem nenhum cálculo."""
+    carregar_dados_do_db.clear(); carregar_dados_com_score.clear()
+    carregar_dados_com_score()
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher() -> PrefetcherPicos:
+    api_key = st.secrets["BRAPI_API_KEY"]
+    return PrefetcherPicos(DB_FILE, lambda: atualizar_em_segundo_plano(api_key), aquecer_caches,
+                           antecedencia_minutos=PREFETCH_ANTECEDENCIA_MIN).iniciar()
+
 # --- PARTE 2: APP WEB (SCORE V3 E NOVOS FILTROS) ---
 
 @st.cache_data
 def carregar_dados_do_db() -> pd.DataFrame:
     if not os.path.exists(DB_FILE): return pd.DataFrame()
-    conn = sqlite3.connect(DB_FILE);
     try:
-        # V31: Lemos todas as colunas novas
-        df = pd.read_sql_query("SELECT * FROM fiis", conn)
-        # Conversão de tipos e tratamento de nulos
-        num_cols = ['DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP']
-        for col in num_cols:
-             df[col] = pd.to_numeric(df[col], errors='coerce')
-        # Mantemos apenas linhas com os dados essenciais para o Score V3
-        essentials = ['Ticker', 'DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent']
-        df.dropna(subset=essentials, inplace=True)
+        with get_conexoes().leitura() as conn: # Só-leitura (WAL): não espera a atualização que estiver gravando
+            # V31: Lemos todas as colunas novas (Ticker e Setor categóricos, direto dos ids das dimensões)
+            df = ler_fiis(conn)
+            tipo_ticker = df['Ticker'].dtype
+            # Conversão de tipos e tratamento de nulos
+            num_cols = ['DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP']
+            for col in num_cols:
+                 df[col] = pd.to_numeric(df[col], errors='coerce')
+            # P/VP NULL: calcula com o VP por cota do informe mensal da CVM (importador_cvm.py)
+            df['P_VP'] = df['P_VP'].fillna(calcular_pvp_local(df, ler_vp_por_cota(conn)))
+            # Vacância, nº de imóveis e concentração de inquilinos do informe trimestral (tabela já consolidada)
+            df = df.join(ler_indicadores_trimestrais(conn), on='Ticker')
+            # DY de 1/3/6/12/24 meses calculado dos proventos gravados (dividendos.py)
+            df = df.join(ler_yields_locais(conn, df))
+            # Fonte vencedora do P/VP e campos em que as fontes discordaram (reconciliacao.py)
+            df = df.join(ler_fontes_consolidadas(conn), on='Ticker')
+            df['Ticker'] = df['Ticker'].astype(tipo_ticker) # join(on=...) devolve a chave como texto
+            # Mantemos apenas linhas com os dados essenciais para o Score V3
+            essentials = ['Ticker', 'DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent']
+            df.dropna(subset=essentials, inplace=True)
     except (pd.io.sql.DatabaseError, sqlite3.Error, Exception) as db_err: st.error(f"Erro DB: {db_err}"); df = pd.DataFrame()
-    finally:
-        if conn: conn.close()
     return df
 
 # V31: Score Pro V3 (DY x Liq x DistMin x VarDia)
@@ -254,37 +348,68 @@ def calcular_score_pro(df: pd.DataFrame) -> pd.DataFrame:
     df_final['Score Pro'] = df_final['Score Pro'].fillna(0).astype(int)
     return df_final
 
+# Score calculado fica em cache junto com os dados (o prefetch já deixa ele pronto)
+@st.cache_data
+def carregar_dados_com_score() -> pd.DataFrame:
+    return calcular_score_pro(carregar_dados_do_db())
+
 # --- Interface Streamlit ---
 st.title("🛰️ FII AutoRadar (Cloud V31)")
 st.subheader("Detectando oportunidades com base em DY, Liquidez, Preço e Variação")
 
-inicializar_db()
+get_conexoes() # Abre as conexões e garante o schema (uma vez por processo)
+if 'acesso_registrado' not in st.session_state: # Conta 1 acesso por sessão (base do prefetch)
+    registrar_acesso(DB_FILE); st.session_state['acesso_registrado'] = True
+get_prefetcher()
 df_base = carregar_dados_do_db() # Usa cache
 data_atualizacao = None
+data_precos = None
 dados_expirados = True
+precos_expirados = True
 
 if not df_base.empty:
-    try: data_atualizacao = pd.to_datetime(df_base['data_coleta'].iloc[0]); st.caption(f"Dados (cache) de: {data_atualizacao.strftime('%d/%m/%Y às %H:%M:%S')}")
+    try:
+        # Com micro-lotes cada FII tem a sua data_coleta: vale a mais antiga (é ela que expira primeiro)
+        data_atualizacao = pd.to_datetime(df_base['data_coleta']).min()
+        data_precos = pd.to_datetime(df_base['data_precos'].max()) if df_base['data_precos'].notna().any() else data_atualizacao
+        st.caption(f"Dados (cache), coleta mais antiga: {data_atualizacao.strftime('%d/%m/%Y às %H:%M:%S')} · "
+                   f"Preços mais recentes: {data_precos.strftime('%d/%m/%Y às %H:%M:%S')}")
     except: df_base = pd.DataFrame()
-if data_atualizacao: dados_expirados = (pd.Timestamp.now() - data_atualizacao > pd.Timedelta(hours=4)) # Cache de 4h
+if data_atualizacao:
+    dados_expirados = (pd.Timestamp.now() - data_atualizacao > pd.Timedelta(hours=FUNDAMENTOS_TTL_HORAS))
+    precos_expirados = (pd.Timestamp.now() - data_precos > pd.Timedelta(hours=PRECOS_TTL_HORAS))
 else: dados_expirados = True
 
 st.sidebar.header("Controles"); update_button_pressed = st.sidebar.button("Forçar Atualização Agora (API Rápida)")
+precos_button_pressed = st.sidebar.button("Atualizar Só Preços (1 requisição)")
 atualizacao_bem_sucedida = False
 if update_button_pressed:
     with st.spinner("Atualizando dados via API..."): atualizacao_bem_sucedida = atualizar_dados_fiis()
     if atualizacao_bem_sucedida: st.cache_data.clear(); df_base = carregar_dados_do_db(); st.rerun()
+elif precos_button_pressed and not df_base.empty:
+    with st.spinner("Atualizando preços via /quote/list..."): atualizacao_bem_sucedida = atualizar_precos_rapido()
+    if atualizacao_bem_sucedida: carregar_dados_do_db.clear(); carregar_dados_com_score.clear(); st.rerun()
 elif dados_expirados or df_base.empty:
     if df_base.empty: st.info("Cache local vazio. Buscando na API...")
     else: st.info("Cache expirado. Buscando na API...")
     with st.spinner("Atualizando dados via API..."): atualizacao_bem_sucedida = atualizar_dados_fiis()
     if atualizacao_bem_sucedida: st.cache_data.clear(); df_base = carregar_dados_do_db(); st.rerun()
     elif not df_base.empty: st.warning("Falha na atualização. Exibindo dados antigos.")
+elif precos_expirados:
+    st.info("Preços expirados. Atualizando pelo modo rápido...")
+    with st.spinner("Atualizando preços via /quote/list..."): atualizacao_bem_sucedida = atualizar_precos_rapido()
+    if atualizacao_bem_sucedida: carregar_dados_do_db.clear(); carregar_dados_com_score.clear(); st.rerun()
+    else: st.warning("Falha na atualização de preços. Exibindo dados antigos.")
 else: st.write("Dados carregados do cache local.")
 
+ticker_individual = st.sidebar.text_input("Atualizar um FII (ex: MXRF11):")
+if st.sidebar.button("Atualizar FII") and ticker_individual:
+    with st.spinner(f"Atualizando {ticker_individual.upper()}..."):
+        if atualizar_fii_individual(ticker_individual): carregar_dados_do_db.clear(); carregar_dados_com_score.clear(); st.rerun()
+
 if df_base.empty: st.error("Não há dados disponíveis."); st.stop()
 
-df_com_score = calcular_score_pro(df_base)
+df_com_score = carregar_dados_com_score() # Usa cache
 
 # --- Filtros V31 ---
 st.sidebar.header("Filtros")
@@ -334,5 +459,5 @@ st.dataframe(
     .hide(axis="index"),
     use_container_width=True
 )
-st.caption("*P/VP é mostrado quando disponível na API, mas não entra no cálculo do Score Pro.")
+st.caption("*P/VP reconciliado entre Brapi, CVM (VP por cota do informe mensal) e Fundamentus, completado pelo StatusInvest; não entra no cálculo do Score Pro.")
 with st.expander("Ver todos os dados brutos (antes do filtro)"): st.dataframe(df_com_score.sort_values(by='Score Pro', ascending=False), use_container_width=True)
\ No newline at end of file
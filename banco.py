@@ -0,0 +1,589 @@
+# --- BANCO DE DADOS (SQLITE) COMPARTILHADO ---
+# Schema e escrita da tabela 'fiis', usados pelo app e pelos processos sem interface
+# (prefetch, workers de ingestão).
+# 'fiis' é a tabela "última foto" (uma linha por ticker, é o que a página lê). Todo valor que
+# muda nela vira uma linha nova em 'fii_snapshots' (append-only, chave (Ticker, data_coleta),
+# clusterizada por ser WITHOUT ROWID), gravada por trigger: só as linhas que mudaram custam
+# escrita no histórico. O valor de um ticker num instante é o último snapshot até ele.
+# Instantes em UTC com milissegundos (schema v9, AGORA_MS); duas mudanças do mesmo ticker no mesmo
+# milissegundo viram dois snapshots (o segundo 1 ms depois), nenhuma sobrescreve a outra.
+# Conexões: o banco roda em WAL e cada processo tem um GerenciadorConexoes por arquivo, com uma
+# única conexão de escrita (serializada por lock) e um pool de conexões só-leitura. Em WAL quem
+# lê enxerga o último commit sem esperar a escrita em andamento, e ninguém paga o connect por rerun.
+# Layout normalizado (schema v3): 'tickers' e 'setores' são dimensões com id inteiro e os fatos
+# ('fiis_fatos', 'fii_snapshots') são tabelas STRICT chaveadas por esses ids. 'fiis' continua
+# existindo como view (Ticker e Setor em texto) para consultas avulsas; o app lê com ler_fiis(),
+# que devolve Ticker e Setor como colunas categóricas montadas direto dos ids.
+# Schema versionado por PRAGMA user_version: MIGRACOES é a lista ordenada de passos, aplicados
+# uma vez por processo (inicializar_db), cada um atômico junto com o número da versão.
+# Retenção (compactacao.py): snapshots com mais de alguns dias viram barras diárias em 'fii_barras'
+# (abertura/máxima/mínima/fechamento por métrica) e as diárias antigas viram semanais.
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+DB_FILE = "fiis_data.db"
+COLUNAS_FIIS = {'DY_12M': 'REAL', 'Liquidez_Diaria': 'REAL', 'Preco_Atual': 'REAL', 'Min_52_Semanas': 'REAL',
+                'Var_Dia_Percent': 'REAL', 'P_VP': 'REAL', 'Setor': 'TEXT', 'data_precos': 'TIMESTAMP'}
+COLUNAS_VALORES = ('DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP')
+COLUNAS_SNAPSHOT = ('DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP', 'Setor')
+# Instante UTC com milissegundos (data_coleta/data_precos e chave de fii_snapshots). Com segundos, duas
+# mudanças do mesmo FII no mesmo segundo (modo rápido + micro-lote) caíam na mesma chave de snapshot
+# e a segunda sobrescrevia a primeira
+AGORA_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+LEITORES_POR_BANCO = 4 # Conexões só-leitura no pool (leituras simultâneas sem esperar)
+PRAGMAS_CONEXAO = {
+    'synchronous': 'NORMAL',          # Em WAL, seguro contra corrupção; só o último commit pode se perder numa queda de energia
+    'mmap_size': 256 * 1024 * 1024,   # Leituras direto do page cache do SO, sem cópia
+    'cache_size': -32 * 1024,         # 32 MB de cache de páginas por conexão (negativo = KiB)
+    'temp_store': 'MEMORY',           # Ordenações e tabelas temporárias em memória
+    'busy_timeout': 10000,            # Espera (ms) por outro processo escrevendo, em vez de falhar na hora
+}
+
+class GerenciadorConexoes:
+    """Uma conexão de escrita + pool de conexões só-leitura para o mesmo arquivo, todas em WAL."""
+
+    def __init__(self, db_file: str = DB_FILE, leitores: int = LEITORES_POR_BANCO):
+        self.db_file = db_file
+        self.leitores = leitores
+        self._escritor: Optional[sqlite3.Connection] = None
+        self._lock_escrita = threading.RLock()
+        self._profundidade = 0 # escrita() dentro de escrita(): só o bloco de fora faz commit
+        self._livres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._abertas: List[sqlite3.Connection] = []
+        self._lock_pool = threading.Lock()
+
+    @staticmethod
+    def _configurar(conn: sqlite3.Connection) -> sqlite3.Connection:
+        for pragma, valor in PRAGMAS_CONEXAO.items(): conn.execute(f"PRAGMA {pragma} = {valor}")
+        return conn
+
+    @contextmanager
+    def escrita(self) -> Iterator[sqlite3.Connection]:
+        """A conexão de escrita, exclusiva durante o bloco; commit no fim (rollback se der erro)."""
+        with self._lock_escrita:
+            if self._escritor is None:
+                self._escritor = self._configurar(sqlite3.connect(self.db_file, check_same_thread=False))
+                self._escritor.execute("PRAGMA journal_mode = WAL") # Persiste no arquivo: vale para todo processo
+            self._profundidade += 1
+            try: yield self._escritor
+            except BaseException:
+                if self._profundidade == 1: self._escritor.rollback()
+                raise
+            else:
+                if self._profundidade == 1: self._escritor.commit()
+            finally: self._profundidade -= 1
+
+    def _novo_leitor(self) -> Optional[sqlite3.Connection]:
+        with self._lock_pool:
+            if len(self._abertas) >= self.leitores: return None
+            uri = f"file:{quote(os.path.abspath(self.db_file))}?mode=ro"
+            conn = self._configurar(sqlite3.connect(uri, uri=True, check_same_thread=False))
+            self._abertas.append(conn)
+            return conn
+
+    @contextmanager
+    def leitura(self) -> Iterator[sqlite3.Connection]:
+        """Uma conexão só-leitura do pool (abre sob demanda; com todas ocupadas, espera uma voltar)."""
+        try: conn = self._livres.get_nowait()
+        except queue.Empty: conn = self._novo_leitor() or self._livres.get()
+        try: yield conn
+        finally: self._livres.put(conn)
+
+    def fechar(self):
+        with self._lock_escrita:
+            if self._escritor is not None: self._escritor.close(); self._escritor = None
+        with self._lock_pool:
+            for conn in self._abertas: conn.close()
+            self._abertas.clear()
+            self._livres = queue.LifoQueue()
+
+_GERENCIADORES: Dict[str, GerenciadorConexoes] = {}
+_LOCK_GERENCIADORES = threading.Lock()
+
+def conexoes(db_file: str = DB_FILE) -> GerenciadorConexoes:
+    """O gerenciador compartilhado deste processo para 'db_file'."""
+    chave = os.path.abspath(db_file)
+    with _LOCK_GERENCIADORES:
+        if chave not in _GERENCIADORES:
+            _GERENCIADORES[chave] = GerenciadorConexoes(db_file)
+            atexit.register(_GERENCIADORES[chave].fechar)
+        return _GERENCIADORES[chave]
+
+def _v1_tabela_fiis(conn: sqlite3.Connection):
+    # V31: Schema com dados brutos para o Score V3 + P/VP (se disponível)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fiis (
+        Ticker TEXT PRIMARY KEY,
+        DY_12M REAL,              -- Dividend Yield (principal * 100)
+        Liquidez_Diaria REAL,     -- regularMarketVolume
+        Preco_Atual REAL,         -- regularMarketPrice
+        Min_52_Semanas REAL,      -- fiftyTwoWeekLow
+        Var_Dia_Percent REAL,     -- regularMarketChangePercent
+        P_VP REAL,                -- priceToBook (do módulo, pode ser NULL)
+        Setor TEXT,
+        data_coleta TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- Última atualização completa (lotes /quote)
+        data_precos TIMESTAMP     -- Última atualização de preço/volume/variação (pode ser só o modo rápido)
+    )
+    """)
+    # DBs das versões antigas (v8 a v30) têm só parte das colunas
+    existentes = {info[1] for info in conn.execute("PRAGMA table_info(fiis)")}
+    for coluna, tipo in COLUNAS_FIIS.items():
+        if coluna not in existentes: conn.execute(f"ALTER TABLE fiis ADD COLUMN {coluna} {tipo}")
+
+def _v2_snapshots(conn: sqlite3.Connection):
+    """Histórico append-only + triggers que gravam nele quando uma linha de 'fiis' muda."""
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS fii_snapshots (
+        Ticker TEXT NOT NULL,
+        data_coleta TIMESTAMP NOT NULL, -- Quando o valor foi coletado (data_precos da linha em 'fiis')
+        {', '.join(f'{c} {"TEXT" if c == "Setor" else "REAL"}' for c in COLUNAS_SNAPSHOT)},
+        PRIMARY KEY (Ticker, data_coleta)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_data_coleta ON fii_snapshots (data_coleta)")
+    colunas = ', '.join(COLUNAS_SNAPSHOT)
+    novos = ', '.join(f'NEW.{c}' for c in COLUNAS_SNAPSHOT)
+    instante = "COALESCE(NEW.data_precos, NEW.data_coleta, CURRENT_TIMESTAMP)"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS fiis_snapshot_insert AFTER INSERT ON fiis BEGIN
+        INSERT OR REPLACE INTO fii_snapshots (Ticker, data_coleta, {colunas}) VALUES (NEW.Ticker, {instante}, {novos});
+    END
+    """)
+    # Só dispara se algum valor mudou de fato (UPDATE que só renova as datas não gera snapshot)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS fiis_snapshot_update AFTER UPDATE ON fiis
+    WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in COLUNAS_SNAPSHOT)} BEGIN
+        INSERT OR REPLACE INTO fii_snapshots (Ticker, data_coleta, {colunas}) VALUES (NEW.Ticker, {instante}, {novos});
+    END
+    """)
+    # DB que já existia: a foto atual vira o primeiro snapshot de cada ticker
+    conn.execute(f"""
+    INSERT OR IGNORE INTO fii_snapshots (Ticker, data_coleta, {colunas})
+    SELECT Ticker, COALESCE(data_precos, data_coleta, CURRENT_TIMESTAMP), {colunas} FROM fiis
+    WHERE NOT EXISTS (SELECT 1 FROM fii_snapshots s WHERE s.Ticker = fiis.Ticker)
+    """)
+
+def _v3_dimensoes(conn: sqlite3.Connection):
+    """Dimensões 'tickers' e 'setores' (id inteiro); fatos e snapshots viram STRICT chaveados por id; 'fiis' vira view."""
+    def reais(alias: str) -> str: # Colunas antigas sem tipo estrito podem guardar texto: vira NULL, não erro
+        return ', '.join(f"CASE WHEN typeof({alias}.{c}) IN ('integer', 'real') THEN {alias}.{c} END" for c in COLUNAS_VALORES)
+    valores = ', '.join(COLUNAS_VALORES)
+    tipos = ', '.join(f'{c} REAL' for c in COLUNAS_VALORES)
+
+    conn.execute("DROP TRIGGER IF EXISTS fiis_snapshot_insert"); conn.execute("DROP TRIGGER IF EXISTS fiis_snapshot_update")
+    conn.execute("CREATE TABLE tickers (id INTEGER PRIMARY KEY, Ticker TEXT NOT NULL UNIQUE) STRICT")
+    conn.execute("CREATE TABLE setores (id INTEGER PRIMARY KEY, Setor TEXT NOT NULL UNIQUE) STRICT")
+    conn.execute("""
+    INSERT INTO tickers (Ticker)
+    SELECT CAST(Ticker AS TEXT) FROM fiis WHERE Ticker IS NOT NULL UNION SELECT Ticker FROM fii_snapshots
+    """)
+    conn.execute("""
+    INSERT INTO setores (Setor)
+    SELECT CAST(Setor AS TEXT) FROM fiis WHERE Setor IS NOT NULL UNION SELECT CAST(Setor AS TEXT) FROM fii_snapshots WHERE Setor IS NOT NULL
+    """)
+
+    # Fatos: INTEGER PRIMARY KEY = rowid, a linha fica clusterizada pelo id do ticker
+    conn.execute(f"""
+    CREATE TABLE fiis_fatos (
+        ticker_id INTEGER PRIMARY KEY REFERENCES tickers (id),
+        {tipos},
+        setor_id INTEGER REFERENCES setores (id),
+        data_coleta TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        data_precos TEXT
+    ) STRICT
+    """)
+    conn.execute(f"""
+    INSERT INTO fiis_fatos (ticker_id, {valores}, setor_id, data_coleta, data_precos)
+    SELECT t.id, {reais('f')}, s.id, COALESCE(CAST(f.data_coleta AS TEXT), CURRENT_TIMESTAMP), CAST(f.data_precos AS TEXT)
+    FROM fiis f JOIN tickers t ON t.Ticker = CAST(f.Ticker AS TEXT) LEFT JOIN setores s ON s.Setor = CAST(f.Setor AS TEXT)
+    """)
+
+    conn.execute("ALTER TABLE fii_snapshots RENAME TO fii_snapshots_v2")
+    conn.execute(f"""
+    CREATE TABLE fii_snapshots (
+        ticker_id INTEGER NOT NULL REFERENCES tickers (id),
+        data_coleta TEXT NOT NULL,
+        {tipos},
+        setor_id INTEGER REFERENCES setores (id),
+        PRIMARY KEY (ticker_id, data_coleta)
+    ) STRICT, WITHOUT ROWID
+    """)
+    conn.execute(f"""
+    INSERT INTO fii_snapshots (ticker_id, data_coleta, {valores}, setor_id)
+    SELECT t.id, CAST(v.data_coleta AS TEXT), {reais('v')}, s.id
+    FROM fii_snapshots_v2 v JOIN tickers t ON t.Ticker = v.Ticker LEFT JOIN setores s ON s.Setor = CAST(v.Setor AS TEXT)
+    """)
+    conn.execute("DROP TABLE fii_snapshots_v2") # Leva junto o índice antigo de data_coleta
+    conn.execute("CREATE INDEX idx_snapshots_data_coleta ON fii_snapshots (data_coleta)")
+
+    conn.execute("DROP TABLE fiis")
+    conn.execute(f"""
+    CREATE VIEW fiis AS
+    SELECT t.Ticker, {', '.join(f'f.{c}' for c in COLUNAS_VALORES)}, s.Setor, f.data_coleta, f.data_precos
+    FROM fiis_fatos f JOIN tickers t ON t.id = f.ticker_id LEFT JOIN setores s ON s.id = f.setor_id
+    """)
+
+    # UPSERT (e não INSERT OR REPLACE): dentro de trigger, o OR REPLACE é trocado pela política do
+    # comando de fora, e o UPSERT de salvar_dados_fiis abortaria com 2 mudanças no mesmo segundo
+    grava_snapshot = f"""
+        INSERT INTO fii_snapshots (ticker_id, data_coleta, {valores}, setor_id)
+        VALUES (NEW.ticker_id, COALESCE(NEW.data_precos, NEW.data_coleta, CURRENT_TIMESTAMP),
+                {', '.join(f'NEW.{c}' for c in COLUNAS_VALORES)}, NEW.setor_id)
+        ON CONFLICT (ticker_id, data_coleta) DO UPDATE SET
+            {', '.join(f'{c} = excluded.{c}' for c in (*COLUNAS_VALORES, 'setor_id'))};"""
+    conn.execute(f"CREATE TRIGGER fiis_snapshot_insert AFTER INSERT ON fiis_fatos BEGIN {grava_snapshot} END")
+    conn.execute(f"""
+    CREATE TRIGGER fiis_snapshot_update AFTER UPDATE ON fiis_fatos
+    WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in (*COLUNAS_VALORES, 'setor_id'))} BEGIN {grava_snapshot} END
+    """)
+
+def _v4_barras(conn: sqlite3.Connection):
+    """Barras diárias/semanais (formato longo, uma métrica por linha) e a marca até onde cada escala já foi compactada."""
+    conn.execute("""
+    CREATE TABLE fii_barras (
+        ticker_id INTEGER NOT NULL REFERENCES tickers (id),
+        metrica TEXT NOT NULL,         -- Uma das COLUNAS_VALORES
+        escala TEXT NOT NULL CHECK (escala IN ('D', 'W')),
+        periodo TEXT NOT NULL,         -- Dia (YYYY-MM-DD) ou segunda-feira da semana
+        abertura REAL, maxima REAL, minima REAL, fechamento REAL,
+        coletas INTEGER NOT NULL,      -- Snapshots que entraram na barra
+        PRIMARY KEY (ticker_id, metrica, escala, periodo)
+    ) STRICT, WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE compactacao (
+        escala TEXT PRIMARY KEY,       -- 'D': snapshots -> barras diárias; 'W': barras diárias -> semanais
+        ate TEXT NOT NULL              -- Dias anteriores a este já estão compactados
+    ) STRICT, WITHOUT ROWID
+    """)
+
+def _v5_acessos(conn: sqlite3.Connection):
+    """Contador de acessos por hora do prefetch (IF NOT EXISTS: versões antigas criavam a tabela no primeiro acesso)."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS acessos_por_hora (
+        data TEXT,                -- YYYY-MM-DD (horário local do servidor)
+        hora INTEGER,             -- 0 a 23
+        contagem INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (data, hora)
+    ) WITHOUT ROWID
+    """)
+
+def _v6_tabelas_auxiliares(conn: sqlite3.Connection):
+    """
+    Tabelas que cada módulo criava por conta própria a cada chamada: CVM (importador_cvm),
+    proventos (dividendos) e histórico diário (historico_store). IF NOT EXISTS: bancos antigos já as têm.
+    """
+    # Dados abertos da CVM: informe mensal (VP por cota) e trimestral (imóveis, inquilinos)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cvm_informe_mensal (
+        CNPJ TEXT NOT NULL,
+        data_referencia TEXT NOT NULL, -- YYYY-MM-DD
+        Ticker TEXT,                   -- Derivado do ISIN (NULL se o fundo não informou)
+        patrimonio_liquido REAL,
+        cotas_emitidas REAL,
+        VP_Cota REAL,
+        PRIMARY KEY (CNPJ, data_referencia)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cvm_mensal_ticker ON cvm_informe_mensal (Ticker, data_referencia)")
+    # Informe trimestral: quais (fundo, trimestre) já entraram, e em qual versão
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cvm_trim_carregados (
+        CNPJ TEXT NOT NULL,
+        data_referencia TEXT NOT NULL,
+        versao INTEGER,
+        PRIMARY KEY (CNPJ, data_referencia)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cvm_trim_imoveis (
+        CNPJ TEXT NOT NULL,
+        data_referencia TEXT NOT NULL,
+        seq INTEGER NOT NULL,      -- Ordem do imóvel dentro do informe
+        nome_imovel TEXT,
+        classe TEXT,
+        area REAL,
+        vacancia REAL,             -- Percentual_Vacancia, como informado à CVM
+        inadimplencia REAL,
+        pct_receitas_fii REAL,
+        PRIMARY KEY (CNPJ, data_referencia, seq)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cvm_trim_inquilinos (
+        CNPJ TEXT NOT NULL,
+        data_referencia TEXT NOT NULL,
+        setor TEXT NOT NULL,       -- Setor de atuação dos inquilinos (a CVM não identifica o inquilino)
+        pct_receitas_fii REAL,     -- Soma da participação do setor nas receitas do fundo
+        PRIMARY KEY (CNPJ, data_referencia, setor)
+    ) WITHOUT ROWID
+    """)
+    # Última foto por ticker, reconstruída a cada importação (o app só faz um JOIN nela)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cvm_trim_ultimo (
+        Ticker TEXT PRIMARY KEY,
+        CNPJ TEXT,
+        data_referencia TEXT,
+        Vacancia_CVM REAL,            -- Média da vacância dos imóveis ponderada pela área
+        Qtd_Imoveis_CVM INTEGER,
+        Concentracao_Inquilinos REAL  -- Participação do maior setor de inquilinos nas receitas
+    ) WITHOUT ROWID
+    """)
+    # Proventos por evento e somas por janela (1/3/6/12/24 meses, dividendos.JANELAS_MESES)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS dividendos (
+        Ticker TEXT NOT NULL,
+        data_com TEXT NOT NULL,        -- Último dia com direito (YYYY-MM-DD)
+        tipo TEXT NOT NULL DEFAULT 'RENDIMENTO',
+        data_pagamento TEXT,
+        valor REAL NOT NULL,           -- R$ por cota
+        fonte TEXT,
+        PRIMARY KEY (Ticker, data_com, tipo)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dividendos_data_com ON dividendos (data_com)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS dividendos_janelas (
+        Ticker TEXT PRIMARY KEY,
+        data_ref TEXT NOT NULL,        -- Dia em que as somas foram calculadas
+        Div_1M REAL, Div_3M REAL, Div_6M REAL, Div_12M REAL, Div_24M REAL
+    ) WITHOUT ROWID
+    """)
+    # Histórico diário de preços (COTAHIST, yfinance)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS historico_diario (
+        Ticker TEXT NOT NULL,
+        data TEXT NOT NULL,       -- YYYY-MM-DD
+        abertura REAL,
+        maxima REAL,
+        minima REAL,
+        fechamento REAL,
+        volume REAL,              -- Volume financeiro (R$)
+        negocios INTEGER,
+        fonte TEXT,               -- cotahist | yfinance | ...
+        PRIMARY KEY (Ticker, data)
+    ) WITHOUT ROWID
+    """)
+    # Até onde cada fonte já baixou cada ticker (permite retomar backfills interrompidos)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS historico_manifesto (
+        Ticker TEXT NOT NULL,
+        fonte TEXT NOT NULL,
+        ultima_data TEXT,         -- Última barra gravada (YYYY-MM-DD)
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (Ticker, fonte)
+    ) WITHOUT ROWID
+    """)
+
+def _v7_consolidado(conn: sqlite3.Connection):
+    """
+    Resultado da reconciliação entre fontes (reconciliacao.py), com tipos fixos por coluna. Versões
+    antigas recriavam a tabela a cada atualização deduzindo os tipos do DataFrame (e declaravam
+    texto como REAL): ela sai e volta vazia, a próxima atualização completa preenche de novo.
+    """
+    conn.execute("DROP TABLE IF EXISTS fiis_consolidado")
+    # Um trio (valor, fonte vencedora, maior desvio relativo) por campo de reconciliacao.REGRAS_PADRAO
+    campos = ", ".join(f"{c} REAL, {c}_fonte TEXT, {c}_divergencia REAL" for c in ('P_VP', 'DY_12M', 'Preco_Atual'))
+    conn.execute(f"""
+    CREATE TABLE fiis_consolidado (
+        Ticker TEXT PRIMARY KEY,
+        {campos},
+        Campos_Divergentes TEXT,       -- Campos acima da tolerância, separados por vírgula
+        data_reconciliacao TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) STRICT, WITHOUT ROWID
+    """)
+
+def _v8_ingestao(conn: sqlite3.Connection):
+    """Rodadas, shards e workers da ingestão distribuída (ingestao_distribuida.py; antes criadas pelo Coordenador)."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingestao_rodadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        criada_em REAL NOT NULL,
+        concluida_em REAL              -- NULL enquanto houver shard pendente ou em andamento
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingestao_shards (
+        rodada INTEGER NOT NULL,
+        shard INTEGER NOT NULL,
+        tickers TEXT NOT NULL,          -- JSON: {ticker: setor}
+        status TEXT NOT NULL DEFAULT 'pendente', -- pendente | em_andamento | concluido | falhou
+        worker TEXT,
+        lease_ate REAL,
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        linhas INTEGER,
+        PRIMARY KEY (rodada, shard)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ingestao_shards_status ON ingestao_shards (status, lease_ate)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingestao_workers (
+        worker TEXT PRIMARY KEY,
+        heartbeat REAL NOT NULL,
+        shards_concluidos INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+def _v9_instantes_ms(conn: sqlite3.Connection):
+    """
+    data_coleta/data_precos e a chave de fii_snapshots passam a ter milissegundos (AGORA_MS). As linhas
+    antigas são reescritas no mesmo formato ('...:SS.000'): texto com um formato só ordena e compara
+    certo e o pandas lê a coluna inteira sem misturar formatos.
+    """
+    ms = "strftime('%Y-%m-%d %H:%M:%f', {})".format
+    conn.execute(f"UPDATE OR REPLACE fii_snapshots SET data_coleta = {ms('data_coleta')} WHERE {ms('data_coleta')} IS NOT NULL")
+    conn.execute(f"UPDATE fiis_fatos SET data_coleta = COALESCE({ms('data_coleta')}, data_coleta), data_precos = {ms('data_precos')}")
+
+    # Mesmos triggers da v3, mas a chave nunca repete: é o instante da mudança ou, se o último snapshot
+    # do ticker já estiver nele (ou depois), 1 ms depois do último. Cada mudança vira uma linha nova;
+    # a busca do último é um seek na chave primária (ticker_id, data_coleta)
+    valores = ', '.join(COLUNAS_VALORES)
+    ultimo = "(SELECT MAX(data_coleta) FROM fii_snapshots WHERE ticker_id = NEW.ticker_id)"
+    grava_snapshot = f"""
+        INSERT INTO fii_snapshots (ticker_id, data_coleta, {valores}, setor_id)
+        VALUES (NEW.ticker_id, MAX(COALESCE(NEW.data_precos, NEW.data_coleta, {AGORA_MS}),
+                                   COALESCE(strftime('%Y-%m-%d %H:%M:%f', {ultimo}, '+0.001 seconds'), '')),
+                {', '.join(f'NEW.{c}' for c in COLUNAS_VALORES)}, NEW.setor_id);"""
+    conn.execute("DROP TRIGGER fiis_snapshot_insert"); conn.execute("DROP TRIGGER fiis_snapshot_update")
+    conn.execute(f"CREATE TRIGGER fiis_snapshot_insert AFTER INSERT ON fiis_fatos BEGIN {grava_snapshot} END")
+    conn.execute(f"""
+    CREATE TRIGGER fiis_snapshot_update AFTER UPDATE ON fiis_fatos
+    WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in (*COLUNAS_VALORES, 'setor_id'))} BEGIN {grava_snapshot} END
+    """)
+
+# Versão N do schema = MIGRACOES[N - 1]. Só acrescente no fim (nunca edite um passo já publicado).
+MIGRACOES: Tuple[Callable[[sqlite3.Connection], None], ...] = (_v1_tabela_fiis, _v2_snapshots, _v3_dimensoes, _v4_barras,
+                                                              _v5_acessos, _v6_tabelas_auxiliares, _v7_consolidado,
+                                                              _v8_ingestao, _v9_instantes_ms)
+
+def migrar(conn: sqlite3.Connection) -> int:
+    """
+    Aplica os passos pendentes (PRAGMA user_version < len(MIGRACOES)), cada um numa transação
+    junto com o novo user_version: ou o passo entra inteiro, ou o banco fica na versão anterior.
+    BEGIN IMMEDIATE + releitura da versão: dois processos subindo juntos não aplicam o mesmo passo.
+    Retorna a versão final.
+    """
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            versao = conn.execute("PRAGMA user_version").fetchone()[0]
+            if versao >= len(MIGRACOES): conn.rollback(); return versao
+            MIGRACOES[versao](conn)
+            conn.execute(f"PRAGMA user_version = {versao + 1}")
+            conn.commit()
+        except BaseException: conn.rollback(); raise
+        print(f"[BANCO] Schema migrado para a versão {versao + 1} ({MIGRACOES[versao].__name__}).")
+
+_MIGRADOS: Set[str] = set()
+_LOCK_MIGRACAO = threading.Lock()
+
+def inicializar_db(db_file: str = DB_FILE):
+    """Migra o schema na primeira chamada do processo para 'db_file'; as seguintes não tocam no banco."""
+    chave = os.path.abspath(db_file)
+    with _LOCK_MIGRACAO:
+        if chave in _MIGRADOS: return
+        with conexoes(db_file).escrita() as conn: migrar(conn)
+        _MIGRADOS.add(chave)
+
+def salvar_dados_fiis(dados_para_db: List[Tuple], db_file: str = DB_FILE):
+    # Tuplas na ordem (Ticker, DY_12M, Liquidez_Diaria, Preco_Atual, Min_52_Semanas, Var_Dia_Percent, P_VP, Setor).
+    # UPSERT em vez de REPLACE: a linha é atualizada no lugar (REPLACE apaga e reinsere) e os
+    # triggers só gravam snapshot das linhas cujos valores mudaram
+    with conexoes(db_file).escrita() as conn:
+        conn.executemany("INSERT OR IGNORE INTO tickers (Ticker) VALUES (?)", ((linha[0],) for linha in dados_para_db))
+        conn.executemany("INSERT OR IGNORE INTO setores (Setor) VALUES (?)", {(linha[7],) for linha in dados_para_db if linha[7] is not None})
+        conn.executemany(f"""
+    INSERT INTO fiis_fatos (ticker_id, DY_12M, Liquidez_Diaria, Preco_Atual, Min_52_Semanas, Var_Dia_Percent, P_VP, setor_id, data_coleta, data_precos)
+    VALUES ((SELECT id FROM tickers WHERE Ticker = ?), ?, ?, ?, ?, ?, ?, (SELECT id FROM setores WHERE Setor = ?), {AGORA_MS}, {AGORA_MS})
+    ON CONFLICT (ticker_id) DO UPDATE SET
+        DY_12M = excluded.DY_12M, Liquidez_Diaria = excluded.Liquidez_Diaria, Preco_Atual = excluded.Preco_Atual,
+        Min_52_Semanas = excluded.Min_52_Semanas, Var_Dia_Percent = excluded.Var_Dia_Percent, P_VP = excluded.P_VP,
+        setor_id = excluded.setor_id, data_coleta = excluded.data_coleta, data_precos = excluded.data_precos
+    """, dados_para_db)
+
+def salvar_precos_rapido(cotacoes: List[Tuple], db_file: str = DB_FILE) -> int:
+    # Só atualiza FIIs que já existem no DB (os novos precisam dos lotes para DY e Mín 52s)
+    with conexoes(db_file).escrita() as conn:
+        cursor = conn.executemany(f"""
+    UPDATE fiis_fatos SET Preco_Atual = ?, Liquidez_Diaria = ?, Var_Dia_Percent = ?, data_precos = {AGORA_MS}
+    WHERE ticker_id = (SELECT id FROM tickers WHERE Ticker = ?)
+    """, cotacoes)
+        return cursor.rowcount
+
+def _categorica(ids: pd.Series, dimensao: pd.DataFrame, coluna: str) -> pd.Categorical:
+    """ids de uma dimensão -> Categorical com os textos da dimensão como categorias (id NULL vira NaN)."""
+    ids = ids.to_numpy(dtype=float)
+    codigos = np.full(len(ids), -1, dtype=np.int64)
+    validos = ~np.isnan(ids)
+    codigos[validos] = np.searchsorted(dimensao['id'].to_numpy(), ids[validos])
+    return pd.Categorical.from_codes(codigos, categories=dimensao[coluna]).remove_unused_categories()
+
+def ler_fiis(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Mesmas colunas da view 'fiis', mas com Ticker e Setor categóricos (sem montar um texto por linha)."""
+    fatos = pd.read_sql_query(f"SELECT ticker_id, setor_id, {', '.join(COLUNAS_VALORES)}, data_coleta, data_precos "
+                              "FROM fiis_fatos ORDER BY ticker_id", conn)
+    tickers = pd.read_sql_query("SELECT id, Ticker FROM tickers ORDER BY id", conn)
+    setores = pd.read_sql_query("SELECT id, Setor FROM setores ORDER BY id", conn)
+    df = fatos[list(COLUNAS_VALORES)].astype('float64')
+    df.insert(0, 'Ticker', _categorica(fatos['ticker_id'], tickers, 'Ticker'))
+    df['Setor'] = _categorica(fatos['setor_id'], setores, 'Setor')
+    df['data_coleta'], df['data_precos'] = fatos['data_coleta'], fatos['data_precos']
+    return df
+
+_SELECT_SNAPSHOTS = f"""
+SELECT t.Ticker, s.data_coleta, {', '.join(f's.{c}' for c in COLUNAS_VALORES)}, se.Setor
+FROM fii_snapshots s JOIN tickers t ON t.id = s.ticker_id LEFT JOIN setores se ON se.id = s.setor_id
+"""
+
+_MS_PARAM = "strftime('%Y-%m-%d %H:%M:%f', ?)"
+
+def ler_snapshots(tickers: Optional[Iterable[str]] = None, inicio: Optional[str] = None, fim: Optional[str] = None,
+                  db_file: str = DB_FILE) -> pd.DataFrame:
+    """Série de snapshots (uma linha por mudança) de 'tickers' entre 'inicio' e 'fim' (inclusive)."""
+    filtros, params = [], []
+    if tickers is not None:
+        tickers = list(tickers); filtros.append(f"t.Ticker IN ({', '.join('?' * len(tickers))})"); params += tickers
+    # Limites no formato da coluna ('...:SS.fff'): 'fim' em segundos inteiros não deixa de fora o '.000'
+    if inicio: filtros.append(f"s.data_coleta >= {_MS_PARAM}"); params.append(inicio)
+    if fim: filtros.append(f"s.data_coleta <= {_MS_PARAM}"); params.append(fim)
+    onde = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    with conexoes(db_file).leitura() as conn:
+        df = pd.read_sql_query(f"{_SELECT_SNAPSHOTS} {onde} ORDER BY t.Ticker, s.data_coleta", conn, params=params)
+    df['data_coleta'] = pd.to_datetime(df['data_coleta'])
+    return df
+
+def ler_snapshot_em(instante: str, db_file: str = DB_FILE) -> pd.DataFrame:
+    """Como a tabela 'fiis' estava em 'instante': o último snapshot de cada ticker até ele."""
+    with conexoes(db_file).leitura() as conn:
+        return pd.read_sql_query(f"""
+        {_SELECT_SNAPSHOTS}
+        JOIN (SELECT ticker_id, MAX(data_coleta) AS data_coleta FROM fii_snapshots WHERE data_coleta <= {_MS_PARAM} GROUP BY ticker_id) u
+          ON u.ticker_id = s.ticker_id AND u.data_coleta = s.data_coleta
+        """, conn, params=(instante,), index_col='Ticker')
+
+def ler_barras(tickers: Optional[Iterable[str]] = None, metrica: str = 'Preco_Atual', escala: str = 'D',
+               inicio: Optional[str] = None, fim: Optional[str] = None, db_file: str = DB_FILE) -> pd.DataFrame:
+    """Barras compactadas ('D' diárias, 'W' semanais) de uma métrica, por Ticker e período (inclusive)."""
+    filtros, params = ["b.metrica = ?", "b.escala = ?"], [metrica, escala]
+    if tickers is not None:
+        tickers = list(tickers); filtros.append(f"t.Ticker IN ({', '.join('?' * len(tickers))})"); params += tickers
+    if inicio: filtros.append("b.periodo >= ?"); params.append(inicio)
+    if fim: filtros.append("b.periodo <= ?"); params.append(fim)
+    with conexoes(db_file).leitura() as conn:
+        df = pd.read_sql_query(f"""
+        SELECT t.Ticker, b.periodo, b.abertura, b.maxima, b.minima, b.fechamento, b.coletas
+        FROM fii_barras b JOIN tickers t ON t.id = b.ticker_id
+        WHERE {' AND '.join(filtros)} ORDER BY t.Ticker, b.periodo
+        """, conn, params=params)
+    df['periodo'] = pd.to_datetime(df['periodo'])
+    return df
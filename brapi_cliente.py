@@ -0,0 +1,210 @@
+# --- CLIENTE BRAPI (/quote/list E LOTES /quote) ---
+# --- HEDGING: DUPLICA O LOTE LENTO DEPOIS DO P95 E FICA COM O PRIMEIRO ---
+
+import math
+import re
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from typing import List, Dict, Tuple, Optional, Callable, Any
+
+import requests
+
+BRAPI_BASE_URL = "https://brapi.dev/api"
+TIMEOUT_LOTE = 45 # Segundos que um lote /quote pode esperar (igual ao v31)
+REGEX_FII_VALIDO = re.compile(r"^[A-Z]{4}11$")
+# Ordem da tupla de montar_linha_fii (mesma do INSERT em banco.salvar_dados_fiis)
+COLUNAS_LINHA_FII = ('Ticker', 'DY_12M', 'Liquidez_Diaria', 'Preco_Atual', 'Min_52_Semanas', 'Var_Dia_Percent', 'P_VP', 'Setor')
+# Ordem da tupla de extrair_cotacoes_lista (mesma do UPDATE em banco.salvar_precos_rapido)
+COLUNAS_COTACAO = ('Preco_Atual', 'Liquidez_Diaria', 'Var_Dia_Percent', 'Ticker')
+
+def buscar_lista_fundos(api_key: str, timeout: float = 30) -> List[Dict]:
+    """Baixa /quote/list?type=fund (1 requisição) e devolve só os itens com ticker de FII válido."""
+    headers = {'Authorization': f'Bearer {api_key}'}
+    list_url = f"{BRAPI_BASE_URL}/quote/list?type=fund&limit=1000&token={api_key}"
+    response_list = requests.get(list_url, headers=headers, timeout=timeout)
+    response_list.raise_for_status()
+    fii_list_data = response_list.json()
+    if 'stocks' not in fii_list_data: return []
+    return [item for item in fii_list_data['stocks']
+            if isinstance(item.get('stock'), str) and REGEX_FII_VALIDO.match(item.get('stock'))]
+
+def extrair_cotacoes_lista(itens_lista: List[Dict]) -> List[Tuple[float, float, float, str]]:
+    """
+    Modo rápido: tira preço ('close'), volume e variação do dia ('change', já em %)
+    direto dos itens de /quote/list. Retorna (preco, volume, var_dia, ticker) só dos completos.
+    """
+    cotacoes = []
+    for item in itens_lista:
+        preco, volume, var_dia = item.get('close'), item.get('volume'), item.get('change')
+        if not all(isinstance(v, (int, float)) for v in (preco, volume, var_dia)): continue
+        if preco <= 0: continue
+        cotacoes.append((float(preco), float(volume), float(var_dia), item['stock']))
+    return cotacoes
+
+def buscar_lote_quote(api_key: str, tickers: List[str], modules: str = "defaultKeyStatistics",
+                      timeout: float = TIMEOUT_LOTE, dividendos: bool = False) -> List[Dict]:
+    """Busca um lote de tickers em /quote/{t1,...,tN} e devolve a lista 'results' (com 'dividendsData' se pedido)."""
+    headers = {'Authorization': f'Bearer {api_key}'}
+    tickers_param = ",".join(tickers)
+    quote_url = f"{BRAPI_BASE_URL}/quote/{tickers_param}?token={api_key}"
+    if modules: quote_url += f"&modules={modules}"
+    if dividendos: quote_url += "&dividends=true"
+
+    response_quote = requests.get(quote_url, headers=headers, timeout=timeout)
+    response_quote.raise_for_status()
+    quote_data = response_quote.json()
+    return quote_data.get('results') or []
+
+def montar_linha_fii(fii_result: Dict, setor: str) -> Optional[Tuple]:
+    """
+    Converte um 'result' de /quote na tupla do DB:
+    (Ticker, DY_12M, Liquidez_Diaria, Preco_Atual, Min_52_Semanas, Var_Dia_Percent, P_VP, Setor).
+    Retorna None se faltar algum dado essencial (preço, liq, min52w, varDia).
+    """
+    ticker = fii_result.get('symbol')
+
+    # Dados Principais (Confiáveis)
+    dy_decimal = fii_result.get('dividendYield')
+    liquidez = fii_result.get('regularMarketVolume')
+    preco = fii_result.get('regularMarketPrice')
+    min_52w = fii_result.get('fiftyTwoWeekLow')
+    var_dia = fii_result.get('regularMarketChangePercent')
+
+    # Dados do Módulo (Menos Confiáveis para P/VP)
+    pvp = None # Começa como None
+    stats_module = fii_result.get('defaultKeyStatistics')
+    if isinstance(stats_module, dict):
+        pvp_raw = stats_module.get('priceToBook')
+        if pvp_raw is not None and isinstance(pvp_raw, (int, float)) and pvp_raw > 0:
+            pvp = float(pvp_raw) # Só guarda se for válido
+
+    # Validação Mínima: Precisa ter ticker, preço, liquidez e mín 52 semanas
+    if not (ticker and preco and liquidez is not None and min_52w is not None and var_dia is not None): return None
+    dy = (float(dy_decimal) * 100) if dy_decimal is not None and isinstance(dy_decimal, (int, float)) else 0.0
+    var_dia_val = float(var_dia) # Já vem em percentual? A API sugere que sim.
+    return (ticker, dy, float(liquidez), float(preco), float(min_52w), var_dia_val, pvp, setor)
+
+def montar_linhas_fiis(resultados: List[Dict], setor_map: Dict[str, str]) -> List[Tuple]:
+    """Aplica montar_linha_fii em todos os resultados, descartando (com aviso) os incompletos."""
+    dados_para_db: List[Tuple] = []
+    for fii_result in resultados:
+        ticker = fii_result.get('symbol')
+        if not ticker: continue # Pula se não tiver ticker
+
+        linha = montar_linha_fii(fii_result, setor_map.get(ticker, "Desconhecido"))
+        if linha: dados_para_db.append(linha) # Adiciona mesmo que P/VP seja None
+        else: print(f"[AVISO] FII {ticker}: Dados essenciais (preço, liq, min52w, varDia) ausentes. Descartado.")
+    return dados_para_db
+
+def buscar_lotes_quote(api_key: str, tickers: List[str], tamanho_lote: int = 10, hedge: Optional["HedgeLotes"] = None,
+                       ao_progredir: Optional[Callable[[int, int, bool], None]] = None,
+                       pausa_segundos: float = 0.1, dividendos: bool = False) -> Tuple[List[Dict], int]:
+    """
+    Busca todos os tickers em lotes /quote (um lote por vez, com hedge opcional).
+    Com 'dividendos', cada result traz também o histórico de proventos (mesmas requisições).
+    'ao_progredir(lote_atual, total_lotes, sucesso)' é chamado após cada lote.
+    Retorna (resultados, quantidade de lotes que falharam).
+    """
+    lotes_de_fiis = [tickers[i:i + tamanho_lote] for i in range(0, len(tickers), tamanho_lote)]
+    buscar = partial(buscar_lote_quote, dividendos=dividendos)
+    todos_os_resultados_api: List[Dict] = []
+    erros_lote = 0
+
+    for i, lote in enumerate(lotes_de_fiis):
+        lote_bem_sucedido = False
+        lote_limpo = [str(t).strip() for t in lote if isinstance(t, str)]
+        try:
+            if not lote_limpo: continue
+
+            if hedge: resultados_lote = hedge.executar(buscar, api_key, lote_limpo)
+            else: resultados_lote = buscar(api_key, lote_limpo)
+
+            if resultados_lote:
+                todos_os_resultados_api.extend(resultados_lote)
+                lote_bem_sucedido = True
+            else: erros_lote += 1; print(f"[ERRO] Lote {i+1}: 'results' vazio.")
+
+        except requests.exceptions.HTTPError as http_err:
+            erros_lote += 1; status_code = http_err.response.status_code if http_err.response is not None else 'N/A'
+            print(f"[AVISO] Lote {i+1} erro HTTP {status_code}: {lote_limpo}. Erro: {http_err}")
+        except Exception as e_lote:
+            erros_lote += 1; print(f"[ERRO] Falha genérica lote {i+1}: {lote_limpo}. Erro: {e_lote}")
+
+        if ao_progredir: ao_progredir(i + 1, len(lotes_de_fiis), lote_bem_sucedido)
+        if pausa_segundos: time.sleep(pausa_segundos)
+
+    return todos_os_resultados_api, erros_lote
+
+class LatenciaRolante:
+    """Guarda as últimas latências de lote (em segundos) para estimar o p95."""
+
+    def __init__(self, tamanho: int = 50, minimo_amostras: int = 5):
+        self.amostras = deque(maxlen=tamanho)
+        self.minimo_amostras = minimo_amostras
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos: float) -> None:
+        with self._lock: self.amostras.append(segundos)
+
+    def p95(self) -> Optional[float]:
+        """Retorna o p95 atual, ou None se ainda não há amostras suficientes."""
+        with self._lock:
+            if len(self.amostras) < self.minimo_amostras: return None
+            ordenadas = sorted(self.amostras)
+        indice = min(len(ordenadas) - 1, math.ceil(0.95 * len(ordenadas)) - 1)
+        return ordenadas[indice]
+
+class HedgeLotes:
+    """
+    Executa uma chamada e, se ela passar do p95 rolante, dispara uma cópia.
+    Quem responder primeiro (com sucesso) vence. 'max_extras' limita as cópias por rodada.
+    """
+
+    def __init__(self, latencias: LatenciaRolante, max_extras: int = 5, piso_segundos: float = 1.0):
+        self.latencias = latencias
+        self.max_extras = max_extras
+        self.piso_segundos = piso_segundos # Nunca duplica antes disso, mesmo com p95 baixo
+        self.extras_disparados = 0
+        self.extras_vencedores = 0
+        # Cada cópia perdedora pode ocupar uma thread até o timeout, por isso 2 + max_extras
+        self._executor = ThreadPoolExecutor(max_workers=2 + max_extras, thread_name_prefix="brapi-hedge")
+
+    def _limite_hedge(self) -> Optional[float]:
+        if self.extras_disparados >= self.max_extras: return None
+        p95 = self.latencias.p95()
+        if p95 is None: return None
+        return max(p95, self.piso_segundos)
+
+    def executar(self, funcao: Callable[..., Any], *args, **kwargs) -> Any:
+        inicio = time.monotonic()
+        original = self._executor.submit(funcao, *args, **kwargs)
+
+        limite = self._limite_hedge()
+        concluidos, _ = wait([original], timeout=limite)
+        if concluidos:
+            resultado = original.result() # Propaga a exceção, se houver (hedge não é retry)
+            self.latencias.registrar(time.monotonic() - inicio)
+            return resultado
+
+        # Passou do p95: dispara a cópia e fica com a primeira resposta válida
+        self.extras_disparados += 1
+        copia = self._executor.submit(funcao, *args, **kwargs)
+        print(f"[HEDGE] Lote passou de {limite:.2f}s. Disparando cópia ({self.extras_disparados}/{self.max_extras}).")
+        pendentes = {original, copia}
+        ultimo_erro: Optional[BaseException] = None
+        while pendentes:
+            concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if futuro.exception() is not None:
+                    ultimo_erro = futuro.exception(); continue
+                if futuro is copia: self.extras_vencedores += 1
+                self.latencias.registrar(time.monotonic() - inicio)
+                return futuro.result()
+        raise ultimo_erro
+
+    def encerrar(self) -> None:
+        # Não espera a requisição perdedora: ela termina sozinha (ou no timeout)
+        self._executor.shutdown(wait=False)
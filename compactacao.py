@@ -0,0 +1,137 @@
+# --- RETENÇÃO DO HISTÓRICO: INTRADIÁRIO -> BARRAS DIÁRIAS -> BARRAS SEMANAIS ---
+# Cada atualização grava snapshots (fii_snapshots) e um arquivo Parquet; com centenas de tickers e
+# várias coletas por dia o histórico cresce sem limite. Esta rotina:
+#   1. snapshots com mais de 'dias' dias viram barras diárias em 'fii_barras' (abertura, máxima,
+#      mínima, fechamento e nº de coletas, por ticker e métrica) e as linhas brutas são apagadas;
+#   2. barras diárias com mais de 'anos' anos viram barras semanais (semana começando na segunda);
+#   3. no Parquet, meses inteiros anteriores aos mesmos cortes viram um arquivo só, com a última
+#      coleta de cada ticker por dia (ou por semana) - ver historico_parquet.compactar_particoes.
+# Incremental e idempotente: a tabela 'compactacao' guarda até que dia cada escala já foi
+# compactada, cada lote de dias é uma transação junto com o avanço da marca, e rodar de novo
+# sem dias novos não muda nada. Do que sai de fii_snapshots fica só o último snapshot de cada
+# ticker (a "âncora"): o valor vigente num instante continua sendo o último snapshot até ele.
+#
+# Uso: python compactacao.py --dias 7 --anos 2
+
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from banco import DB_FILE, COLUNAS_VALORES, conexoes, inicializar_db
+from historico_parquet import DIR_PARQUET, compactar_particoes, parquet_disponivel
+
+DIAS_INTRADIARIO = 7 # Snapshots mais novos que isso ficam com todas as coletas do dia
+ANOS_DIARIO = 2 # Barras diárias mais novas que isso não viram semanais
+DIAS_POR_TRANSACAO = 28 # Lote de dias por transação (múltiplo de 7: os lotes semanais não cortam semanas)
+
+_BRUTOS = " UNION ALL ".join(
+    f"SELECT ticker_id, data_coleta, '{c}' AS metrica, {c} AS valor FROM fii_snapshots "
+    f"WHERE data_coleta >= :de AND data_coleta < :ate AND {c} IS NOT NULL" for c in COLUNAS_VALORES)
+
+# Abertura/fechamento pelas janelas ordenadas por instante; máxima, mínima e contagem pelo GROUP BY
+_ROLAR_SNAPSHOTS = f"""
+INSERT INTO fii_barras (ticker_id, metrica, escala, periodo, abertura, maxima, minima, fechamento, coletas)
+SELECT ticker_id, metrica, 'D', dia, abertura, max(valor), min(valor), fechamento, count(*)
+FROM (
+    SELECT ticker_id, metrica, date(data_coleta) AS dia, valor,
+           first_value(valor) OVER dia_ticker AS abertura, last_value(valor) OVER dia_ticker AS fechamento
+    FROM ({_BRUTOS})
+    WINDOW dia_ticker AS (PARTITION BY ticker_id, metrica, date(data_coleta) ORDER BY data_coleta
+                          ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+)
+WHERE true GROUP BY ticker_id, metrica, dia
+ON CONFLICT (ticker_id, metrica, escala, periodo) DO UPDATE SET
+    abertura = excluded.abertura, maxima = excluded.maxima, minima = excluded.minima,
+    fechamento = excluded.fechamento, coletas = excluded.coletas
+"""
+
+# Tudo antes de :ate sai, menos o último snapshot de cada ticker (a âncora do valor vigente)
+_PURGAR_SNAPSHOTS = """
+DELETE FROM fii_snapshots
+WHERE data_coleta < :ate
+  AND data_coleta < (SELECT MAX(u.data_coleta) FROM fii_snapshots u
+                     WHERE u.ticker_id = fii_snapshots.ticker_id AND u.data_coleta < :ate)
+"""
+
+_ROLAR_DIARIAS = """
+INSERT INTO fii_barras (ticker_id, metrica, escala, periodo, abertura, maxima, minima, fechamento, coletas)
+SELECT ticker_id, metrica, 'W', semana, abertura_semana, max(maxima), min(minima), fechamento_semana, sum(coletas)
+FROM (
+    SELECT ticker_id, metrica, date(periodo, '-6 days', 'weekday 1') AS semana, maxima, minima, coletas,
+           first_value(abertura) OVER semana_ticker AS abertura_semana, last_value(fechamento) OVER semana_ticker AS fechamento_semana
+    FROM fii_barras WHERE escala = 'D' AND periodo >= :de AND periodo < :ate
+    WINDOW semana_ticker AS (PARTITION BY ticker_id, metrica, date(periodo, '-6 days', 'weekday 1') ORDER BY periodo
+                             ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+)
+WHERE true GROUP BY ticker_id, metrica, semana
+ON CONFLICT (ticker_id, metrica, escala, periodo) DO UPDATE SET
+    abertura = excluded.abertura, maxima = excluded.maxima, minima = excluded.minima,
+    fechamento = excluded.fechamento, coletas = excluded.coletas
+"""
+
+def segunda_feira(dia: date) -> date:
+    return dia - timedelta(days=dia.weekday())
+
+def cortes(dias: int = DIAS_INTRADIARIO, anos: int = ANOS_DIARIO, hoje: Optional[date] = None):
+    """(corte diário, corte semanal): dias anteriores a cada corte entram na escala correspondente."""
+    if dias < 1 or anos * 365 <= dias: raise ValueError("Use dias >= 1 e 'anos' cobrindo mais que 'dias'.")
+    hoje = hoje or datetime.now(timezone.utc).date() # data_coleta é gravada em UTC (CURRENT_TIMESTAMP)
+    return hoje - timedelta(days=dias), segunda_feira(hoje - timedelta(days=round(anos * 365.25)))
+
+def _compactar_escala(escala: str, corte: date, primeiro_dia_sql: str, rolar_sql: str, purgar_sql: str,
+                      alinhar=lambda dia: dia, db_file: str = DB_FILE) -> int:
+    """
+    Rola [marca, corte) em lotes de DIAS_POR_TRANSACAO; cada lote (barras + purga + marca nova) é
+    uma transação. Retorna quantas barras gravou.
+    """
+    with conexoes(db_file).leitura() as conn:
+        marca = conn.execute("SELECT ate FROM compactacao WHERE escala = ?", (escala,)).fetchone()
+        primeiro = marca[0] if marca else conn.execute(primeiro_dia_sql).fetchone()[0]
+    if primeiro is None: return 0
+    de, barras = alinhar(date.fromisoformat(primeiro[:10])), 0
+    while de < corte:
+        ate = min(de + timedelta(days=DIAS_POR_TRANSACAO), corte)
+        faixa = {'de': de.isoformat(), 'ate': ate.isoformat()}
+        with conexoes(db_file).escrita() as conn:
+            barras += conn.execute(rolar_sql, faixa).rowcount
+            conn.execute(purgar_sql, faixa)
+            conn.execute("INSERT INTO compactacao (escala, ate) VALUES (?, ?) ON CONFLICT (escala) DO UPDATE SET ate = excluded.ate",
+                         (escala, faixa['ate']))
+        de = ate
+    return barras
+
+def compactar_snapshots(corte: date, db_file: str = DB_FILE) -> int:
+    """Snapshots anteriores a 'corte' -> barras diárias (fica só a âncora de cada ticker)."""
+    return _compactar_escala('D', corte, "SELECT MIN(data_coleta) FROM fii_snapshots",
+                             _ROLAR_SNAPSHOTS, _PURGAR_SNAPSHOTS, db_file=db_file)
+
+def compactar_barras_diarias(corte: date, db_file: str = DB_FILE) -> int:
+    """Barras diárias anteriores a 'corte' (uma segunda-feira) -> barras semanais."""
+    return _compactar_escala('W', corte, "SELECT MIN(periodo) FROM fii_barras WHERE escala = 'D'", _ROLAR_DIARIAS,
+                             "DELETE FROM fii_barras WHERE escala = 'D' AND periodo >= :de AND periodo < :ate",
+                             alinhar=segunda_feira, db_file=db_file)
+
+def compactar(dias: int = DIAS_INTRADIARIO, anos: int = ANOS_DIARIO, db_file: str = DB_FILE,
+              diretorio_parquet: str = DIR_PARQUET, hoje: Optional[date] = None) -> Dict[str, int]:
+    """Roda as três etapas; retorna barras diárias, barras semanais e partições Parquet reescritas."""
+    inicializar_db(db_file)
+    corte_diario, corte_semanal = cortes(dias, anos, hoje)
+    resultado = {'barras_diarias': compactar_snapshots(corte_diario, db_file),
+                 'barras_semanais': compactar_barras_diarias(corte_semanal, db_file),
+                 'particoes_parquet': 0}
+    if parquet_disponivel(): resultado['particoes_parquet'] = compactar_particoes(corte_diario, corte_semanal, diretorio_parquet)
+    return resultado
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compacta o histórico: intradiário -> diário -> semanal.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=DIR_PARQUET)
+    parser.add_argument("--dias", type=int, default=DIAS_INTRADIARIO, help="Mantém as coletas intradiárias dos últimos N dias")
+    parser.add_argument("--anos", type=int, default=ANOS_DIARIO, help="Mantém barras diárias dos últimos N anos")
+    args = parser.parse_args(argv)
+    resultado = compactar(args.dias, args.anos, args.db, args.dir)
+    print(f"[COMPACTACAO] {resultado['barras_diarias']} barras diárias, {resultado['barras_semanais']} semanais, "
+          f"{resultado['particoes_parquet']} partições Parquet reescritas.")
+
+if __name__ == "__main__":
+    main()
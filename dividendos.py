@@ -0,0 +1,125 @@
+# --- DIVIDENDOS: EVENTOS POR TICKER E YIELDS DE QUALQUER JANELA CALCULADOS LOCALMENTE ---
+# O DY_12M da Brapi é só 'dividendYield * 100' (não dá para auditar nem trocar a janela).
+# Aqui os eventos (data com, pagamento, valor por cota) ficam numa tabela indexada e as somas
+# móveis de 1/3/6/12/24 meses saem de uma soma acumulada única sobre os eventos ordenados por
+# (ticker, data com): cada janela vira duas buscas binárias (searchsorted) e uma subtração,
+# para todos os tickers de uma vez. As somas ficam em 'dividendos_janelas' e só são
+# recalculadas para os tickers com eventos novos (ou para todos quando o dia de referência muda).
+# As tabelas são criadas pelas migrações do banco (banco._v6_tabelas_auxiliares).
+
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from banco import DB_FILE, conexoes, inicializar_db
+
+JANELAS_MESES = (1, 3, 6, 12, 24)
+TIPOS_FORA_DO_YIELD = ('AMORTIZACAO', 'AMORTIZAÇÃO') # Devolução de capital não é rendimento
+_DESLOCAMENTO_TICKER = 1 << 20 # Dias por "faixa" de ticker na chave combinada (sobra para ~2800 anos)
+
+def extrair_dividendos_brapi(resultados: List[Dict]) -> pd.DataFrame:
+    """'dividendsData.cashDividends' dos results de /quote?dividends=true -> eventos padronizados."""
+    linhas = [{'Ticker': r.get('symbol'), 'data_com': ev.get('lastDatePrior'), 'tipo': ev.get('label') or 'RENDIMENTO',
+               'data_pagamento': ev.get('paymentDate'), 'valor': ev.get('rate')}
+              for r in resultados if isinstance(r.get('dividendsData'), dict)
+              for ev in (r['dividendsData'].get('cashDividends') or [])]
+    eventos = pd.DataFrame(linhas, columns=['Ticker', 'data_com', 'tipo', 'data_pagamento', 'valor'])
+    eventos['fonte'] = 'brapi'
+    return eventos
+
+def _padronizar_eventos(eventos: pd.DataFrame) -> pd.DataFrame:
+    eventos = eventos.copy()
+    for coluna in ('data_com', 'data_pagamento'):
+        eventos[coluna] = pd.to_datetime(eventos[coluna], errors='coerce', utc=True).dt.strftime('%Y-%m-%d')
+    eventos['tipo'] = eventos['tipo'].fillna('RENDIMENTO').str.upper().str.strip()
+    eventos['valor'] = pd.to_numeric(eventos['valor'], errors='coerce')
+    eventos = eventos.dropna(subset=['Ticker', 'data_com', 'valor'])
+    return eventos.drop_duplicates(['Ticker', 'data_com', 'tipo'], keep='last')
+
+def salvar_dividendos(eventos: pd.DataFrame, db_file: str = DB_FILE) -> Set[str]:
+    """Grava só os eventos novos ou com valor/pagamento diferente. Retorna os tickers alterados."""
+    eventos = _padronizar_eventos(eventos)
+    if eventos.empty: return set()
+    inicializar_db(db_file)
+    with conexoes(db_file).escrita() as conn:
+        tickers = eventos['Ticker'].unique().tolist()
+        existentes = pd.read_sql_query(
+            f"SELECT Ticker, data_com, tipo, data_pagamento, valor FROM dividendos WHERE Ticker IN ({', '.join('?' * len(tickers))})",
+            conn, params=tickers)
+        comparacao = eventos.merge(existentes, on=['Ticker', 'data_com', 'tipo'], how='left', suffixes=('', '_db'), indicator=True)
+        mudou = ((comparacao['_merge'] == 'left_only') | ~np.isclose(comparacao['valor'], comparacao['valor_db'].astype(float))
+                 | (comparacao['data_pagamento'].fillna('') != comparacao['data_pagamento_db'].fillna('')))
+        alterados = comparacao.loc[mudou, ['Ticker', 'data_com', 'tipo', 'data_pagamento', 'valor', 'fonte']]
+        conn.executemany("REPLACE INTO dividendos (Ticker, data_com, tipo, data_pagamento, valor, fonte) VALUES (?, ?, ?, ?, ?, ?)",
+                         alterados.astype(object).where(alterados.notna(), None).itertuples(index=False, name=None))
+    return set(alterados['Ticker'])
+
+class JanelasDividendos:
+    """
+    Somas móveis de proventos por ticker sobre arrays ordenados. A chave combinada
+    (código do ticker * deslocamento + dias desde 1970) deixa tudo num único vetor crescente;
+    a soma de uma janela é acumulado[fim] - acumulado[início].
+    """
+
+    def __init__(self, eventos: pd.DataFrame):
+        eventos = eventos.sort_values(['Ticker', 'data_com'])
+        self.tickers = pd.Index(eventos['Ticker'].unique())
+        codigos = self.tickers.get_indexer(eventos['Ticker']).astype(np.int64)
+        dias = pd.to_datetime(eventos['data_com']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        self._chave = codigos * _DESLOCAMENTO_TICKER + dias
+        self._acumulado = np.concatenate(([0.0], np.cumsum(eventos['valor'].to_numpy(dtype=float))))
+
+    @staticmethod
+    def _dia(quando) -> np.int64:
+        return np.datetime64(pd.Timestamp(quando).date(), 'D').astype(np.int64)
+
+    def somas(self, ref: date, meses: int, tickers: Optional[Iterable[str]] = None) -> pd.Series:
+        """Proventos com data com em (ref - meses, ref] para cada ticker (0 sem eventos, NaN se desconhecido)."""
+        tickers = self.tickers if tickers is None else pd.Index(tickers)
+        codigos = self.tickers.get_indexer(tickers).astype(np.int64)
+        base = codigos * _DESLOCAMENTO_TICKER
+        fim = np.searchsorted(self._chave, base + self._dia(ref), side='right')
+        inicio = np.searchsorted(self._chave, base + self._dia(pd.Timestamp(ref) - pd.DateOffset(months=meses)), side='right')
+        soma = self._acumulado[fim] - self._acumulado[inicio]
+        return pd.Series(np.where(codigos >= 0, soma, np.nan), index=tickers, name=f'Div_{meses}M')
+
+    def tabela(self, ref: date, janelas=JANELAS_MESES, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return pd.concat([self.somas(ref, m, tickers) for m in janelas], axis=1).rename_axis('Ticker')
+
+def atualizar_janelas(tickers_alterados: Optional[Set[str]] = None, ref: Optional[date] = None,
+                      db_file: str = DB_FILE) -> int:
+    """
+    Recalcula 'dividendos_janelas' só para os tickers alterados; se o dia de referência mudou
+    desde o último cálculo (as janelas andaram), recalcula todos. Retorna quantos tickers recalculou.
+    """
+    ref = ref or date.today()
+    inicializar_db(db_file)
+    with conexoes(db_file).escrita() as conn:
+        refs_gravadas = {r for (r,) in conn.execute("SELECT DISTINCT data_ref FROM dividendos_janelas")}
+        tudo = refs_gravadas != {ref.isoformat()}
+        if not tudo and not tickers_alterados: return 0
+
+        desde = (pd.Timestamp(ref) - pd.DateOffset(months=max(JANELAS_MESES))).strftime('%Y-%m-%d')
+        filtro, params = "data_com > ? AND tipo NOT IN ({})".format(', '.join('?' * len(TIPOS_FORA_DO_YIELD))), [desde, *TIPOS_FORA_DO_YIELD]
+        if not tudo:
+            filtro += f" AND Ticker IN ({', '.join('?' * len(tickers_alterados))})"; params += sorted(tickers_alterados)
+        eventos = pd.read_sql_query(f"SELECT Ticker, data_com, valor FROM dividendos WHERE {filtro}", conn, params=params)
+        # Tickers alterados sem evento na janela também precisam da linha zerada
+        tickers = sorted(set(eventos['Ticker']) | (set() if tudo else set(tickers_alterados)))
+        tabela = JanelasDividendos(eventos).tabela(ref, tickers=tickers).fillna(0.0)
+
+        if tudo: conn.execute("DELETE FROM dividendos_janelas")
+        colunas = [f'Div_{m}M' for m in JANELAS_MESES]
+        conn.executemany(f"REPLACE INTO dividendos_janelas (Ticker, data_ref, {', '.join(colunas)}) VALUES (?, ?, {', '.join('?' * len(colunas))})",
+                         [(t, ref.isoformat(), *valores) for t, valores in zip(tabela.index, tabela[colunas].itertuples(index=False, name=None))])
+    return len(tabela)
+
+def ler_yields_locais(conn: sqlite3.Connection, precos: pd.DataFrame) -> pd.DataFrame:
+    """DY_Local_{N}M (%) = soma da janela / Preco_Atual * 100, para todos os tickers de 'precos' de uma vez."""
+    somas = pd.read_sql_query("SELECT * FROM dividendos_janelas", conn, index_col='Ticker').drop(columns='data_ref')
+    somas = somas.reindex(precos['Ticker']).to_numpy()
+    yields = somas / precos['Preco_Atual'].to_numpy()[:, None] * 100
+    return pd.DataFrame(yields, columns=[f'DY_Local_{m}M' for m in JANELAS_MESES], index=precos.index)
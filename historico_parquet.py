@@ -0,0 +1,171 @@
+# --- HISTÓRICO COLUNAR (PARQUET PARTICIONADO) PARA ANÁLISES DE "TODOS OS TICKERS x ANOS" ---
+# Cada atualização grava um arquivo Parquet em historico_parquet/classe=<classe>/mes=<AAAA-MM>/.
+# Dentro do arquivo as linhas vão ordenadas por (Ticker, data_coleta) e em row groups com
+# estatísticas de mín/máx, então um filtro por ticker ou período pula partições inteiras
+# (pelo nome do diretório) e row groups inteiros (pelas estatísticas) sem ler os bytes.
+# Só as colunas pedidas são lidas e vão direto para pandas/NumPy via Arrow.
+#
+# Meses antigos são compactados (última coleta por dia/semana) por compactacao.py.
+#
+# Uso: python historico_parquet.py exportar-snapshots   (carga inicial a partir de fii_snapshots)
+
+import argparse
+import os
+import uuid
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from banco import DB_FILE, COLUNAS_VALORES, ler_snapshots
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DIR_PARQUET = "historico_parquet"
+CLASSE_PADRAO = "FII"
+LINHAS_POR_ROW_GROUP = 16 * 1024 # Pequeno o bastante para o filtro por ticker pular a maior parte do arquivo
+Data = Union[str, date, datetime, pd.Timestamp]
+
+def esquema_historico() -> "pa.Schema":
+    """
+    Esquema fixo de todos os arquivos (coleta parcial, como a de só preços, grava nulos no resto).
+    Ticker e Setor como string simples: no disco o Parquet já usa dicionário, e com o tipo
+    dictionary do Arrow o scanner não usa as estatísticas de mín/máx para pular row groups.
+    """
+    return pa.schema([('Ticker', pa.string()), ('data_coleta', pa.timestamp('s')),
+                      *[(c, pa.float64()) for c in COLUNAS_VALORES], ('Setor', pa.string())])
+
+def parquet_disponivel() -> bool:
+    return pa is not None
+
+def gravar_coleta(df: pd.DataFrame, coletado_em: Optional[Data] = None, classe: str = CLASSE_PADRAO,
+                  diretorio: str = DIR_PARQUET) -> Optional[str]:
+    """
+    Grava uma coleta (uma linha por Ticker, com as colunas de COLUNAS_VALORES que houver) como um
+    arquivo novo da partição do mês. Retorna o caminho gravado (None se não houver linhas).
+    O instante fica em UTC sem fuso, como o CURRENT_TIMESTAMP de fii_snapshots (data com fuso é convertida).
+    """
+    if df.empty: return None
+    coletado_em = pd.Timestamp(coletado_em or datetime.now(timezone.utc))
+    if coletado_em.tzinfo is not None: coletado_em = coletado_em.tz_convert('UTC').tz_localize(None)
+    coletado_em = coletado_em.floor('s')
+    linhas = df.reindex(columns=['Ticker', *COLUNAS_VALORES, 'Setor'])
+    linhas.insert(1, 'data_coleta', coletado_em)
+    return _gravar_arquivo(linhas, f"{coletado_em:%Y-%m}", f"coleta-{coletado_em:%Y%m%dT%H%M%S}", classe, diretorio)
+
+def _gravar_arquivo(linhas: pd.DataFrame, mes: str, prefixo: str, classe: str, diretorio: str) -> Optional[str]:
+    """Ordena por (Ticker, data_coleta) e grava com nome temporário + rename: leitor nunca vê arquivo pela metade."""
+    linhas = linhas.dropna(subset=['Ticker']).sort_values(['Ticker', 'data_coleta'], kind='stable')
+    if linhas.empty: return None
+    linhas = linhas.astype({'Ticker': str, 'Setor': object}) # Categóricos viram texto (ver esquema_historico)
+    arrow = pa.Table.from_pandas(linhas, schema=esquema_historico(), preserve_index=False)
+    particao = os.path.join(diretorio, f"classe={classe}", f"mes={mes}")
+    os.makedirs(particao, exist_ok=True)
+    nome = f"{prefixo}-{uuid.uuid4().hex[:8]}.parquet"
+    caminho, temporario = os.path.join(particao, nome), os.path.join(particao, f".{nome}.tmp") # '.' no início: o dataset ignora
+    pq.write_table(arrow, temporario, row_group_size=LINHAS_POR_ROW_GROUP, compression='zstd', write_statistics=True)
+    os.replace(temporario, caminho)
+    return caminho
+
+def _filtro(tickers: Optional[Sequence[str]], inicio: Optional[Data], fim: Optional[Data],
+            classes: Optional[Sequence[str]]) -> "Optional[ds.Expression]":
+    condicoes = []
+    if classes: condicoes.append(ds.field('classe').isin(list(classes)))
+    if tickers is not None: condicoes.append(ds.field('Ticker').isin(list(tickers)))
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        condicoes += [ds.field('mes') >= f"{inicio:%Y-%m}", ds.field('data_coleta') >= pa.scalar(inicio.to_pydatetime(), pa.timestamp('s'))]
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        if fim == fim.normalize(): fim += pd.Timedelta(days=1) - pd.Timedelta(seconds=1) # 'fim' só com a data: o dia inteiro
+        condicoes += [ds.field('mes') <= f"{fim:%Y-%m}", ds.field('data_coleta') <= pa.scalar(fim.to_pydatetime(), pa.timestamp('s'))]
+    filtro = None
+    for condicao in condicoes: filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+def ler_historico_parquet(tickers: Optional[Iterable[str]] = None, inicio: Optional[Data] = None,
+                          fim: Optional[Data] = None, colunas: Optional[Sequence[str]] = None,
+                          classes: Optional[Sequence[str]] = None, diretorio: str = DIR_PARQUET) -> pd.DataFrame:
+    """
+    Histórico de coletas filtrado por ticker, período (inclusive) e classe. Os filtros descem até o
+    scanner do Arrow (partições e row groups descartados pelas estatísticas) e só 'colunas' são lidas
+    (Ticker e data_coleta vêm sempre). Ticker e Setor chegam como categóricos.
+    """
+    if not os.path.isdir(diretorio): return pd.DataFrame(columns=['Ticker', 'data_coleta', *(colunas or COLUNAS_VALORES)])
+    dataset = ds.dataset(diretorio, format='parquet', partitioning='hive', schema=_esquema_com_particoes())
+    pedidas = ['Ticker', 'data_coleta', *[c for c in (colunas or (*COLUNAS_VALORES, 'Setor')) if c not in ('Ticker', 'data_coleta')]]
+    tabela = dataset.to_table(columns=pedidas, filter=_filtro(None if tickers is None else list(tickers), inicio, fim, classes))
+    return tabela.sort_by([('Ticker', 'ascending'), ('data_coleta', 'ascending')]).to_pandas(strings_to_categorical=True)
+
+def _esquema_com_particoes() -> "pa.Schema":
+    # Partições como texto: 'mes=2026-10' não pode virar número nem data na inferência
+    return esquema_historico().append(pa.field('classe', pa.string())).append(pa.field('mes', pa.string()))
+
+def exportar_snapshots(db_file: str = DB_FILE, classe: str = CLASSE_PADRAO, diretorio: str = DIR_PARQUET) -> int:
+    """
+    Carga inicial a partir de 'fii_snapshots' (só as linhas que mudaram em cada instante, como no
+    SQLite), um arquivo por mês. Retorna quantos arquivos gravou.
+    """
+    snapshots = ler_snapshots(db_file=db_file)
+    snapshots['data_coleta'] = snapshots['data_coleta'].dt.floor('s')
+    arquivos = 0
+    for mes, grupo in snapshots.groupby(snapshots['data_coleta'].dt.strftime('%Y-%m'), sort=True):
+        if _gravar_arquivo(grupo, mes, f"snapshots-{mes}", classe, diretorio): arquivos += 1
+    return arquivos
+
+def _arquivos_da_particao(particao: str) -> List[str]:
+    return sorted(os.path.join(particao, n) for n in os.listdir(particao) if n.endswith('.parquet') and not n.startswith('.'))
+
+def compactar_particoes(corte_diario: Data, corte_semanal: Data, diretorio: str = DIR_PARQUET) -> int:
+    """
+    Retenção (ver compactacao.py): os arquivos de cada mês inteiro anterior a 'corte_diario' viram um
+    arquivo 'diario-' com a última coleta de cada ticker por dia (o último valor não nulo de cada
+    coluna, já que a coleta só de preços grava nulos no resto); antes de 'corte_semanal', um arquivo
+    'semanal-' por semana (semana que cruza a virada do mês fica partida nos dois meses). O arquivo
+    novo entra antes de os antigos saírem, e um mês já no formato certo é pulado: rodar de novo não
+    muda nada. Retorna quantas partições foram reescritas.
+    """
+    if not os.path.isdir(diretorio): return 0
+    corte_diario, corte_semanal = pd.Timestamp(corte_diario), pd.Timestamp(corte_semanal)
+    reescritas = 0
+    for pasta_classe in sorted(os.listdir(diretorio)):
+        if not pasta_classe.startswith('classe='): continue
+        for pasta_mes in sorted(os.listdir(os.path.join(diretorio, pasta_classe))):
+            if not pasta_mes.startswith('mes='): continue
+            mes = pasta_mes[len('mes='):]
+            fim_do_mes = pd.Timestamp(f"{mes}-01") + pd.offsets.MonthBegin(1)
+            if fim_do_mes <= corte_semanal: escala, frequencia = 'semanal', 'W-SUN'
+            elif fim_do_mes <= corte_diario: escala, frequencia = 'diario', 'D'
+            else: continue
+            particao = os.path.join(diretorio, pasta_classe, pasta_mes)
+            arquivos = _arquivos_da_particao(particao)
+            if not arquivos or (len(arquivos) == 1 and os.path.basename(arquivos[0]).startswith(f"{escala}-")): continue
+            coletas = pd.concat([pq.read_table(a, schema=esquema_historico()).to_pandas() for a in arquivos], ignore_index=True)
+            coletas = coletas.sort_values(['Ticker', 'data_coleta'], kind='stable')
+            periodo = coletas['data_coleta'].dt.to_period(frequencia).dt.start_time.rename('periodo')
+            ultimas = coletas.groupby(['Ticker', periodo], sort=False).last().reset_index(level='periodo', drop=True).reset_index()
+            novo = _gravar_arquivo(ultimas, mes, f"{escala}-{mes}", pasta_classe[len('classe='):], diretorio)
+            for arquivo in arquivos:
+                if arquivo != novo: os.remove(arquivo)
+            reescritas += 1
+    return reescritas
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Histórico colunar (Parquet) das coletas de FIIs.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=DIR_PARQUET)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("exportar-snapshots", help="Grava o histórico de fii_snapshots (SQLite) no Parquet")
+    args = parser.parse_args(argv)
+
+    if pa is None: raise SystemExit("Instale o pyarrow (pip install pyarrow).")
+    if args.comando == "exportar-snapshots":
+        print(f"[PARQUET] {exportar_snapshots(args.db, diretorio=args.dir)} coletas exportadas para {args.dir}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# --- HISTÓRICO DIÁRIO DE PREÇOS POR TICKER (SQLITE, AGRUPADO POR TICKER) ---
+# Tabela WITHOUT ROWID com chave (Ticker, data): as linhas de um mesmo ticker ficam juntas
+# no disco, então ler a série de um FII é uma varredura contínua e curta.
+# As tabelas são criadas pelas migrações do banco (banco._v6_tabelas_auxiliares).
+
+import sqlite3
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from banco import DB_FILE, inicializar_db
+
+COLUNAS_HISTORICO = ['Ticker', 'data', 'abertura', 'maxima', 'minima', 'fechamento', 'volume', 'negocios', 'fonte']
+FONTE_OFICIAL = "cotahist" # Barras da B3: nenhuma outra fonte sobrescreve
+
+def salvar_historico(df: pd.DataFrame, db_file: str = DB_FILE) -> int:
+    """
+    Grava (ou substitui) as barras diárias do DataFrame. 'data' pode ser datetime ou texto.
+    Barra de FONTE_OFICIAL só é substituída por outra da mesma fonte (backfill não apaga COTAHIST).
+    """
+    if df.empty: return 0
+    df = df.reindex(columns=COLUNAS_HISTORICO)
+    df['data'] = pd.to_datetime(df['data']).dt.strftime('%Y-%m-%d')
+    df['negocios'] = df['negocios'].astype('Int64')
+    linhas = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.executemany(f"""
+        INSERT INTO historico_diario ({', '.join(COLUNAS_HISTORICO)}) VALUES ({', '.join('?' * len(COLUNAS_HISTORICO))})
+        ON CONFLICT (Ticker, data) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUNAS_HISTORICO[2:])}
+        WHERE historico_diario.fonte IS NOT '{FONTE_OFICIAL}' OR excluded.fonte = '{FONTE_OFICIAL}'
+        """, linhas)
+        conn.commit()
+    finally: conn.close()
+    return len(linhas)
+
+def ler_historico(tickers: Optional[List[str]] = None, inicio: Optional[str] = None, fim: Optional[str] = None,
+                  db_file: str = DB_FILE) -> pd.DataFrame:
+    """Série diária filtrada por tickers e intervalo de datas (inclusivo), ordenada por Ticker e data."""
+    filtros, params = [], []
+    if tickers: filtros.append(f"Ticker IN ({', '.join('?' * len(tickers))})"); params += list(tickers)
+    if inicio: filtros.append("data >= ?"); params.append(str(inicio)[:10])
+    if fim: filtros.append("data <= ?"); params.append(str(fim)[:10])
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM historico_diario {where} ORDER BY Ticker, data", conn, params=params)
+    finally: conn.close()
+    df['data'] = pd.to_datetime(df['data'])
+    return df
+
+def ler_manifesto(fonte: str, db_file: str = DB_FILE) -> Dict[str, str]:
+    """{ticker: última data já gravada} para a fonte."""
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        return dict(conn.execute("SELECT Ticker, ultima_data FROM historico_manifesto WHERE fonte = ?", (fonte,)).fetchall())
+    finally: conn.close()
+
+def atualizar_manifesto(ultimas_datas: Dict[str, str], fonte: str, db_file: str = DB_FILE):
+    """Avança a última data por ticker (nunca volta para trás)."""
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.executemany("""
+        INSERT INTO historico_manifesto (Ticker, fonte, ultima_data, atualizado_em) VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (Ticker, fonte) DO UPDATE SET
+            ultima_data = MAX(COALESCE(ultima_data, ''), excluded.ultima_data), atualizado_em = CURRENT_TIMESTAMP
+        """, [(ticker, fonte, str(data)[:10]) for ticker, data in ultimas_datas.items()])
+        conn.commit()
+    finally: conn.close()
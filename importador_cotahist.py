@@ -0,0 +1,125 @@
+# --- IMPORTADOR B3 COTAHIST (SÉRIE HISTÓRICA OFICIAL, SEM GASTAR COTA DA BRAPI) ---
+# Os arquivos COTAHIST_AAAA.TXT têm registros de largura fixa (245 bytes + quebra de linha).
+# O .TXT é mapeado em memória (mmap) e visto como uma matriz NumPy (registros x bytes), sem
+# cópia; os campos são decodificados em blocos vetorizados e só os FIIs (BDI 12, ^[A-Z]{4}11$, mercado
+# à vista) são mantidos. Vários anos são lidos em paralelo, um processo por arquivo.
+#
+# Uso: python importador_cotahist.py COTAHIST_A2022.TXT COTAHIST_A2023.ZIP ... [--processos 4]
+
+import argparse
+import mmap
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from banco import DB_FILE
+from historico_store import FONTE_OFICIAL, salvar_historico
+
+TAMANHO_REGISTRO = 245
+REGISTROS_POR_BLOCO = 500_000
+
+# (início, fim) 0-based, fim exclusivo — layout oficial da B3
+CAMPO_TIPREG = (0, 2)
+CAMPO_DATA = (2, 10)
+CAMPO_CODBDI = (10, 12)
+CAMPO_CODNEG = (12, 24)
+CAMPO_TPMERC = (24, 27)
+CAMPO_PREABE = (56, 69)
+CAMPO_PREMAX = (69, 82)
+CAMPO_PREMIN = (82, 95)
+CAMPO_PREULT = (108, 121)
+CAMPO_TOTNEG = (147, 152)
+CAMPO_VOLTOT = (170, 188)
+
+MERCADO_A_VISTA = b"010"
+BDI_FII = b"12" # Código BDI dos fundos imobiliários (units de ações também terminam em 11)
+
+def _inteiros(bloco: np.ndarray, campo) -> np.ndarray:
+    """Colunas de dígitos ASCII -> int64 (vetorizado: soma dígito * 10^posição)."""
+    digitos = bloco[:, campo[0]:campo[1]].astype(np.int64) - 48
+    potencias = 10 ** np.arange(campo[1] - campo[0] - 1, -1, -1, dtype=np.int64)
+    return digitos @ potencias
+
+def _mascara_fii(bloco: np.ndarray) -> np.ndarray:
+    """Registro de cotação (01), BDI de FII (12), mercado à vista (010) e CODNEG = 4 letras + '11' + brancos."""
+    ini = CAMPO_CODNEG[0]
+    letras = bloco[:, ini:ini + 4]
+    mascara = (bloco[:, 0] == ord('0')) & (bloco[:, 1] == ord('1'))
+    mascara &= np.all(bloco[:, CAMPO_CODBDI[0]:CAMPO_CODBDI[1]] == np.frombuffer(BDI_FII, np.uint8), axis=1)
+    mascara &= np.all(bloco[:, CAMPO_TPMERC[0]:CAMPO_TPMERC[1]] == np.frombuffer(MERCADO_A_VISTA, np.uint8), axis=1)
+    mascara &= np.all((letras >= ord('A')) & (letras <= ord('Z')), axis=1)
+    mascara &= (bloco[:, ini + 4] == ord('1')) & (bloco[:, ini + 5] == ord('1'))
+    mascara &= np.all(bloco[:, ini + 6:CAMPO_CODNEG[1]] == ord(' '), axis=1)
+    return mascara
+
+def decodificar_bloco(bloco: np.ndarray) -> pd.DataFrame:
+    bloco = bloco[_mascara_fii(bloco)]
+    if len(bloco) == 0: return pd.DataFrame()
+    tickers = bloco[:, CAMPO_CODNEG[0]:CAMPO_CODNEG[0] + 6].copy().view('S6').ravel().astype(str)
+    datas = _inteiros(bloco, CAMPO_DATA)
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'data': pd.to_datetime(datas.astype(str), format='%Y%m%d'),
+        'abertura': _inteiros(bloco, CAMPO_PREABE) / 100,
+        'maxima': _inteiros(bloco, CAMPO_PREMAX) / 100,
+        'minima': _inteiros(bloco, CAMPO_PREMIN) / 100,
+        'fechamento': _inteiros(bloco, CAMPO_PREULT) / 100,
+        'volume': _inteiros(bloco, CAMPO_VOLTOT) / 100,
+        'negocios': _inteiros(bloco, CAMPO_TOTNEG),
+    })
+
+def _matriz_registros(buffer) -> np.ndarray:
+    """Vê o buffer como matriz (n_registros, tamanho_linha) sem copiar. Aceita CRLF ou LF."""
+    dados = np.frombuffer(buffer, dtype=np.uint8)
+    fim_linha = int(np.argmax(dados[:TAMANHO_REGISTRO + 2] == ord('\n'))) + 1
+    if fim_linha < TAMANHO_REGISTRO: raise ValueError("Arquivo não parece um COTAHIST (linha curta).")
+    n_registros = len(dados) // fim_linha
+    return dados[:n_registros * fim_linha].reshape(n_registros, fim_linha)
+
+def ler_cotahist(caminho: str, registros_por_bloco: int = REGISTROS_POR_BLOCO) -> pd.DataFrame:
+    """Lê um COTAHIST (.TXT via mmap ou .ZIP em memória) e devolve só os FIIs."""
+    if zipfile.is_zipfile(caminho):
+        # Membro compactado não dá para mapear; lê descompactado direto para a memória
+        with zipfile.ZipFile(caminho) as zf:
+            nome = next(n for n in zf.namelist() if n.upper().endswith('.TXT'))
+            return _decodificar_buffer(zf.read(nome), registros_por_bloco)
+    with open(caminho, 'rb') as arquivo, mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _decodificar_buffer(mm, registros_por_bloco)
+
+def _decodificar_buffer(buffer, registros_por_bloco: int) -> pd.DataFrame:
+    registros = _matriz_registros(buffer)
+    blocos = [decodificar_bloco(registros[i:i + registros_por_bloco])
+              for i in range(0, len(registros), registros_por_bloco)]
+    del registros # Solta a visão do mmap antes de fechá-lo
+    blocos = [b for b in blocos if not b.empty]
+    return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame()
+
+def importar_cotahist(caminhos: List[str], db_file: str = DB_FILE, processos: Optional[int] = None) -> int:
+    """Lê os arquivos em paralelo (um processo por ano) e grava no histórico. Retorna linhas gravadas."""
+    processos = processos or min(len(caminhos), os.cpu_count() or 1)
+    total = 0
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for caminho, df in zip(caminhos, executor.map(ler_cotahist, caminhos)):
+            if df.empty: print(f"[COTAHIST] {caminho}: nenhum FII encontrado."); continue
+            df['fonte'] = FONTE_OFICIAL
+            gravadas = salvar_historico(df, db_file)
+            total += gravadas
+            print(f"[COTAHIST] {caminho}: {gravadas} barras de {df['Ticker'].nunique()} FIIs "
+                  f"({df['data'].min():%d/%m/%Y} a {df['data'].max():%d/%m/%Y}).")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa arquivos COTAHIST da B3 (só FIIs) para o histórico local.")
+    parser.add_argument("arquivos", nargs="+")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+    total = importar_cotahist(args.arquivos, args.db, args.processos)
+    print(f"[COTAHIST] Total: {total} barras gravadas em {args.db}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# --- IMPORTADOR CVM: INFORMES MENSAL E TRIMESTRAL DE FIIs ---
+# Mensal (P/VP calculado localmente): o priceToBook da Brapi vem NULL com frequência. O informe
+# mensal da CVM traz, por fundo, o patrimônio líquido e as cotas emitidas; com isso o VP por cota
+# fica guardado no SQLite e o P/VP sai de uma divisão vetorizada (Preco_Atual / VP_Cota) na hora
+# de carregar o app.
+#
+# Os CSVs (';', latin-1) são lidos em blocos direto de dentro do zip, sem extrair nada.
+# CNPJ -> ticker vem do ISIN da cota: BRHGLGCTF004 -> HGLG11.
+#
+# Trimestral (carteira): imóveis (área, vacância, % das receitas) e inquilinos por setor viram
+# tabelas de fatos por (fundo, trimestre). A importação é incremental: (CNPJ, trimestre) já
+# carregados com a mesma versão são pulados ainda no bloco do CSV. No fim, a tabela
+# 'cvm_trim_ultimo' (uma linha por ticker) é reconstruída para o app só fazer um JOIN barato.
+# As tabelas são criadas pelas migrações do banco (banco._v6_tabelas_auxiliares).
+#
+# Uso: python importador_cvm.py mensal inf_mensal_fii_2024.zip [...]
+#      python importador_cvm.py trimestral inf_trimestral_fii_2024.zip [...]
+# Arquivos: https://dados.cvm.gov.br/dados/FII/DOC/INF_MENSAL/DADOS/ e .../INF_TRIMESTRAL/DADOS/
+
+import argparse
+import re
+import sqlite3
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from banco import DB_FILE, inicializar_db
+
+LINHAS_POR_BLOCO = 50_000
+COLUNAS_CNPJ = ('CNPJ_Fundo_Classe', 'CNPJ_Fundo') # O nome mudou a partir de 2024
+
+def _numerico(serie: pd.Series) -> pd.Series:
+    return pd.to_numeric(serie, errors='coerce')
+
+def _linhas_sql(df: pd.DataFrame):
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def ticker_do_isin(isin: pd.Series) -> pd.Series:
+    """ISIN de cota de FII ('BR' + 4 letras + 'CTF' ...) -> ticker com sufixo 11 (vetorizado)."""
+    isin = isin.fillna('').str.strip().str.upper()
+    return (isin.str.slice(2, 6) + '11').where(isin.str.match(r'^BR[A-Z]{4}CTF'))
+
+def ler_csv_do_zip(zf: zipfile.ZipFile, tabela: str, colunas: Sequence[str],
+                   linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[pd.DataFrame]:
+    """Blocos do CSV '..._<tabela>_AAAA.csv', só com as 'colunas' pedidas (as ausentes são ignoradas)."""
+    padrao = re.compile(rf'_{tabela}_\d{{4}}\.csv$', re.IGNORECASE)
+    nomes = [n for n in zf.namelist() if padrao.search(n)]
+    for nome in nomes:
+        with zf.open(nome) as arquivo:
+            yield from pd.read_csv(arquivo, sep=';', encoding='latin-1', dtype=str, chunksize=linhas_por_bloco,
+                                   usecols=lambda c: c in colunas)
+
+def _padronizar_cnpj(bloco: pd.DataFrame) -> pd.DataFrame:
+    coluna = next(c for c in COLUNAS_CNPJ if c in bloco.columns)
+    return bloco.rename(columns={coluna: 'CNPJ'})
+
+def _ultima_versao(df: pd.DataFrame) -> pd.DataFrame:
+    """Reenvios do mesmo mês: fica só a maior 'Versao' de cada (CNPJ, Data_Referencia)."""
+    if 'Versao' not in df.columns: return df.drop_duplicates(['CNPJ', 'Data_Referencia'], keep='last')
+    df['Versao'] = pd.to_numeric(df['Versao'], errors='coerce')
+    return df.sort_values('Versao').drop_duplicates(['CNPJ', 'Data_Referencia'], keep='last').drop(columns='Versao')
+
+def ler_informe_mensal(caminho_zip: str) -> pd.DataFrame:
+    """Um zip anual do informe mensal -> (CNPJ, data_referencia, Ticker, PL, cotas, VP_Cota)."""
+    with zipfile.ZipFile(caminho_zip) as zf:
+        geral = pd.concat([_padronizar_cnpj(b) for b in ler_csv_do_zip(
+            zf, 'geral', COLUNAS_CNPJ + ('Data_Referencia', 'Versao', 'Codigo_ISIN'))], ignore_index=True)
+        complemento = pd.concat([_padronizar_cnpj(b) for b in ler_csv_do_zip(
+            zf, 'complemento', COLUNAS_CNPJ + ('Data_Referencia', 'Versao', 'Patrimonio_Liquido',
+                                                 'Cotas_Emitidas', 'Valor_Patrimonial_Cotas'))], ignore_index=True)
+
+    geral = _ultima_versao(geral)
+    complemento = _ultima_versao(complemento)
+    df = complemento.merge(geral[['CNPJ', 'Data_Referencia', 'Codigo_ISIN']], on=['CNPJ', 'Data_Referencia'], how='left')
+
+    df['Ticker'] = ticker_do_isin(df['Codigo_ISIN'])
+    pl = pd.to_numeric(df['Patrimonio_Liquido'], errors='coerce')
+    cotas = pd.to_numeric(df['Cotas_Emitidas'], errors='coerce')
+    vp_informado = pd.to_numeric(df.get('Valor_Patrimonial_Cotas'), errors='coerce')
+    vp_calculado = pl / cotas.where(cotas > 0)
+    return pd.DataFrame({
+        'CNPJ': df['CNPJ'].str.replace(r'\D', '', regex=True),
+        'data_referencia': pd.to_datetime(df['Data_Referencia'], errors='coerce').dt.strftime('%Y-%m-%d'),
+        'Ticker': df['Ticker'],
+        'patrimonio_liquido': pl,
+        'cotas_emitidas': cotas,
+        'VP_Cota': vp_informado.where(vp_informado > 0, vp_calculado),
+    }).dropna(subset=['data_referencia'])
+
+def importar_informe_mensal(caminhos: List[str], db_file: str = DB_FILE) -> int:
+    total = 0
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        for caminho in caminhos:
+            df = ler_informe_mensal(caminho)
+            linhas = list(_linhas_sql(df))
+            conn.executemany("""
+            REPLACE INTO cvm_informe_mensal (CNPJ, data_referencia, Ticker, patrimonio_liquido, cotas_emitidas, VP_Cota)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, linhas)
+            conn.commit()
+            total += len(linhas)
+            print(f"[CVM] {caminho}: {len(linhas)} informes mensais ({df['Ticker'].notna().sum()} com ticker).")
+        _reconstruir_ultimo(conn); conn.commit() # O CNPJ -> ticker do trimestral vem daqui
+    finally: conn.close()
+    return total
+
+def ler_vp_por_cota(conn: sqlite3.Connection) -> pd.Series:
+    """VP por cota do informe mais recente de cada ticker (Series indexada por Ticker)."""
+    df = pd.read_sql_query("""
+    SELECT m.Ticker, m.VP_Cota FROM cvm_informe_mensal m
+    JOIN (SELECT Ticker, MAX(data_referencia) AS data_referencia FROM cvm_informe_mensal
+          WHERE Ticker IS NOT NULL AND VP_Cota > 0 GROUP BY Ticker) u
+      ON u.Ticker = m.Ticker AND u.data_referencia = m.data_referencia
+    WHERE m.VP_Cota > 0
+    """, conn)
+    return df.drop_duplicates('Ticker', keep='last').set_index('Ticker')['VP_Cota']
+
+def calcular_pvp_local(df: pd.DataFrame, vp_cota: pd.Series) -> pd.Series:
+    """P/VP = Preco_Atual / VP_Cota da CVM para todos os FIIs de uma vez (NaN sem informe)."""
+    return df['Preco_Atual'] / df['Ticker'].map(vp_cota).astype('float64') # Ticker pode ser categórico
+
+def _blocos_novos(zf: zipfile.ZipFile, tabela: str, colunas: Sequence[str], versoes_carregadas: pd.Series) -> pd.DataFrame:
+    """Lê a tabela em blocos e já descarta (CNPJ, trimestre) com versão igual ou menor à carregada."""
+    novos = []
+    for bloco in ler_csv_do_zip(zf, tabela, COLUNAS_CNPJ + ('Data_Referencia', 'Versao') + tuple(colunas)):
+        bloco = _padronizar_cnpj(bloco).reindex(columns=['CNPJ', 'Data_Referencia', 'Versao', *colunas])
+        bloco['CNPJ'] = bloco['CNPJ'].str.replace(r'\D', '', regex=True)
+        bloco['Data_Referencia'] = pd.to_datetime(bloco['Data_Referencia'], errors='coerce').dt.strftime('%Y-%m-%d')
+        bloco['Versao'] = pd.to_numeric(bloco['Versao'], errors='coerce').fillna(1).astype(int)
+        ja_carregada = versoes_carregadas.reindex(pd.MultiIndex.from_frame(bloco[['CNPJ', 'Data_Referencia']])).to_numpy()
+        bloco = bloco[~(bloco['Versao'].to_numpy() <= ja_carregada)] # NaN (nunca carregado) passa
+        if not bloco.empty: novos.append(bloco)
+    if not novos: return pd.DataFrame(columns=['CNPJ', 'Data_Referencia', 'Versao', *colunas])
+    df = pd.concat(novos, ignore_index=True)
+    # Tabelas com várias linhas por informe: mantém todas as linhas da maior versão
+    maior_versao = df.groupby(['CNPJ', 'Data_Referencia'])['Versao'].transform('max')
+    return df[df['Versao'] == maior_versao]
+
+def ler_informe_trimestral(caminho_zip: str, carregados: Optional[Dict[tuple, int]] = None):
+    """Um zip anual do informe trimestral -> (imoveis, inquilinos) só dos (fundo, trimestre) novos."""
+    versoes = pd.Series(carregados or {}, dtype='float64')
+    if versoes.empty: versoes.index = pd.MultiIndex.from_tuples([], names=['CNPJ', 'Data_Referencia'])
+    with zipfile.ZipFile(caminho_zip) as zf:
+        imoveis = _blocos_novos(zf, 'imovel', ('Nome_Imovel', 'Classe', 'Area', 'Percentual_Vacancia',
+                                               'Percentual_Inadimplencia', 'Percentual_Receitas_FII'), versoes)
+        inquilinos = _blocos_novos(zf, 'inquilino', ('Setor_Atuacao', 'Percentual_Receitas_FII'), versoes)
+
+    imoveis = pd.DataFrame({
+        'CNPJ': imoveis['CNPJ'], 'data_referencia': imoveis['Data_Referencia'], 'versao': imoveis['Versao'],
+        'seq': imoveis.groupby(['CNPJ', 'Data_Referencia']).cumcount(),
+        'nome_imovel': imoveis['Nome_Imovel'], 'classe': imoveis['Classe'],
+        'area': _numerico(imoveis['Area']), 'vacancia': _numerico(imoveis['Percentual_Vacancia']),
+        'inadimplencia': _numerico(imoveis['Percentual_Inadimplencia']),
+        'pct_receitas_fii': _numerico(imoveis['Percentual_Receitas_FII']),
+    })
+    inquilinos = (inquilinos.assign(pct_receitas_fii=_numerico(inquilinos['Percentual_Receitas_FII']),
+                                    setor=inquilinos['Setor_Atuacao'].fillna('Não informado').str.strip())
+                  .groupby(['CNPJ', 'Data_Referencia', 'Versao', 'setor'], as_index=False)['pct_receitas_fii'].sum()
+                  .rename(columns={'Data_Referencia': 'data_referencia', 'Versao': 'versao'})
+                  [['CNPJ', 'data_referencia', 'versao', 'setor', 'pct_receitas_fii']])
+    return imoveis, inquilinos
+
+def _reconstruir_ultimo(conn: sqlite3.Connection):
+    """Recalcula 'cvm_trim_ultimo' a partir do trimestre mais recente de cada fundo."""
+    conn.execute("DELETE FROM cvm_trim_ultimo")
+    conn.execute("""
+    WITH ultimo AS (
+        SELECT CNPJ, MAX(data_referencia) AS data_referencia FROM cvm_trim_carregados GROUP BY CNPJ
+    ), tickers AS (
+        SELECT m.CNPJ, m.Ticker FROM cvm_informe_mensal m
+        JOIN (SELECT CNPJ, MAX(data_referencia) AS d FROM cvm_informe_mensal WHERE Ticker IS NOT NULL GROUP BY CNPJ) u
+          ON u.CNPJ = m.CNPJ AND u.d = m.data_referencia
+    ), imoveis AS (
+        SELECT i.CNPJ, COUNT(*) AS qtd,
+               COALESCE(SUM(i.vacancia * i.area) / NULLIF(SUM(CASE WHEN i.vacancia IS NOT NULL THEN i.area END), 0),
+                        AVG(i.vacancia)) AS vacancia
+        FROM cvm_trim_imoveis i JOIN ultimo u ON u.CNPJ = i.CNPJ AND u.data_referencia = i.data_referencia
+        GROUP BY i.CNPJ
+    ), inquilinos AS (
+        SELECT q.CNPJ, MAX(q.pct_receitas_fii) AS concentracao
+        FROM cvm_trim_inquilinos q JOIN ultimo u ON u.CNPJ = q.CNPJ AND u.data_referencia = q.data_referencia
+        GROUP BY q.CNPJ
+    )
+    INSERT OR REPLACE INTO cvm_trim_ultimo (Ticker, CNPJ, data_referencia, Vacancia_CVM, Qtd_Imoveis_CVM, Concentracao_Inquilinos)
+    SELECT t.Ticker, u.CNPJ, u.data_referencia, im.vacancia, im.qtd, iq.concentracao
+    FROM ultimo u JOIN tickers t ON t.CNPJ = u.CNPJ
+    LEFT JOIN imoveis im ON im.CNPJ = u.CNPJ
+    LEFT JOIN inquilinos iq ON iq.CNPJ = u.CNPJ
+    """)
+
+def importar_informe_trimestral(caminhos: List[str], db_file: str = DB_FILE) -> int:
+    """Importa só os (fundo, trimestre) novos ou reenviados. Retorna quantos informes entraram."""
+    total = 0
+    inicializar_db(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        for caminho in caminhos:
+            carregados = {(c, d): v for c, d, v in conn.execute("SELECT CNPJ, data_referencia, versao FROM cvm_trim_carregados")}
+            imoveis, inquilinos = ler_informe_trimestral(caminho, carregados)
+            informes = pd.concat([imoveis[['CNPJ', 'data_referencia', 'versao']],
+                                  inquilinos[['CNPJ', 'data_referencia', 'versao']]]).drop_duplicates(['CNPJ', 'data_referencia'])
+            if informes.empty: print(f"[CVM] {caminho}: nenhum trimestre novo."); continue
+
+            chaves = list(informes[['CNPJ', 'data_referencia']].itertuples(index=False, name=None))
+            conn.executemany("DELETE FROM cvm_trim_imoveis WHERE CNPJ = ? AND data_referencia = ?", chaves)
+            conn.executemany("DELETE FROM cvm_trim_inquilinos WHERE CNPJ = ? AND data_referencia = ?", chaves)
+            imoveis = imoveis.drop(columns='versao'); inquilinos = inquilinos.drop(columns='versao')
+            conn.executemany(f"INSERT INTO cvm_trim_imoveis ({', '.join(imoveis.columns)}) VALUES ({', '.join('?' * len(imoveis.columns))})",
+                             _linhas_sql(imoveis))
+            conn.executemany(f"INSERT INTO cvm_trim_inquilinos ({', '.join(inquilinos.columns)}) VALUES ({', '.join('?' * len(inquilinos.columns))})",
+                             _linhas_sql(inquilinos))
+            conn.executemany("REPLACE INTO cvm_trim_carregados (CNPJ, data_referencia, versao) VALUES (?, ?, ?)",
+                             informes.astype(object).itertuples(index=False, name=None))
+            conn.commit()
+            total += len(informes)
+            print(f"[CVM] {caminho}: {len(informes)} informes trimestrais novos ({len(imoveis)} imóveis).")
+        _reconstruir_ultimo(conn); conn.commit()
+    finally: conn.close()
+    return total
+
+def ler_indicadores_trimestrais(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Vacância, nº de imóveis e concentração de inquilinos mais recentes (indexado por Ticker)."""
+    return pd.read_sql_query("SELECT Ticker, Vacancia_CVM, Qtd_Imoveis_CVM, Concentracao_Inquilinos FROM cvm_trim_ultimo",
+                             conn, index_col='Ticker',
+                             dtype={'Vacancia_CVM': 'float64', 'Qtd_Imoveis_CVM': 'Int64', 'Concentracao_Inquilinos': 'float64'})
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Importa os dados abertos de FIIs da CVM para o SQLite local.")
+    parser.add_argument("--db", default=DB_FILE)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_mensal = sub.add_parser("mensal", help="Informe mensal (PL e cotas -> VP por cota)")
+    p_mensal.add_argument("arquivos", nargs="+")
+    p_trim = sub.add_parser("trimestral", help="Informe trimestral (imóveis, vacância, inquilinos), só trimestres novos")
+    p_trim.add_argument("arquivos", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.comando == "mensal":
+        total = importar_informe_mensal(args.arquivos, args.db)
+        print(f"[CVM] Total: {total} informes mensais gravados em {args.db}.")
+    elif args.comando == "trimestral":
+        total = importar_informe_trimestral(args.arquivos, args.db)
+        print(f"[CVM] Total: {total} informes trimestrais novos gravados em {args.db}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# --- INGESTÃO DISTRIBUÍDA: SHARDS POR HASH CONSISTENTE + WORKERS COM LEASE (SQLITE) ---
+# O coordenador divide o universo de tickers em shards (anel de hash consistente) e grava
+# uma "rodada" no SQLite. Qualquer número de workers (processos ou máquinas que enxergam o
+# mesmo arquivo) pega shards por lease, busca na Brapi e grava em 'fiis'. Worker que morre
+# para de renovar o lease e o shard volta para a fila.
+#
+# Uso:
+#   python ingestao_distribuida.py coordenar --shards 16
+#   python ingestao_distribuida.py worker            (rode quantos quiser, em paralelo)
+#   python ingestao_distribuida.py status
+# A chave da API vem da variável de ambiente BRAPI_API_KEY.
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Tuple, Optional
+
+from banco import DB_FILE, conexoes, inicializar_db, salvar_dados_fiis
+from brapi_cliente import buscar_lista_fundos, buscar_lotes_quote, montar_linhas_fiis
+
+LEASE_SEGUNDOS = 120 # Sem renovar nesse tempo, o shard é considerado abandonado
+HEARTBEAT_SEGUNDOS = 30
+MAX_TENTATIVAS_SHARD = 3
+
+def _hash(chave: str) -> int:
+    return int.from_bytes(hashlib.md5(chave.encode()).digest()[:8], 'big')
+
+class AnelConsistente:
+    """Anel de hash consistente com nós virtuais: o shard de um ticker não muda entre rodadas."""
+
+    def __init__(self, n_shards: int, nos_virtuais: int = 64):
+        self.n_shards = n_shards
+        pontos = sorted((_hash(f"shard-{s}#{v}"), s) for s in range(n_shards) for v in range(nos_virtuais))
+        self._posicoes = [p for p, _ in pontos]
+        self._shards = [s for _, s in pontos]
+
+    def shard_de(self, ticker: str) -> int:
+        i = bisect.bisect(self._posicoes, _hash(ticker)) % len(self._posicoes)
+        return self._shards[i]
+
+    def particionar(self, tickers: List[str]) -> Dict[int, List[str]]:
+        shards: Dict[int, List[str]] = {}
+        for t in tickers: shards.setdefault(self.shard_de(t), []).append(t)
+        return shards
+
+class Coordenador:
+    """
+    Estado das rodadas/shards/workers no SQLite (tabelas de banco._v8_ingestao). Cada troca de
+    estado é uma transação BEGIN IMMEDIATE na conexão de escrita compartilhada.
+    """
+
+    def __init__(self, db_file: str = DB_FILE):
+        self.db_file = db_file
+        inicializar_db(db_file)
+
+    @contextmanager
+    def _transacao(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE: o lock de escrita é pego já no início, então ler o estado e trocá-lo é atômico
+        # também entre processos (o BEGIN implícito do sqlite3 só pegaria o lock no primeiro UPDATE)
+        with conexoes(self.db_file).escrita() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def criar_rodada(self, tickers_com_setor: List[Tuple[str, str]], n_shards: int) -> int:
+        setor_map = dict(tickers_com_setor)
+        particoes = AnelConsistente(n_shards).particionar(list(setor_map))
+        with self._transacao() as conn:
+            rodada = conn.execute("INSERT INTO ingestao_rodadas (criada_em) VALUES (?)", (time.time(),)).lastrowid
+            conn.executemany("INSERT INTO ingestao_shards (rodada, shard, tickers) VALUES (?, ?, ?)",
+                             [(rodada, s, json.dumps({t: setor_map[t] for t in ts})) for s, ts in particoes.items()])
+        print(f"[COORDENADOR] Rodada {rodada}: {len(setor_map)} tickers em {len(particoes)} shards.")
+        return rodada
+
+    def arrendar_shard(self, worker: str, lease_segundos: float = LEASE_SEGUNDOS) -> Optional[Tuple[int, int, Dict[str, str]]]:
+        """Pega o próximo shard livre (ou abandonado). Retorna (rodada, shard, {ticker: setor}) ou None."""
+        agora = time.time()
+        with self._transacao() as conn:
+            # Lease vencido = worker morto: devolve para a fila (ou marca falha depois de N tentativas)
+            conn.execute("""
+            UPDATE ingestao_shards SET status = CASE WHEN tentativas >= ? THEN 'falhou' ELSE 'pendente' END, worker = NULL
+            WHERE status = 'em_andamento' AND lease_ate < ?
+            """, (MAX_TENTATIVAS_SHARD, agora))
+            fechadas = self._fechar_rodadas(conn)
+            linha = conn.execute("""
+            SELECT rodada, shard, tickers FROM ingestao_shards WHERE status = 'pendente'
+            ORDER BY rodada, shard LIMIT 1
+            """).fetchone()
+            if linha:
+                conn.execute("""
+                UPDATE ingestao_shards SET status = 'em_andamento', worker = ?, lease_ate = ?, tentativas = tentativas + 1
+                WHERE rodada = ? AND shard = ?
+                """, (worker, agora + lease_segundos, linha[0], linha[1]))
+            self._heartbeat(conn, worker, agora)
+        self._relatar_fechadas(fechadas)
+        if not linha: return None
+        return linha[0], linha[1], json.loads(linha[2])
+
+    def _fechar_rodadas(self, conn: sqlite3.Connection) -> List[Tuple[int, int]]:
+        """
+        Fecha as rodadas abertas sem shard 'pendente' ou 'em_andamento' (todos concluídos ou falhos).
+        Roda dentro da transação de quem mudou o status. Retorna [(rodada, shards que falharam)].
+        """
+        fechadas = conn.execute("""
+        SELECT r.id, (SELECT COUNT(*) FROM ingestao_shards s WHERE s.rodada = r.id AND s.status = 'falhou')
+        FROM ingestao_rodadas r
+        WHERE r.concluida_em IS NULL AND NOT EXISTS (
+            SELECT 1 FROM ingestao_shards s WHERE s.rodada = r.id AND s.status IN ('pendente', 'em_andamento'))
+        """).fetchall()
+        conn.executemany("UPDATE ingestao_rodadas SET concluida_em = ? WHERE id = ?", [(time.time(), r) for r, _ in fechadas])
+        return fechadas
+
+    def _relatar_fechadas(self, fechadas: List[Tuple[int, int]]):
+        for rodada, falhas in fechadas:
+            print(f"[COORDENADOR] Rodada {rodada} encerrada" + (f" com {falhas} shards que falharam." if falhas else "."))
+
+    def _heartbeat(self, conn: sqlite3.Connection, worker: str, agora: float):
+        conn.execute("""
+        INSERT INTO ingestao_workers (worker, heartbeat) VALUES (?, ?)
+        ON CONFLICT(worker) DO UPDATE SET heartbeat = excluded.heartbeat
+        """, (worker, agora))
+
+    def renovar_lease(self, worker: str, lease_segundos: float = LEASE_SEGUNDOS):
+        agora = time.time()
+        with self._transacao() as conn:
+            conn.execute("UPDATE ingestao_shards SET lease_ate = ? WHERE worker = ? AND status = 'em_andamento'",
+                         (agora + lease_segundos, worker))
+            self._heartbeat(conn, worker, agora)
+
+    def concluir_shard(self, rodada: int, shard: int, worker: str, linhas: int) -> bool:
+        """Marca o shard como concluído. Retorna False se o lease já tinha sido perdido para outro worker."""
+        with self._transacao() as conn:
+            cur = conn.execute("""
+            UPDATE ingestao_shards SET status = 'concluido', linhas = ?, lease_ate = NULL
+            WHERE rodada = ? AND shard = ? AND worker = ? AND status = 'em_andamento'
+            """, (linhas, rodada, shard, worker))
+            ok, fechadas = cur.rowcount == 1, []
+            if ok:
+                conn.execute("UPDATE ingestao_workers SET shards_concluidos = shards_concluidos + 1 WHERE worker = ?", (worker,))
+                fechadas = self._fechar_rodadas(conn)
+        self._relatar_fechadas(fechadas)
+        return ok
+
+    def devolver_shard(self, rodada: int, shard: int, worker: str):
+        """Worker vivo que falhou: libera o shard na hora, sem esperar o lease vencer."""
+        with self._transacao() as conn:
+            conn.execute("""
+            UPDATE ingestao_shards SET status = CASE WHEN tentativas >= ? THEN 'falhou' ELSE 'pendente' END,
+                   worker = NULL, lease_ate = NULL
+            WHERE rodada = ? AND shard = ? AND worker = ? AND status = 'em_andamento'
+            """, (MAX_TENTATIVAS_SHARD, rodada, shard, worker))
+            fechadas = self._fechar_rodadas(conn) # O último shard pode ter virado 'falhou'
+        self._relatar_fechadas(fechadas)
+
+    def status(self) -> List[Tuple]:
+        with conexoes(self.db_file).leitura() as conn:
+            return conn.execute("""
+            SELECT rodada, status, COUNT(*), COALESCE(SUM(linhas), 0) FROM ingestao_shards
+            WHERE rodada = (SELECT MAX(id) FROM ingestao_rodadas) GROUP BY rodada, status
+            """).fetchall()
+
+def executar_worker(api_key: str, db_file: str = DB_FILE, worker: Optional[str] = None,
+                    tamanho_lote: int = 10, sair_quando_vazio: bool = True, espera_segundos: float = 5) -> int:
+    """Loop do worker: arrenda shard, busca na Brapi, grava em 'fiis', reporta. Retorna shards concluídos."""
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    coordenador = Coordenador(db_file)
+    concluidos = 0
+
+    parar_heartbeat = threading.Event()
+    def heartbeat():
+        while not parar_heartbeat.wait(HEARTBEAT_SEGUNDOS):
+            try: coordenador.renovar_lease(worker)
+            except sqlite3.Error as e: print(f"[WORKER {worker}] Falha no heartbeat: {e}")
+    threading.Thread(target=heartbeat, name="heartbeat-ingestao", daemon=True).start()
+
+    try:
+        while True:
+            arrendado = coordenador.arrendar_shard(worker)
+            if arrendado is None:
+                if sair_quando_vazio: break
+                time.sleep(espera_segundos); continue
+
+            rodada, shard, setor_map = arrendado
+            try:
+                resultados, erros_lote = buscar_lotes_quote(api_key, list(setor_map), tamanho_lote)
+                dados_para_db = montar_linhas_fiis(resultados, setor_map)
+                if dados_para_db: salvar_dados_fiis(dados_para_db, db_file)
+            except Exception as e:
+                print(f"[WORKER {worker}] Shard {shard} (rodada {rodada}) falhou: {e}")
+                coordenador.devolver_shard(rodada, shard, worker); continue
+
+            if coordenador.concluir_shard(rodada, shard, worker, len(dados_para_db)):
+                concluidos += 1
+                print(f"[WORKER {worker}] Shard {shard} (rodada {rodada}): {len(dados_para_db)} FIIs, {erros_lote} lotes com erro.")
+            else: print(f"[WORKER {worker}] Shard {shard} perdeu o lease antes de concluir (já reatribuído).")
+    finally: parar_heartbeat.set()
+    return concluidos
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão distribuída da Brapi por shards.")
+    parser.add_argument("--db", default=DB_FILE)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_coord = sub.add_parser("coordenar", help="Cria uma nova rodada com a lista atual de FIIs")
+    p_coord.add_argument("--shards", type=int, default=16)
+    p_worker = sub.add_parser("worker", help="Processa shards até a fila esvaziar")
+    p_worker.add_argument("--id", default=None)
+    p_worker.add_argument("--continuo", action="store_true", help="Fica esperando novas rodadas")
+    sub.add_parser("status", help="Resumo da última rodada")
+    args = parser.parse_args()
+
+    if args.comando == "status":
+        for rodada, status, shards, linhas in Coordenador(args.db).status():
+            print(f"Rodada {rodada}: {shards} shards '{status}' ({linhas} FIIs gravados)")
+        return
+
+    api_key = os.environ.get("BRAPI_API_KEY")
+    if not api_key: raise SystemExit("Defina a variável de ambiente BRAPI_API_KEY.")
+    if args.comando == "coordenar":
+        itens_lista = buscar_lista_fundos(api_key)
+        Coordenador(args.db).criar_rodada([(i['stock'], i.get('sector', "Desconhecido")) for i in itens_lista], args.shards)
+    elif args.comando == "worker":
+        executar_worker(api_key, args.db, args.id, sair_quando_vazio=not args.continuo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# --- MICRO-LOTES: JUNTA PEDIDOS DE 1 TICKER (DE TODAS AS SESSÕES) EM 1 CHAMADA /quote ---
+
+import time
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Callable
+
+from brapi_cliente import buscar_lote_quote
+
+class MicroLoteBrapi:
+    """
+    Serviço compartilhado: cada sessão pede 1 ticker com solicitar(); durante 'janela_segundos'
+    os pedidos se acumulam e saem juntos em um único /quote/{t1,...,tN} (até 'tamanho_lote').
+    O resultado de cada símbolo volta para quem pediu. Pedidos repetidos do mesmo ticker
+    na mesma janela compartilham a mesma resposta.
+    """
+
+    def __init__(self, api_key: str, tamanho_lote: int = 10, janela_segundos: float = 0.05,
+                 buscar: Optional[Callable[[List[str]], List[Dict]]] = None):
+        self.tamanho_lote = tamanho_lote
+        self.janela_segundos = janela_segundos
+        self._buscar = buscar or (lambda tickers: buscar_lote_quote(api_key, tickers))
+        self._pendentes: Dict[str, Future] = {} # Ordem de chegada (dict preserva)
+        self._primeiro_pedido = 0.0
+        self._cond = threading.Condition()
+        self.chamadas_api = 0
+        self.pedidos_atendidos = 0
+        self._thread = threading.Thread(target=self._loop, name="micro-lote-brapi", daemon=True)
+        self._thread.start()
+
+    def solicitar_futuro(self, ticker: str) -> Future:
+        ticker = ticker.strip().upper()
+        with self._cond:
+            futuro = self._pendentes.get(ticker)
+            if futuro is None:
+                futuro = Future()
+                if not self._pendentes: self._primeiro_pedido = time.monotonic()
+                self._pendentes[ticker] = futuro
+                self._cond.notify()
+            return futuro
+
+    def solicitar(self, ticker: str, timeout: float = 60) -> Optional[Dict]:
+        """Bloqueia até o lote sair. Retorna o 'result' da Brapi para o ticker (ou None se não veio)."""
+        return self.solicitar_futuro(ticker).result(timeout=timeout)
+
+    def solicitar_varios(self, tickers: List[str], timeout: float = 60) -> Dict[str, Optional[Dict]]:
+        futuros = {t.strip().upper(): self.solicitar_futuro(t) for t in tickers}
+        return {t: f.result(timeout=timeout) for t, f in futuros.items()}
+
+    def _proximo_lote(self) -> Dict[str, Future]:
+        with self._cond:
+            while not self._pendentes: self._cond.wait()
+            # Espera a janela fechar, a não ser que o lote já esteja cheio
+            while len(self._pendentes) < self.tamanho_lote:
+                restante = self._primeiro_pedido + self.janela_segundos - time.monotonic()
+                if restante <= 0: break
+                self._cond.wait(timeout=restante)
+            tickers = list(self._pendentes)[:self.tamanho_lote]
+            lote = {t: self._pendentes.pop(t) for t in tickers}
+            # O que sobrou já esperou a janela: sai na próxima volta sem nova espera
+            return lote
+
+    def _loop(self) -> None:
+        while True:
+            lote = self._proximo_lote()
+            try:
+                self.chamadas_api += 1
+                resultados = self._buscar(list(lote))
+                por_simbolo = {r.get('symbol'): r for r in resultados if isinstance(r, dict)}
+                for ticker, futuro in lote.items(): futuro.set_result(por_simbolo.get(ticker))
+                self.pedidos_atendidos += len(lote)
+            except Exception as e:
+                print(f"[MICRO-LOTE] Falha no lote {list(lote)}: {e}")
+                for futuro in lote.values(): futuro.set_exception(e)
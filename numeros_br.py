@@ -0,0 +1,89 @@
+# --- DECODIFICADOR VETORIZADO DE NÚMEROS NO FORMATO BRASILEIRO ---
+# '1.234,56', '12,5%', 'R$ 1.234', '-3,2 %', '-', 'N/A', '' -> float64 (NaN quando não há dígitos).
+# Em vez de cirurgia de string célula a célula, os textos viram uma matriz de bytes
+# (valores x caracteres) e tudo é feito com operações NumPy sobre a matriz inteira:
+#   - só dígitos contam; pontos (milhar), 'R$', '%' e espaços são ignorados;
+#   - a última vírgula separa as casas decimais; sem vírgula, um único ponto seguido de 1 ou 2
+#     dígitos também ('0.98', '12.5%' de JSON/atributos em formato en-US);
+#   - '-' antes do primeiro dígito deixa o número negativo;
+#   - sem nenhum dígito ('-', 'N/A', '') é nulo.
+# Fora esse caso o ponto é milhar ('1.234' vira 1234). Células que já são números passam direto.
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SEPARADOR = b'\x1f' # Separador de valores no buffer (não aparece em texto raspado)
+_ZERO, _NOVE, _VIRGULA, _PONTO, _MENOS, _ESPACO = ord('0'), ord('9'), ord(','), ord('.'), ord('-'), ord(' ')
+
+def _matriz_de_bytes(buffer: bytes, separador: bytes) -> np.ndarray:
+    """Buffer 'v1<sep>v2<sep>...' -> matriz uint8 (n_valores, maior_tamanho), completada com espaços."""
+    dados = np.frombuffer(buffer, dtype=np.uint8)
+    fins = np.append(np.flatnonzero(dados == separador[0]), len(dados))
+    inicios = np.concatenate(([0], fins[:-1] + 1))
+    tamanhos = fins - inicios
+    largura = max(int(tamanhos.max()), 1)
+    if len(dados) == 0: return np.full((len(inicios), largura), _ESPACO, dtype=np.uint8)
+    colunas = np.arange(largura)
+    posicoes = np.minimum(inicios[:, None] + colunas, len(dados) - 1)
+    return np.where(colunas < tamanhos[:, None], dados[posicoes], _ESPACO).astype(np.uint8)
+
+def decodificar_matriz(matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Matriz de bytes (uma linha por valor) -> (valores float64, máscara de nulos)."""
+    colunas = np.arange(matriz.shape[1])
+    digito = (matriz >= _ZERO) & (matriz <= _NOVE)
+    n_digitos = digito.sum(axis=1)
+    nulos = n_digitos == 0
+
+    # Casa de cada dígito = quantos dígitos vêm depois dele na mesma linha
+    casas = np.cumsum(digito[:, ::-1], axis=1)[:, ::-1] - digito
+    inteiro = np.where(digito, (matriz.astype(np.int64) - _ZERO) * 10.0 ** casas, 0.0).sum(axis=1)
+
+    virgula = matriz == _VIRGULA
+    tem_virgula = virgula.any(axis=1)
+    separador = np.where(tem_virgula, matriz.shape[1] - 1 - np.argmax(virgula[:, ::-1], axis=1), matriz.shape[1])
+
+    # Sem vírgula: ponto único com 1 ou 2 dígitos depois é decimal, não milhar
+    ponto = matriz == _PONTO
+    posicao_ponto = np.argmax(ponto, axis=1)
+    digitos_apos_ponto = (digito & (colunas > posicao_ponto[:, None])).sum(axis=1)
+    ponto_decimal = ~tem_virgula & (ponto.sum(axis=1) == 1) & (digitos_apos_ponto >= 1) & (digitos_apos_ponto <= 2)
+    separador = np.where(ponto_decimal, posicao_ponto, separador)
+    decimais = (digito & (colunas > separador[:, None])).sum(axis=1)
+
+    primeiro_digito = np.argmax(digito, axis=1)
+    negativo = ((matriz == _MENOS) & (colunas < primeiro_digito[:, None])).any(axis=1)
+
+    valores = inteiro / 10.0 ** decimais
+    valores = np.where(negativo, -valores, valores)
+    valores[nulos] = np.nan
+    return valores, nulos
+
+def decodificar_bytes(buffer: bytes, separador: bytes = SEPARADOR) -> np.ndarray:
+    """Vários números pt-BR num buffer só (ex: coluna exportada, linhas de arquivo) -> float64."""
+    return decodificar_matriz(_matriz_de_bytes(buffer, separador))[0]
+
+def decodificar_serie(valores: pd.Series) -> pd.Series:
+    """
+    Coluna de textos pt-BR -> float64 (mesmo índice). Colunas numéricas e células que já são
+    números (coluna object vinda de JSON) passam direto; só os textos vão para o decodificador.
+    """
+    if pd.api.types.is_numeric_dtype(valores): return valores.astype('float64')
+    if valores.empty: return pd.Series(dtype='float64', index=valores.index, name=valores.name)
+    celulas = valores.tolist()
+    eh_texto = np.fromiter((isinstance(v, str) for v in celulas), dtype=bool, count=len(celulas))
+    if eh_texto.all(): numeros = np.empty(len(celulas))
+    else: numeros = pd.to_numeric(valores.mask(eh_texto).astype(object), errors='coerce').to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    if eh_texto.any():
+        textos = celulas if eh_texto.all() else [v for v, texto in zip(celulas, eh_texto) if texto]
+        numeros[eh_texto] = decodificar_bytes(SEPARADOR.decode().join(textos).encode('utf-8'))
+    return pd.Series(numeros, index=valores.index, name=valores.name)
+
+def numero_br(valor) -> Optional[float]:
+    """Um valor solto (texto pt-BR ou número) -> float, ou None se não houver número."""
+    if isinstance(valor, bool): return None
+    if isinstance(valor, (int, float, np.integer, np.floating)): return None if np.isnan(valor) else float(valor)
+    if not isinstance(valor, str): return None
+    numero = decodificar_bytes(valor.encode('utf-8'))[0]
+    return None if np.isnan(numero) else float(numero)
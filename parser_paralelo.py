@@ -0,0 +1,68 @@
+# --- PARSE DE HTML EM PROCESSOS (FORA DO GIL DAS THREADS DE REDE) ---
+# Os provedores baixam com threads (I/O) e mandam os bytes crus do HTML para um pool de
+# processos, que devolve registros compactos. Enquanto um processo faz o parse (CPU), a thread
+# que pediu fica bloqueada sem segurar o GIL e as outras continuam baixando: rede e parse se
+# sobrepõem em todos os núcleos. O pool é único por processo, criado sob demanda e do tamanho
+# dos núcleos disponíveis. Se não der para criar processos (ou com 1 núcleo), o parse roda
+# na própria thread, como antes.
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+def tamanho_pool_padrao() -> int:
+    """Núcleos que este processo pode usar (respeita affinity/cgroups quando o SO informa)."""
+    try: return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError: return max(1, os.cpu_count() or 1)
+
+class PoolParsers:
+    """Pool de processos para funções de parse (precisam ser de módulo, para o pickle)."""
+
+    def __init__(self, processos: Optional[int] = None):
+        self.processos = processos or tamanho_pool_padrao()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._indisponivel = self.processos < 2 # 1 núcleo: processo extra só somaria overhead
+        self._lock = threading.Lock()
+
+    def _obter(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and not self._indisponivel:
+                # 'forkserver' evita fork de um processo cheio de threads (Streamlit, pools HTTP)
+                metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                try: self._executor = ProcessPoolExecutor(self.processos, mp_context=multiprocessing.get_context(metodo))
+                except (OSError, ValueError, NotImplementedError) as e:
+                    print(f"[PARSER] Pool de processos indisponível ({e}). Parse na própria thread."); self._indisponivel = True
+            return self._executor
+
+    def executar(self, funcao: Callable[..., Any], *args) -> Any:
+        """funcao(*args) num processo do pool; a thread que chama só espera o resultado."""
+        executor = self._obter()
+        if executor is None: return funcao(*args)
+        try: return executor.submit(funcao, *args).result()
+        except BrokenProcessPool as e: # Processo morreu (OOM, kill): recria na próxima e resolve este aqui
+            print(f"[PARSER] Pool quebrado ({e}). Recriando.")
+            with self._lock:
+                if self._executor is executor: self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            return funcao(*args)
+
+    def encerrar(self):
+        with self._lock:
+            if self._executor is not None: self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+_POOL_PADRAO: Optional[PoolParsers] = None
+_LOCK_POOL_PADRAO = threading.Lock()
+
+def pool_padrao() -> PoolParsers:
+    """O pool compartilhado por todos os provedores deste processo."""
+    global _POOL_PADRAO
+    with _LOCK_POOL_PADRAO:
+        if _POOL_PADRAO is None:
+            _POOL_PADRAO = PoolParsers()
+            atexit.register(_POOL_PADRAO.encerrar)
+        return _POOL_PADRAO
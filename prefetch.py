@@ -0,0 +1,96 @@
+# --- PREFETCH PREDITIVO: ATUALIZA OS DADOS POUCO ANTES DOS PICOS DE ACESSO ---
+# Conta os acessos por hora no SQLite e, a partir do histórico, descobre as horas de pico
+# (abertura, almoço, fechamento). Uma thread atualiza e aquece os caches antes delas.
+
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Callable
+
+from banco import conexoes, inicializar_db
+
+SEMANAS_HISTORICO = 4 # Quantas semanas de acessos entram na média por hora
+FATOR_PICO = 1.5 # Hora é "pico" se tiver 1,5x a média de acessos por hora do dia da semana
+MINIMO_ACESSOS_PICO = 3 # Evita tratar 1 acesso isolado como pico
+
+def registrar_acesso(db_file: str, quando: Optional[datetime] = None):
+    """Soma 1 no contador da hora atual (chamado uma vez por sessão/carregamento de página)."""
+    quando = quando or datetime.now()
+    inicializar_db(db_file) # Tabela criada pelas migrações (só a 1ª chamada do processo toca no banco)
+    with conexoes(db_file).escrita() as conn: # Acontece a cada carregamento: usa a conexão de escrita já aberta
+        conn.execute("""
+        INSERT INTO acessos_por_hora (data, hora, contagem) VALUES (?, ?, 1)
+        ON CONFLICT(data, hora) DO UPDATE SET contagem = contagem + 1
+        """, (quando.strftime('%Y-%m-%d'), quando.hour))
+
+def horas_de_pico(db_file: str, dia: Optional[datetime] = None, semanas: int = SEMANAS_HISTORICO,
+                  fator: float = FATOR_PICO) -> List[int]:
+    """Retorna as horas (0-23) que costumam ser pico no mesmo dia da semana de 'dia'."""
+    dia = dia or datetime.now()
+    inicio = (dia - timedelta(weeks=semanas)).strftime('%Y-%m-%d')
+    # strftime('%w'): 0 = domingo ... 6 = sábado (Python: weekday() 0 = segunda)
+    dia_semana_sqlite = (dia.weekday() + 1) % 7
+    inicializar_db(db_file)
+    with conexoes(db_file).leitura() as conn:
+        linhas = conn.execute("""
+        WITH janela AS (SELECT data, hora, contagem FROM acessos_por_hora
+                        WHERE data >= ? AND data < ? AND CAST(strftime('%w', data) AS INTEGER) = ?)
+        SELECT hora, SUM(contagem), (SELECT COUNT(DISTINCT data) FROM janela) FROM janela GROUP BY hora
+        """, (inicio, dia.strftime('%Y-%m-%d'), dia_semana_sqlite)).fetchall()
+    if not linhas: return []
+    # Mesmo denominador para as horas e para a média do dia: todos os dias desse dia da semana com
+    # algum acesso na janela (hora sem acesso num desses dias conta como zero, não some da média)
+    dias = linhas[0][2]
+    media_por_hora = sum(total for _, total, _ in linhas) / (dias * 24)
+    return sorted(hora for hora, total, _ in linhas if total / dias >= max(fator * media_por_hora, MINIMO_ACESSOS_PICO))
+
+class PrefetcherPicos:
+    """
+    Thread que acorda a cada 'intervalo_segundos' e, se faltar menos de 'antecedencia_minutos'
+    para uma hora de pico, chama 'atualizar()' (uma vez por pico) e depois 'aquecer()'.
+    """
+
+    def __init__(self, db_file: str, atualizar: Callable[[], bool], aquecer: Optional[Callable[[], None]] = None,
+                 antecedencia_minutos: int = 10, intervalo_segundos: int = 60):
+        self.db_file = db_file
+        self.atualizar = atualizar
+        self.aquecer = aquecer
+        self.antecedencia = timedelta(minutes=antecedencia_minutos)
+        self.intervalo_segundos = intervalo_segundos
+        self.ultimo_pico_atendido: Optional[datetime] = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="prefetch-picos", daemon=True)
+
+    def iniciar(self) -> "PrefetcherPicos":
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def proximo_pico(self, agora: Optional[datetime] = None) -> Optional[datetime]:
+        """Início da próxima hora de pico dentro da janela de antecedência (ou None)."""
+        agora = agora or datetime.now()
+        alvo = (agora + self.antecedencia).replace(minute=0, second=0, microsecond=0)
+        if alvo <= agora: return None # A hora já começou: o prefetch chegaria atrasado
+        if alvo.hour not in horas_de_pico(self.db_file, alvo): return None
+        return alvo
+
+    def verificar(self, agora: Optional[datetime] = None) -> bool:
+        """Uma rodada do loop. Retorna True se disparou uma atualização."""
+        pico = self.proximo_pico(agora)
+        if pico is None or pico == self.ultimo_pico_atendido: return False
+        self.ultimo_pico_atendido = pico
+        print(f"[PREFETCH] Pico previsto às {pico.strftime('%H:%M')}. Atualizando antes...")
+        try:
+            sucesso = self.atualizar()
+            if sucesso and self.aquecer: self.aquecer()
+            return bool(sucesso)
+        except Exception as e:
+            print(f"[PREFETCH] Falha na atualização antecipada: {e}")
+            return False
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try: self.verificar()
+            except Exception as e: print(f"[PREFETCH] Erro no loop: {e}")
+            self._parar.wait(self.intervalo_segundos)
@@ -0,0 +1,26 @@
+# --- PROVEDOR: BRAPI (/quote/list + LOTES /quote) ---
+
+from typing import List, Optional
+
+import pandas as pd
+
+from provedores import ProvedorDados, registrar_provedor, padronizar_df
+from brapi_cliente import COLUNAS_LINHA_FII, buscar_lista_fundos, buscar_lotes_quote, montar_linhas_fiis
+
+@registrar_provedor
+class ProvedorBrapi(ProvedorDados):
+    nome = "brapi"
+    campos = ('Preco_Atual', 'Liquidez_Diaria', 'Var_Dia_Percent', 'Min_52_Semanas', 'DY_12M', 'P_VP', 'Setor')
+
+    def __init__(self, api_key: str, tamanho_lote: int = 10, hedge=None):
+        self.api_key = api_key
+        self.tamanho_lote = tamanho_lote
+        self.hedge = hedge
+
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        itens_lista = buscar_lista_fundos(self.api_key)
+        setor_map = {item['stock']: item.get('sector', "Desconhecido") for item in itens_lista}
+        if tickers is None: tickers = list(setor_map)
+        resultados, _ = buscar_lotes_quote(self.api_key, tickers, self.tamanho_lote, hedge=self.hedge)
+        linhas = montar_linhas_fiis(resultados, setor_map)
+        return padronizar_df([dict(zip(COLUNAS_LINHA_FII, linha)) for linha in linhas])
@@ -0,0 +1,114 @@
+# --- PROVEDOR: FUNDAMENTUS (TABELA COM TODOS OS FIIs EM 1 REQUISIÇÃO) ---
+# Modo "rapido" (padrão): o HTML passa uma única vez pelo lxml (iterparse) direto para
+# colunas tipadas, dentro do pool de processos (parser_paralelo) para não disputar o GIL com
+# os outros provedores que estão baixando. Modo "legado": BeautifulSoup + pd.read_html, como no v8.
+# Os dois precisam do lxml; sem ele o provedor se declara indisponível.
+
+import io
+from typing import List, Optional, Dict
+
+import pandas as pd
+import requests
+
+from numeros_br import decodificar_serie
+from parser_paralelo import PoolParsers, pool_padrao
+from provedores import ProvedorDados, registrar_provedor
+
+try: from lxml import etree
+except ImportError: etree = None
+try: from bs4 import BeautifulSoup
+except ImportError: BeautifulSoup = None
+
+URL_FUNDAMENTUS_FIIS = "https://www.fundamentus.com.br/fii_resultado.php"
+HEADERS_NAVEGADOR = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Cabeçalho do Fundamentus -> coluna padronizada
+COLUNAS_FUNDAMENTUS = {
+    'Papel': 'Ticker',
+    'Segmento': 'Segmento',
+    'Cotação': 'Preco_Atual',
+    'FFO Yield': 'FFO_Yield',
+    'Dividend Yield': 'DY_12M',
+    'P/VP': 'P_VP',
+    'Valor de Mercado': 'Valor_Mercado',
+    'Liquidez': 'Liquidez_Diaria',
+    'Qtd de imóveis': 'Qtd_Imoveis',
+    'Cap Rate': 'Cap_Rate',
+    'Vacância Média': 'Vacancia',
+}
+COLUNAS_TEXTO = ('Ticker', 'Segmento')
+
+def parsear_tabela_fundamentus(html: bytes, encoding: str = 'iso-8859-1') -> pd.DataFrame:
+    """
+    Uma passada de lxml.etree.iterparse pela tabela 'resultado': cada <tr> vira uma linha e é
+    descartado logo depois (memória constante). Retorna DataFrame tipado indexado por Ticker.
+    """
+    cabecalho: List[str] = []
+    colunas: Dict[str, List[str]] = {}
+    celulas: List[str] = []
+    dentro_da_tabela = False
+
+    for evento, elem in etree.iterparse(io.BytesIO(html), events=('start', 'end'), html=True, encoding=encoding):
+        if evento == 'start':
+            if elem.tag == 'table' and elem.get('id') == 'resultado': dentro_da_tabela = True
+            continue
+        if not dentro_da_tabela: continue
+        if elem.tag in ('th', 'td'):
+            celulas.append("".join(elem.itertext()).strip())
+        elif elem.tag == 'tr':
+            if not cabecalho:
+                cabecalho = [COLUNAS_FUNDAMENTUS.get(c) for c in celulas]
+                colunas = {c: [] for c in cabecalho if c}
+            elif len(celulas) == len(cabecalho):
+                for nome, valor in zip(cabecalho, celulas):
+                    if nome: colunas[nome].append(valor)
+            celulas = []
+            elem.clear() # Libera a linha já lida
+        elif elem.tag == 'table':
+            break
+
+    if not colunas.get('Ticker'): raise ValueError("Tabela 'resultado' não encontrada no Fundamentus.")
+    df = pd.DataFrame({nome: pd.Series(valores, dtype=object) for nome, valores in colunas.items()})
+    for nome in df.columns:
+        if nome not in COLUNAS_TEXTO: df[nome] = decodificar_serie(df[nome])
+    if 'Qtd_Imoveis' in df.columns: df['Qtd_Imoveis'] = df['Qtd_Imoveis'].astype('Int64')
+    return df.drop_duplicates(subset='Ticker').set_index('Ticker')
+
+def parsear_tabela_legado(html: str) -> pd.DataFrame:
+    """Leitura do v8: BeautifulSoup acha a tabela e o pd.read_html converte (só P/VP e DY)."""
+    soup = BeautifulSoup(html, 'lxml')
+    tabela_fiis = soup.find('table', {'id': 'resultado'})
+    if not tabela_fiis: raise ValueError("Tabela 'resultado' não encontrada no Fundamentus.")
+    df = pd.read_html(io.StringIO(str(tabela_fiis)), decimal=',', thousands='.')[0]
+    df.rename(columns={'Papel': 'Ticker', 'P/VP': 'P_VP', 'Dividend Yield': 'DY_12M'}, inplace=True)
+    df['DY_12M'] = df['DY_12M'].str.replace('%', '').str.replace(',', '.').astype(float)
+    return df[['Ticker', 'P_VP', 'DY_12M']].drop_duplicates(subset='Ticker').set_index('Ticker')
+
+@registrar_provedor
+class ProvedorFundamentus(ProvedorDados):
+    nome = "fundamentus"
+    campos = ('P_VP', 'DY_12M', 'Preco_Atual', 'Liquidez_Diaria', 'Valor_Mercado', 'Vacancia',
+              'FFO_Yield', 'Cap_Rate', 'Qtd_Imoveis', 'Segmento')
+
+    def __init__(self, timeout: float = 30, modo: str = "rapido", parser: Optional[PoolParsers] = None):
+        self.timeout = timeout
+        self.modo = modo
+        self.parser = parser or pool_padrao()
+
+    def disponivel(self) -> bool:
+        # Os dois modos dependem do lxml (o legado usa BeautifulSoup(html, 'lxml') e pd.read_html):
+        # sem ele o provedor fica de fora da atualização em vez de falhar a cada busca
+        return etree is not None and (self.modo == "rapido" or BeautifulSoup is not None)
+
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        response = requests.get(URL_FUNDAMENTUS_FIIS, headers=HEADERS_NAVEGADOR, timeout=self.timeout)
+        response.raise_for_status()
+
+        if self.modo == "rapido":
+            df = self.parser.executar(parsear_tabela_fundamentus, response.content, response.encoding or 'iso-8859-1')
+        else: df = parsear_tabela_legado(response.text)
+
+        if tickers is not None: df = df[df.index.isin(tickers)]
+        return df
@@ -0,0 +1,269 @@
+# --- PROVEDOR: STATUS INVEST VIA SELENIUM (CAMINHO COM JAVASCRIPT RENDERIZADO) ---
+# Pool de N navegadores headless raspando em paralelo. Imagens, fontes e CSS são bloqueados,
+# cada navegador é reciclado depois de N páginas ou se passar do limite de memória, e um
+# watchdog mata o navegador que travar numa página.
+# Modo "rede": em vez de esperar o DOM e ler texto com XPath, escuta o log de performance
+# (CDP) e lê direto o JSON que a página baixa com os indicadores, parando na hora que chega.
+
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
+
+import pandas as pd
+
+from numeros_br import decodificar_serie, numero_br
+from provedores import ProvedorDados, registrar_provedor, padronizar_df
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+except ImportError:
+    webdriver = None
+try: import psutil # Opcional: memória e processos-filho do Chrome
+except ImportError: psutil = None
+
+URL_STATUSINVEST_FII = "https://statusinvest.com.br/fundos-imobiliarios/{ticker}"
+CHROMEDRIVER_PATH = "/usr/bin/chromedriver" # Mesmo caminho do app_cloud.py (Streamlit Cloud)
+PVP_XPATH = "//h3[contains(text(), 'P/VP')]/following-sibling::strong"
+DY_XPATH = "//h3[contains(text(), 'Dividend Yield')]/following-sibling::strong"
+MAX_TENTATIVAS = 3
+
+TAMANHO_POOL = 3
+PAGINAS_POR_NAVEGADOR = 40 # Recicla depois disso (Chrome vaza memória em sessões longas)
+LIMITE_MEMORIA_MB = 700 # Recicla se chromedriver + Chrome passarem disso (precisa do psutil)
+TIMEOUT_PAGINA_S = 45 # Watchdog: mata o navegador que ficar preso mais que isso numa página
+
+# Modo rede: URLs de XHR que podem trazer os indicadores (JSON) e os nomes de chave aceitos
+PADROES_XHR_INDICADORES = ("statusinvest.com.br/fii/", "statusinvest.com.br/fundoimobiliario/",
+                           "statusinvest.com.br/category/", "indicator")
+CHAVES_JSON_INDICADORES = {
+    'pvp': 'P_VP', 'p_vp': 'P_VP', 'pricetobook': 'P_VP',
+    'dy': 'DY_12M', 'dividendyield': 'DY_12M', 'dividend_yield': 'DY_12M',
+}
+TIMEOUT_REDE_S = 10
+
+# Recursos que não precisamos para ler os indicadores
+URLS_BLOQUEADAS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+                   "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css"]
+
+def criar_driver(bloquear_recursos: bool = True, capturar_rede: bool = False):
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.page_load_strategy = "eager" # Não espera imagens/iframes para liberar o get()
+    if capturar_rede:
+        options.page_load_strategy = "none" # get() volta na hora; quem espera é o leitor do log de rede
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if bloquear_recursos:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2,
+                                                  "profile.managed_default_content_settings.stylesheets": 2,
+                                                  "profile.managed_default_content_settings.fonts": 2})
+    service = Service(executable_path=CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(service=service, options=options)
+    if bloquear_recursos:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_BLOQUEADAS})
+    return driver
+
+class NavegadorGerenciado:
+    """Um driver + contagem de páginas e controle de morte pelo watchdog."""
+
+    def __init__(self, bloquear_recursos: bool = True, capturar_rede: bool = False):
+        self.driver = criar_driver(bloquear_recursos, capturar_rede)
+        self.paginas = 0
+        self.morto = False
+        self.prazo: Optional[float] = None # Preenchido enquanto está em uso
+
+    def pid(self) -> Optional[int]:
+        processo = getattr(self.driver.service, "process", None)
+        return processo.pid if processo else None
+
+    def memoria_mb(self) -> Optional[float]:
+        if psutil is None or self.pid() is None: return None
+        try:
+            raiz = psutil.Process(self.pid())
+            return sum(p.memory_info().rss for p in [raiz] + raiz.children(recursive=True)) / 1024 / 1024
+        except psutil.Error: return None
+
+    def matar(self):
+        """Mata chromedriver e Chrome à força (a thread presa no driver recebe erro e segue)."""
+        self.morto = True
+        pid = self.pid()
+        if pid is None: return
+        try:
+            if psutil is not None:
+                raiz = psutil.Process(pid)
+                for filho in raiz.children(recursive=True): filho.kill()
+                raiz.kill()
+            else: os.kill(pid, signal.SIGKILL)
+        except Exception as e: print(f"[SELENIUM POOL] Falha ao matar pid {pid}: {e}")
+
+    def fechar(self):
+        try: self.driver.quit()
+        except Exception: self.matar()
+
+class PoolNavegadores:
+    """
+    N navegadores reaproveitados. obter() empresta um (criando sob demanda), e na devolução
+    o navegador é reciclado se passou de 'paginas_por_navegador' ou de 'limite_memoria_mb'.
+    """
+
+    def __init__(self, tamanho: int = TAMANHO_POOL, paginas_por_navegador: int = PAGINAS_POR_NAVEGADOR,
+                 limite_memoria_mb: float = LIMITE_MEMORIA_MB, timeout_pagina_s: float = TIMEOUT_PAGINA_S,
+                 bloquear_recursos: bool = True, capturar_rede: bool = False):
+        self.tamanho = tamanho
+        self.paginas_por_navegador = paginas_por_navegador
+        self.limite_memoria_mb = limite_memoria_mb
+        self.timeout_pagina_s = timeout_pagina_s
+        self.bloquear_recursos = bloquear_recursos
+        self.capturar_rede = capturar_rede
+        self._livres: "queue.Queue[Optional[NavegadorGerenciado]]" = queue.Queue()
+        for _ in range(tamanho): self._livres.put(None) # None = vaga ainda sem navegador
+        self._em_uso: List[NavegadorGerenciado] = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self.reciclados = 0
+        self.mortos_pelo_watchdog = 0
+        threading.Thread(target=self._watchdog, name="selenium-watchdog", daemon=True).start()
+
+    def _watchdog(self):
+        while not self._parar.wait(1):
+            agora = time.monotonic()
+            with self._lock: travados = [n for n in self._em_uso if n.prazo and agora > n.prazo and not n.morto]
+            for navegador in travados:
+                print(f"[SELENIUM POOL] Navegador (pid {navegador.pid()}) travado há mais de {self.timeout_pagina_s}s. Matando.")
+                navegador.matar(); self.mortos_pelo_watchdog += 1
+
+    def _precisa_reciclar(self, navegador: NavegadorGerenciado) -> bool:
+        if navegador.morto or navegador.paginas >= self.paginas_por_navegador: return True
+        memoria = navegador.memoria_mb()
+        return memoria is not None and memoria > self.limite_memoria_mb
+
+    @contextmanager
+    def obter(self):
+        navegador = self._livres.get()
+        try:
+            if navegador is None: navegador = NavegadorGerenciado(self.bloquear_recursos, self.capturar_rede)
+        except Exception:
+            self._livres.put(None); raise
+        navegador.prazo = time.monotonic() + self.timeout_pagina_s
+        with self._lock: self._em_uso.append(navegador)
+        try:
+            yield navegador.driver
+        finally:
+            navegador.paginas += 1
+            navegador.prazo = None
+            with self._lock: self._em_uso.remove(navegador)
+            if self._precisa_reciclar(navegador):
+                navegador.fechar(); self.reciclados += 1
+                navegador = None # A vaga volta vazia; o próximo obter() cria um navegador novo
+            self._livres.put(navegador)
+
+    def fechar(self):
+        self._parar.set()
+        while not self._livres.empty():
+            navegador = self._livres.get_nowait()
+            if navegador: navegador.fechar()
+
+def raspar_indicadores(driver, ticker: str, espera_segundos: float) -> Dict[str, str]:
+    """Textos crus dos cards; a conversão é feita na coluna inteira em buscar() (numeros_br)."""
+    driver.get(URL_STATUSINVEST_FII.format(ticker=ticker))
+    wait = WebDriverWait(driver, espera_segundos)
+    pvp_str = wait.until(EC.presence_of_element_located((By.XPATH, PVP_XPATH))).text
+    dy_str = driver.find_element(By.XPATH, DY_XPATH).text
+    return {'P_VP': pvp_str, 'DY_12M': dy_str}
+
+def extrair_indicadores_json(dado: Any, encontrados: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Percorre o JSON (qualquer profundidade) atrás das chaves de CHAVES_JSON_INDICADORES."""
+    encontrados = {} if encontrados is None else encontrados
+    if isinstance(dado, dict):
+        for chave, valor in dado.items():
+            coluna = CHAVES_JSON_INDICADORES.get(str(chave).lower())
+            if coluna and coluna not in encontrados and numero_br(valor) is not None: encontrados[coluna] = numero_br(valor)
+            elif isinstance(valor, (dict, list)): extrair_indicadores_json(valor, encontrados)
+    elif isinstance(dado, list):
+        for item in dado: extrair_indicadores_json(item, encontrados)
+    return encontrados
+
+def raspar_via_rede(driver, ticker: str, timeout_segundos: float = TIMEOUT_REDE_S) -> Dict[str, float]:
+    """
+    Abre a página e lê o log de performance até aparecer uma resposta JSON (de uma URL de
+    PADROES_XHR_INDICADORES) com P/VP e DY. Para o carregamento assim que tiver os dois.
+    """
+    driver.get_log("performance") # Descarta eventos da página anterior (navegador reaproveitado)
+    driver.get(URL_STATUSINVEST_FII.format(ticker=ticker))
+    candidatas: Dict[str, str] = {} # requestId -> url das respostas JSON que interessam
+    encontrados: Dict[str, float] = {}
+    prazo = time.monotonic() + timeout_segundos
+
+    while time.monotonic() < prazo:
+        for entrada in driver.get_log("performance"):
+            mensagem = json.loads(entrada["message"])["message"]
+            metodo, params = mensagem.get("method"), mensagem.get("params", {})
+            if metodo == "Network.responseReceived":
+                resposta = params.get("response", {})
+                if "json" in resposta.get("mimeType", "") and any(p in resposta.get("url", "") for p in PADROES_XHR_INDICADORES):
+                    candidatas[params["requestId"]] = resposta["url"]
+            elif metodo == "Network.loadingFinished" and params.get("requestId") in candidatas:
+                try:
+                    corpo = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                    extrair_indicadores_json(json.loads(corpo.get("body") or "null"), encontrados)
+                except Exception as e:
+                    print(f"[SELENIUM REDE] {ticker}: corpo ilegível de {candidatas[params['requestId']]}: {e}")
+                if 'P_VP' in encontrados and 'DY_12M' in encontrados:
+                    driver.execute_script("window.stop();") # Já temos o que precisamos
+                    return encontrados
+        time.sleep(0.05)
+    raise TimeoutError(f"Nenhum JSON com P/VP e DY em {timeout_segundos}s (achou: {sorted(encontrados)})")
+
+@registrar_provedor
+class ProvedorSelenium(ProvedorDados):
+    nome = "selenium"
+    campos = ('P_VP', 'DY_12M')
+
+    def __init__(self, espera_segundos: float = 15, tamanho_pool: int = TAMANHO_POOL,
+                 pool: Optional[PoolNavegadores] = None, modo: str = "dom"):
+        self.espera_segundos = espera_segundos
+        self.tamanho_pool = tamanho_pool
+        self.pool = pool # Se vier de fora (ex: st.cache_resource), é reaproveitado entre buscas
+        self.modo = modo # "dom" (XPath no texto renderizado) ou "rede" (JSON capturado via CDP)
+
+    def disponivel(self) -> bool:
+        return webdriver is not None
+
+    def _buscar_um(self, pool: PoolNavegadores, ticker: str) -> Optional[Dict]:
+        for tentativa in range(MAX_TENTATIVAS):
+            try:
+                with pool.obter() as driver:
+                    if self.modo == "rede": return {'Ticker': ticker, **raspar_via_rede(driver, ticker)}
+                    return {'Ticker': ticker, **raspar_indicadores(driver, ticker, self.espera_segundos)}
+            except Exception as e:
+                print(f"[SELENIUM Tentativa {tentativa+1}/{MAX_TENTATIVAS}] {ticker}: {e}")
+                time.sleep(1)
+        return None
+
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        if tickers is None: raise ValueError("Selenium precisa da lista de tickers (não lista o universo).")
+        pool = self.pool or PoolNavegadores(self.tamanho_pool, capturar_rede=(self.modo == "rede"))
+        try:
+            with ThreadPoolExecutor(max_workers=pool.tamanho, thread_name_prefix="selenium") as executor:
+                linhas = [l for l in executor.map(lambda t: self._buscar_um(pool, t), tickers) if l]
+        finally:
+            if self.pool is None: pool.fechar()
+        df = padronizar_df(linhas)
+        for coluna in self.campos:
+            if coluna in df.columns: df[coluna] = decodificar_serie(df[coluna]) # Textos do DOM ('0,98', '11,2%', 'N/A')
+        return df
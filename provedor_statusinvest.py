@@ -0,0 +1,163 @@
+# --- PROVEDOR: STATUS INVEST (HTML VIA REQUESTS, SEM NAVEGADOR) ---
+# Busca as páginas em paralelo com uma Session (pool de conexões) e um limite de educação
+# por domínio (máx. de conexões simultâneas + intervalo mínimo entre requisições).
+# Os cards 'h3.title' + 'strong.value' (mesma marcação do teste_dados_v4) são lidos com lxml.
+# O parse roda no pool de processos (parser_paralelo) e volta como tupla na ordem de 'campos'.
+# Com 'diretorio_fixtures', lê '<TICKER>.html' do disco em vez da rede (testes offline).
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Callable, Tuple
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from numeros_br import decodificar_serie
+from parser_paralelo import PoolParsers, pool_padrao
+from provedores import ProvedorDados, registrar_provedor, padronizar_df
+
+try: from lxml import html as lxml_html
+except ImportError: lxml_html = None
+try: from bs4 import BeautifulSoup
+except ImportError: BeautifulSoup = None
+
+URL_STATUSINVEST_FII = "https://statusinvest.com.br/fundos-imobiliarios/{ticker}"
+HEADERS_NAVEGADOR = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+MAX_PARALELO = 8 # Threads buscando páginas
+MAX_POR_DOMINIO = 4 # Conexões simultâneas no mesmo site
+INTERVALO_MIN_DOMINIO_S = 0.1 # Intervalo mínimo entre o início de duas requisições no mesmo site
+ERROS_PARSE = (IndexError, ValueError, AttributeError, KeyError, TypeError) # O que o parse levanta quando a marcação muda
+
+# Título do card (em minúsculas, começo do texto) -> coluna padronizada
+TITULOS_INDICADORES = {
+    'p/vp': 'P_VP',
+    'dividend yield': 'DY_12M',
+    'valor atual': 'Preco_Atual',
+    'min. 52 semanas': 'Min_52_Semanas',
+    'máx. 52 semanas': 'Max_52_Semanas',
+    'val. patrimonial p/cota': 'VP_Cota',
+    'valor patrimonial p/cota': 'VP_Cota',
+    'liquidez média diária': 'Liquidez_Diaria',
+    'valor em caixa': 'Valor_Caixa',
+    'patrimônio': 'Patrimonio',
+    'valor de mercado': 'Valor_Mercado',
+    'nº de cotistas': 'Num_Cotistas',
+}
+
+class LimitadorDominio:
+    """Educação por domínio: no máx. 'max_simultaneas' conexões e 'intervalo_min' entre inícios."""
+
+    def __init__(self, max_simultaneas: int = MAX_POR_DOMINIO, intervalo_min: float = INTERVALO_MIN_DOMINIO_S):
+        self.max_simultaneas = max_simultaneas
+        self.intervalo_min = intervalo_min
+        self._semaforos: Dict[str, threading.BoundedSemaphore] = {}
+        self._proximo_inicio: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _reservar(self, dominio: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if dominio not in self._semaforos: self._semaforos[dominio] = threading.BoundedSemaphore(self.max_simultaneas)
+            return self._semaforos[dominio]
+
+    def executar(self, url: str, funcao: Callable[[], requests.Response]) -> requests.Response:
+        dominio = urlparse(url).netloc
+        with self._reservar(dominio):
+            with self._lock:
+                agora = time.monotonic()
+                inicio = max(agora, self._proximo_inicio.get(dominio, 0.0))
+                self._proximo_inicio[dominio] = inicio + self.intervalo_min
+            if inicio > agora: time.sleep(inicio - agora)
+            return funcao()
+
+def criar_sessao(tamanho_pool: int = MAX_PARALELO) -> requests.Session:
+    sessao = requests.Session()
+    sessao.headers.update(HEADERS_NAVEGADOR)
+    tentativas = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool, max_retries=tentativas)
+    sessao.mount("https://", adaptador); sessao.mount("http://", adaptador)
+    return sessao
+
+def extrair_indicadores(html: bytes, encoding: str = 'utf-8') -> Dict[str, str]:
+    """Devolve {coluna: texto do valor} de todos os cards conhecidos da página (ainda sem converter)."""
+    indicadores: Dict[str, str] = {}
+    if lxml_html is not None:
+        arvore = lxml_html.fromstring(html, parser=lxml_html.HTMLParser(encoding=encoding))
+        pares = ((h3.text_content(), h3.xpath("following-sibling::strong[1]"))
+                 for h3 in arvore.xpath("//h3[contains(concat(' ', normalize-space(@class), ' '), ' title ')]"))
+        pares = ((titulo, strongs[0].text_content()) for titulo, strongs in pares if strongs)
+    else: # Sem lxml: mesma busca com BeautifulSoup (mais lento)
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+        pares = ((h3.text, h3.find_next_sibling('strong').text) for h3 in soup.find_all('h3', class_='title')
+                 if h3.find_next_sibling('strong'))
+    for titulo, valor in pares:
+        titulo = " ".join(titulo.split()).lower()
+        for prefixo, coluna in TITULOS_INDICADORES.items():
+            if titulo.startswith(prefixo) and coluna not in indicadores:
+                indicadores[coluna] = valor.strip(); break
+    return indicadores
+
+CAMPOS_STATUSINVEST = tuple(dict.fromkeys(TITULOS_INDICADORES.values()))
+
+def registro_statusinvest(html: bytes, encoding: str = 'utf-8') -> Tuple[Optional[str], ...]:
+    """Roda no pool de processos: só os textos dos valores, na ordem de CAMPOS_STATUSINVEST."""
+    indicadores = extrair_indicadores(html, encoding)
+    return tuple(indicadores.get(campo) for campo in CAMPOS_STATUSINVEST)
+
+@registrar_provedor
+class ProvedorStatusInvest(ProvedorDados):
+    nome = "statusinvest"
+    campos = CAMPOS_STATUSINVEST
+
+    def __init__(self, timeout: float = 20, max_paralelo: int = MAX_PARALELO,
+                 limitador: Optional[LimitadorDominio] = None, diretorio_fixtures: Optional[str] = None,
+                 parser: Optional[PoolParsers] = None):
+        self.timeout = timeout
+        self.max_paralelo = max_paralelo
+        self.limitador = limitador or LimitadorDominio()
+        self.diretorio_fixtures = diretorio_fixtures
+        self.parser = parser or pool_padrao()
+        self._sessao: Optional[requests.Session] = None
+
+    def disponivel(self) -> bool:
+        return lxml_html is not None or BeautifulSoup is not None
+
+    def baixar_html(self, ticker: str) -> Optional[bytes]:
+        if self.diretorio_fixtures:
+            caminho = os.path.join(self.diretorio_fixtures, f"{ticker}.html")
+            if not os.path.exists(caminho): return None
+            with open(caminho, 'rb') as arquivo: return arquivo.read()
+
+        url = URL_STATUSINVEST_FII.format(ticker=ticker)
+        response = self.limitador.executar(url, lambda: self._sessao.get(url, timeout=self.timeout))
+        if response.status_code != 200:
+            print(f"[STATUSINVEST] {ticker}: código {response.status_code}"); return None
+        return response.content
+
+    def _buscar_um(self, ticker: str) -> Optional[Dict[str, str]]:
+        try:
+            html = self.baixar_html(ticker)
+            if not html: return None
+            registro = self.parser.executar(registro_statusinvest, html)
+            return {'Ticker': ticker, **{c: v for c, v in zip(self.campos, registro) if v is not None}}
+        except requests.exceptions.RequestException as e:
+            print(f"[STATUSINVEST] {ticker}: {e}"); return None
+        except ERROS_PARSE as e: # Página com layout diferente: só este ticker fica sem dados, o lote segue
+            print(f"[STATUSINVEST] {ticker}: falha ao ler a página ({type(e).__name__}: {e})")
+            return {'Ticker': ticker}
+
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        if tickers is None: raise ValueError("StatusInvest precisa da lista de tickers (não lista o universo).")
+        self._sessao = self._sessao or criar_sessao(self.max_paralelo)
+        with ThreadPoolExecutor(max_workers=self.max_paralelo, thread_name_prefix="statusinvest") as executor:
+            linhas = [linha for linha in executor.map(self._buscar_um, tickers) if linha]
+
+        df = padronizar_df(linhas)
+        for coluna in df.columns: df[coluna] = decodificar_serie(df[coluna])
+        return df
@@ -0,0 +1,165 @@
+# --- PROVEDOR: YFINANCE (YAHOO, TICKERS COM SUFIXO .SA) ---
+# Além do snapshot por ticker (provedor 'yfinance'), tem o backfill de histórico diário:
+# yf.download em lotes de vários tickers, com paralelismo limitado, retomando de onde parou
+# pelo manifesto por ticker e gravando no histórico local (historico_store).
+#
+# Uso: python provedor_yfinance.py backfill --anos 10 [--tickers HGLG11 MXRF11 ...]
+
+import argparse
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from banco import DB_FILE
+from historico_store import salvar_historico, ler_manifesto, atualizar_manifesto
+from provedores import ProvedorDados, registrar_provedor, padronizar_df
+
+try: import yfinance as yf
+except ImportError: yf = None
+
+FONTE_HISTORICO = "yfinance"
+TICKERS_POR_LOTE = 40 # Tickers por chamada de yf.download
+MAX_LOTES_PARALELOS = 3 # Chamadas simultâneas ao Yahoo
+COLUNAS_YAHOO = {'Open': 'abertura', 'High': 'maxima', 'Low': 'minima', 'Close': 'fechamento'}
+
+def para_yahoo(ticker: str) -> str:
+    return f"{ticker}.SA"
+
+def de_yahoo(ticker_yahoo: str) -> str:
+    return ticker_yahoo.removesuffix(".SA")
+
+@registrar_provedor
+class ProvedorYFinance(ProvedorDados):
+    nome = "yfinance"
+    campos = ('P_VP', 'DY_12M', 'Preco_Atual')
+
+    def disponivel(self) -> bool:
+        return yf is not None
+
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        if tickers is None: raise ValueError("yfinance precisa da lista de tickers (não lista o universo).")
+        linhas = []
+        for ticker in tickers:
+            try:
+                info = yf.Ticker(para_yahoo(ticker)).info
+                dy = info.get('yield') or info.get('dividendYield')
+                linhas.append({'Ticker': ticker, 'P_VP': info.get('priceToBook'),
+                               'DY_12M': dy * 100 if dy is not None else None,
+                               'Preco_Atual': info.get('regularMarketPrice')})
+            except Exception as e:
+                print(f"[YFINANCE] {ticker}: {e}")
+        return padronizar_df(linhas)
+
+# --- BACKFILL DE HISTÓRICO DIÁRIO ---
+
+def baixar_lote_yf(tickers_yahoo: List[str], inicio: date, fim: date) -> pd.DataFrame:
+    """Uma chamada yf.download para vários tickers. Colunas (ticker, campo), índice = data."""
+    return yf.download(tickers_yahoo, start=inicio, end=fim + timedelta(days=1), interval="1d", group_by="ticker",
+                       auto_adjust=False, actions=False, threads=False, progress=False)
+
+def lote_para_longo(df: pd.DataFrame, tickers_yahoo: List[str]) -> pd.DataFrame:
+    """Formato largo do yf.download -> uma linha por (Ticker, data) com as colunas do histórico."""
+    if df is None or df.empty: return pd.DataFrame()
+    if not isinstance(df.columns, pd.MultiIndex): # Um ticker só: o yfinance não agrupa as colunas
+        df = pd.concat({tickers_yahoo[0]: df}, axis=1)
+    longo = df.rename_axis(index='data', columns=['Ticker', 'campo']).stack(level='Ticker', future_stack=True).reset_index()
+    longo = longo.rename(columns=COLUNAS_YAHOO).dropna(subset=['fechamento'])
+    longo['Ticker'] = longo['Ticker'].map(de_yahoo)
+    # 'Volume' do Yahoo é quantidade de cotas; o histórico guarda volume financeiro (R$), como o VOLTOT
+    # do COTAHIST: aproximado por fechamento x cotas
+    longo['volume'] = longo['fechamento'] * longo['Volume']
+    return longo[['Ticker', 'data', *COLUNAS_YAHOO.values(), 'volume']]
+
+def montar_lotes(tickers: List[str], manifesto: Dict[str, str], inicio_padrao: date, fim: date,
+                 tamanho_lote: int = TICKERS_POR_LOTE) -> List[tuple]:
+    """
+    Agrupa por data de início (a do manifesto + 1 dia, ou 'inicio_padrao') para que cada chamada
+    peça o mesmo intervalo a todos os tickers do lote. Retorna [(inicio, [tickers]), ...].
+    """
+    por_inicio: Dict[date, List[str]] = {}
+    for ticker in tickers:
+        ultima = manifesto.get(ticker)
+        inicio = date.fromisoformat(ultima) + timedelta(days=1) if ultima else inicio_padrao
+        if inicio <= fim: por_inicio.setdefault(inicio, []).append(ticker)
+    return [(inicio, grupo[i:i + tamanho_lote]) for inicio, grupo in sorted(por_inicio.items())
+            for i in range(0, len(grupo), tamanho_lote)]
+
+class BackfillHistoricoYF:
+    """
+    Baixa o histórico diário em lotes paralelos (no máx. 'max_paralelo' chamadas ao mesmo tempo).
+    A gravação e o manifesto ficam na thread principal; um lote que falha não avança o manifesto
+    dos seus tickers, então a próxima execução retoma exatamente deles.
+    'baixar' pode ser trocado por um substituto local com a mesma assinatura de baixar_lote_yf.
+    """
+
+    def __init__(self, db_file: str = DB_FILE, tamanho_lote: int = TICKERS_POR_LOTE,
+                 max_paralelo: int = MAX_LOTES_PARALELOS,
+                 baixar: Optional[Callable[[List[str], date, date], pd.DataFrame]] = None):
+        self.db_file = db_file
+        self.tamanho_lote = tamanho_lote
+        self.max_paralelo = max_paralelo
+        self.baixar = baixar or baixar_lote_yf
+
+    def _baixar_lote(self, inicio: date, fim: date, tickers: List[str]) -> pd.DataFrame:
+        tickers_yahoo = [para_yahoo(t) for t in tickers]
+        return lote_para_longo(self.baixar(tickers_yahoo, inicio, fim), tickers_yahoo)
+
+    def executar(self, tickers: List[str], anos: int = 10, fim: Optional[date] = None) -> int:
+        fim = fim or date.today()
+        lotes = montar_lotes(tickers, ler_manifesto(FONTE_HISTORICO, self.db_file),
+                             fim - timedelta(days=365 * anos), fim, self.tamanho_lote)
+        if not lotes: print("[YF BACKFILL] Tudo em dia, nada a baixar."); return 0
+
+        total, falhas = 0, 0
+        with ThreadPoolExecutor(max_workers=self.max_paralelo, thread_name_prefix="yf_backfill") as executor:
+            futuros = {executor.submit(self._baixar_lote, inicio, fim, grupo): (inicio, grupo) for inicio, grupo in lotes}
+            for n, futuro in enumerate(as_completed(futuros), 1):
+                inicio, grupo = futuros[futuro]
+                try: df = futuro.result()
+                except Exception as e:
+                    falhas += 1; print(f"[YF BACKFILL] Lote {n}/{len(lotes)} ({grupo[0]}...) falhou: {e}"); continue
+                if not df.empty:
+                    df['fonte'] = FONTE_HISTORICO
+                    total += salvar_historico(df, self.db_file)
+                    atualizar_manifesto(df.groupby('Ticker')['data'].max().dt.strftime('%Y-%m-%d').to_dict(),
+                                        FONTE_HISTORICO, self.db_file)
+                print(f"[YF BACKFILL] Lote {n}/{len(lotes)}: {len(df)} barras de {len(grupo)} tickers desde {inicio:%d/%m/%Y}.")
+        print(f"[YF BACKFILL] {total} barras gravadas, {falhas} lotes com falha.")
+        return total
+
+def universo_fiis(db_file: str = DB_FILE) -> List[str]:
+    """Tickers do cache (tabela fiis) mais, se BRAPI_API_KEY estiver definida, a lista atual da Brapi."""
+    tickers = set()
+    if os.path.exists(db_file):
+        conn = sqlite3.connect(db_file)
+        try: tickers.update(t for (t,) in conn.execute("SELECT Ticker FROM fiis"))
+        except sqlite3.Error: pass # Tabela ainda não criada
+        finally: conn.close()
+    api_key = os.environ.get("BRAPI_API_KEY")
+    if api_key:
+        from brapi_cliente import buscar_lista_fundos
+        tickers.update(item['stock'] for item in buscar_lista_fundos(api_key))
+    return sorted(tickers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill do histórico diário de FIIs via yfinance.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_backfill = sub.add_parser("backfill", help="Baixa (ou completa) o histórico de todo o universo de FIIs")
+    p_backfill.add_argument("--anos", type=int, default=10)
+    p_backfill.add_argument("--tickers", nargs="*", help="Padrão: FIIs do cache local + lista da Brapi")
+    p_backfill.add_argument("--db", default=DB_FILE)
+    p_backfill.add_argument("--lote", type=int, default=TICKERS_POR_LOTE)
+    p_backfill.add_argument("--paralelo", type=int, default=MAX_LOTES_PARALELOS)
+    args = parser.parse_args()
+
+    if yf is None: raise SystemExit("Instale o yfinance (pip install yfinance).")
+    tickers = args.tickers or universo_fiis(args.db)
+    if not tickers: raise SystemExit("Nenhum FII conhecido: rode o app uma vez ou defina BRAPI_API_KEY.")
+    BackfillHistoricoYF(args.db, args.lote, args.paralelo).executar(tickers, args.anos)
+
+if __name__ == "__main__":
+    main()
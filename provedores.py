@@ -0,0 +1,195 @@
+# --- CAMADA DE PROVEDORES DE DADOS (INTERFACE, REGISTRO E FAN-OUT CONCORRENTE) ---
+# Cada fonte (Brapi, Fundamentus, StatusInvest, Selenium, yfinance) vira um ProvedorDados
+# registrado por nome. buscar_em_paralelo() consulta vários ao mesmo tempo, fica com o mais
+# rápido que respondeu cada campo e completa as lacunas com os outros (fallback automático).
+
+import importlib
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Tuple, Optional, Type
+
+import pandas as pd
+
+# Nomes de campo padronizados (iguais às colunas da tabela 'fiis')
+CAMPOS_CONHECIDOS = ('Preco_Atual', 'Liquidez_Diaria', 'Var_Dia_Percent', 'Min_52_Semanas',
+                     'DY_12M', 'P_VP', 'Setor')
+
+# Módulos com provedores; importados sob demanda (cada um trata suas dependências opcionais)
+MODULOS_PROVEDORES = ('provedor_brapi', 'provedor_fundamentus', 'provedor_statusinvest',
+                      'provedor_selenium', 'provedor_yfinance')
+
+class ProvedorDados(ABC):
+    """
+    Interface de um provedor. 'buscar' devolve um DataFrame indexado por 'Ticker' com
+    (um subconjunto de) 'campos'. tickers=None pede o universo inteiro, quando o provedor souber.
+    """
+    nome: str = "base"
+    campos: Tuple[str, ...] = ()
+
+    def disponivel(self) -> bool:
+        """False se faltar dependência opcional (ex: selenium, yfinance)."""
+        return True
+
+    @abstractmethod
+    def buscar(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        ...
+
+REGISTRO_PROVEDORES: Dict[str, Type[ProvedorDados]] = {}
+
+def registrar_provedor(classe: Type[ProvedorDados]) -> Type[ProvedorDados]:
+    """Decorator: @registrar_provedor em cima da classe a deixa disponível por nome (só classes completas)."""
+    if inspect.isabstract(classe):
+        raise TypeError(f"Provedor '{classe.__name__}' não implementa: {', '.join(sorted(classe.__abstractmethods__))}")
+    REGISTRO_PROVEDORES[classe.nome] = classe
+    return classe
+
+def carregar_provedores() -> Dict[str, Type[ProvedorDados]]:
+    for modulo in MODULOS_PROVEDORES:
+        try: importlib.import_module(modulo)
+        except ImportError as e: print(f"[PROVEDORES] Módulo '{modulo}' indisponível: {e}")
+    return REGISTRO_PROVEDORES
+
+def criar_provedor(nome: str, **kwargs) -> ProvedorDados:
+    if nome not in REGISTRO_PROVEDORES: carregar_provedores()
+    if nome not in REGISTRO_PROVEDORES: raise KeyError(f"Provedor desconhecido: {nome}")
+    return REGISTRO_PROVEDORES[nome](**kwargs)
+
+def padronizar_df(linhas: List[Dict]) -> pd.DataFrame:
+    """Lista de dicts com 'Ticker' -> DataFrame indexado por Ticker (sem duplicatas)."""
+    if not linhas: return pd.DataFrame(index=pd.Index([], name='Ticker'))
+    df = pd.DataFrame(linhas).drop_duplicates(subset='Ticker', keep='last').set_index('Ticker')
+    return df
+
+class SaudeProvedores:
+    """Latência e falhas por provedor. Depois de 'max_falhas' seguidas o provedor fica de castigo."""
+
+    def __init__(self, janela: int = 20, max_falhas: int = 3, castigo_segundos: float = 300):
+        self.janela = janela
+        self.max_falhas = max_falhas
+        self.castigo_segundos = castigo_segundos
+        self._latencias: Dict[str, deque] = {}
+        self._falhas_seguidas: Dict[str, int] = {}
+        self._ultima_falha: Dict[str, float] = {}
+        self._ultimo_erro: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def registrar_sucesso(self, nome: str, segundos: float):
+        with self._lock:
+            self._latencias.setdefault(nome, deque(maxlen=self.janela)).append(segundos)
+            self._falhas_seguidas[nome] = 0
+
+    def registrar_falha(self, nome: str, erro: BaseException):
+        with self._lock:
+            self._falhas_seguidas[nome] = self._falhas_seguidas.get(nome, 0) + 1
+            self._ultima_falha[nome] = time.monotonic()
+            self._ultimo_erro[nome] = str(erro)
+
+    def saudavel(self, nome: str) -> bool:
+        with self._lock:
+            if self._falhas_seguidas.get(nome, 0) < self.max_falhas: return True
+            # Passado o castigo, ganha mais uma chance
+            return time.monotonic() - self._ultima_falha.get(nome, 0) > self.castigo_segundos
+
+    def latencia_media(self, nome: str) -> Optional[float]:
+        with self._lock:
+            amostras = self._latencias.get(nome)
+            return sum(amostras) / len(amostras) if amostras else None
+
+    def resumo(self) -> pd.DataFrame:
+        nomes = sorted(set(self._latencias) | set(self._falhas_seguidas))
+        return pd.DataFrame([{
+            'Provedor': n, 'Latencia_Media_s': self.latencia_media(n),
+            'Falhas_Seguidas': self._falhas_seguidas.get(n, 0), 'Saudavel': self.saudavel(n),
+            'Ultimo_Erro': self._ultimo_erro.get(n),
+        } for n in nomes])
+
+def buscar_em_paralelo(provedores: List[ProvedorDados], tickers: Optional[List[str]] = None,
+                       campos: Optional[List[str]] = None, timeout_segundos: float = 60,
+                       saude: Optional[SaudeProvedores] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Consulta os provedores saudáveis ao mesmo tempo. Cada campo/ticker fica com o valor do
+    primeiro provedor que respondeu (o mais rápido); os seguintes só preenchem lacunas.
+    Retorna (dados, fontes): 'fontes' tem o mesmo formato com o nome do provedor de cada valor.
+    Provedores que falham ou passam do timeout são ignorados (e registrados em 'saude').
+    """
+    saude = saude or SaudeProvedores()
+    campos = list(campos or CAMPOS_CONHECIDOS)
+    ativos = [p for p in provedores
+              if p.disponivel() and saude.saudavel(p.nome) and set(p.campos) & set(campos)]
+    dados = pd.DataFrame(index=pd.Index(tickers or [], name='Ticker'), columns=campos, dtype=object)
+    fontes = pd.DataFrame(index=dados.index, columns=campos, dtype=object)
+    if not ativos: return dados, fontes
+
+    def executar(provedor: ProvedorDados) -> Tuple[ProvedorDados, pd.DataFrame, float]:
+        inicio = time.monotonic()
+        return provedor, provedor.buscar(tickers), time.monotonic() - inicio
+
+    executor = ThreadPoolExecutor(max_workers=len(ativos), thread_name_prefix="provedores")
+    futuros = {executor.submit(executar, p): p for p in ativos}
+    try:
+        for futuro in as_completed(futuros, timeout=timeout_segundos):
+            provedor = futuros[futuro]
+            try: _, df, segundos = futuro.result()
+            except Exception as e:
+                saude.registrar_falha(provedor.nome, e); print(f"[PROVEDORES] {provedor.nome} falhou: {e}"); continue
+            saude.registrar_sucesso(provedor.nome, segundos)
+            print(f"[PROVEDORES] {provedor.nome}: {len(df)} tickers em {segundos:.2f}s.")
+
+            if tickers is None: # Universo aberto: cresce com o que os provedores trouxerem
+                novos = df.index.difference(dados.index)
+                dados = dados.reindex(dados.index.append(novos)); fontes = fontes.reindex(dados.index)
+            for campo in campos:
+                if campo not in df.columns: continue
+                valores = df[campo].reindex(dados.index)
+                lacunas = dados[campo].isna() & valores.notna()
+                dados.loc[lacunas, campo] = valores[lacunas]
+                fontes.loc[lacunas, campo] = provedor.nome
+
+            if tickers is not None and dados.notna().all().all(): break # Tudo preenchido: não espera os lentos
+    except FuturesTimeoutError:
+        for futuro, provedor in futuros.items():
+            if not futuro.done():
+                saude.registrar_falha(provedor.nome, TimeoutError(f"passou de {timeout_segundos}s"))
+                print(f"[PROVEDORES] {provedor.nome} passou do timeout de {timeout_segundos}s. Usando os outros.")
+    finally: executor.shutdown(wait=False, cancel_futures=True)
+
+    for campo in campos:
+        if campo != 'Setor': dados[campo] = pd.to_numeric(dados[campo], errors='coerce')
+    return dados, fontes
+
+def buscar_por_fonte(provedores: List[ProvedorDados], tickers: Optional[List[str]] = None,
+                     timeout_segundos: float = 60, saude: Optional[SaudeProvedores] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Consulta os provedores saudáveis ao mesmo tempo e devolve o DataFrame de cada um separado
+    ({nome: df}), sem misturar: é a entrada da reconciliação (reconciliacao.py).
+    """
+    saude = saude or SaudeProvedores()
+    ativos = [p for p in provedores if p.disponivel() and saude.saudavel(p.nome)]
+    if not ativos: return {}
+    resultados: Dict[str, pd.DataFrame] = {}
+
+    def executar(provedor: ProvedorDados) -> Tuple[pd.DataFrame, float]:
+        inicio = time.monotonic()
+        return provedor.buscar(tickers), time.monotonic() - inicio
+
+    executor = ThreadPoolExecutor(max_workers=len(ativos), thread_name_prefix="provedores")
+    futuros = {executor.submit(executar, p): p for p in ativos}
+    try:
+        for futuro in as_completed(futuros, timeout=timeout_segundos):
+            provedor = futuros[futuro]
+            try: df, segundos = futuro.result()
+            except Exception as e:
+                saude.registrar_falha(provedor.nome, e); print(f"[PROVEDORES] {provedor.nome} falhou: {e}"); continue
+            saude.registrar_sucesso(provedor.nome, segundos)
+            resultados[provedor.nome] = df if tickers is None else df[df.index.isin(tickers)]
+    except FuturesTimeoutError:
+        for futuro, provedor in futuros.items():
+            if not futuro.done():
+                saude.registrar_falha(provedor.nome, TimeoutError(f"passou de {timeout_segundos}s"))
+                print(f"[PROVEDORES] {provedor.nome} passou do timeout de {timeout_segundos}s.")
+    finally: executor.shutdown(wait=False, cancel_futures=True)
+    return resultados
@@ -0,0 +1,112 @@
+# --- RECONCILIAÇÃO CAMPO A CAMPO ENTRE FONTES (BRAPI, CVM, FUNDAMENTUS, STATUSINVEST...) ---
+# Cada campo vira uma matriz (tickers x fontes). Regras por campo decidem quem vale:
+#   - 'precedencia': ordem das fontes (a primeira válida vence) ou 'criterio': 'recencia';
+#   - 'idade_max_horas': valores mais velhos que isso não contam;
+#   - 'minimo': valores <= mínimo são lixo (P/VP 0, preço 0);
+#   - 'tolerancia': diferença relativa acima disso marca o campo como divergente;
+#   - 'maioria': com 3+ fontes, se o vencedor destoa da mediana e a maioria concorda entre si,
+#     vence a primeira fonte (na precedência) que concorda com a maioria.
+# Tudo com operações de matriz NumPy: o universo inteiro numa passada, sem laço por ticker.
+
+import sqlite3
+import warnings
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from banco import DB_FILE, conexoes, inicializar_db
+
+REGRAS_PADRAO: Dict[str, Dict] = {
+    'P_VP': {'precedencia': ('brapi', 'cvm', 'fundamentus', 'statusinvest', 'yfinance'),
+             'tolerancia': 0.05, 'idade_max_horas': 24 * 45, 'minimo': 0, 'maioria': True},
+    'DY_12M': {'precedencia': ('brapi', 'statusinvest', 'fundamentus', 'yfinance'),
+               'tolerancia': 0.15, 'idade_max_horas': 24 * 7, 'minimo': 0, 'maioria': False},
+    'Preco_Atual': {'precedencia': ('brapi', 'statusinvest', 'fundamentus', 'yfinance'),
+                    'tolerancia': 0.03, 'idade_max_horas': 24, 'minimo': 0, 'maioria': False},
+}
+
+Coleta = Union[pd.Timestamp, pd.Series] # Um instante para a fonte toda ou um por ticker
+
+def _idades_horas(coletado_em: Optional[Coleta], tickers: pd.Index, agora: pd.Timestamp) -> np.ndarray:
+    """Idade (h) de cada valor da fonte; NaN quando a data da coleta é desconhecida."""
+    if coletado_em is None: return np.full(len(tickers), np.nan)
+    if isinstance(coletado_em, pd.Series): datas = pd.to_datetime(coletado_em.reindex(tickers)).to_numpy()
+    else: datas = np.full(len(tickers), pd.Timestamp(coletado_em).to_datetime64())
+    return (agora.to_datetime64() - datas.astype('datetime64[ns]')) / np.timedelta64(1, 'h')
+
+def reconciliar(fontes: Dict[str, pd.DataFrame], coletado_em: Optional[Dict[str, Coleta]] = None,
+                regras: Optional[Dict[str, Dict]] = None, agora: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    'fontes' = {nome: DataFrame indexado por Ticker}. Retorna uma linha por ticker com, para cada
+    campo das regras: <campo>, <campo>_fonte, <campo>_divergencia (maior desvio relativo entre as
+    fontes válidas e o vencedor) e 'Campos_Divergentes' (campos acima da tolerância, separados por vírgula).
+    """
+    regras = regras or REGRAS_PADRAO
+    coletado_em = coletado_em or {}
+    agora = agora or pd.Timestamp.now()
+    tickers = pd.Index(sorted(set().union(*(df.index for df in fontes.values()))), name='Ticker')
+    saida = pd.DataFrame(index=tickers)
+    divergentes = np.full(len(tickers), '', dtype=object)
+
+    for campo, regra in regras.items():
+        com_campo = [n for n, df in fontes.items() if campo in df.columns]
+        nomes = [n for n in regra.get('precedencia', ()) if n in com_campo] + sorted(set(com_campo) - set(regra.get('precedencia', ())))
+        if not nomes: continue
+        tolerancia = regra.get('tolerancia', 0.05)
+
+        valores = np.column_stack([pd.to_numeric(fontes[n][campo], errors='coerce').reindex(tickers).to_numpy(dtype=float)
+                                   for n in nomes])
+        validos = ~np.isnan(valores)
+        if regra.get('minimo') is not None: validos &= valores > regra['minimo']
+        idades = np.column_stack([_idades_horas(coletado_em.get(n), tickers, agora) for n in nomes])
+        if regra.get('idade_max_horas') is not None: validos &= ~(idades > regra['idade_max_horas']) # Idade NaN conta como válida
+
+        # Vencedor: primeira fonte válida na precedência, ou a mais nova (empate -> precedência)
+        ordem = idades if regra.get('criterio') == 'recencia' else np.broadcast_to(np.arange(len(nomes), dtype=float), valores.shape)
+        ordem = np.where(validos, np.nan_to_num(ordem, nan=np.inf), np.inf)
+        vencedor = np.argmin(ordem, axis=1)
+        tem_valor = validos.any(axis=1)
+
+        considerados = np.where(validos, valores, np.nan)
+        linhas = np.arange(len(tickers))
+        with warnings.catch_warnings(): # Linhas sem nenhum valor válido geram 'All-NaN slice'
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if regra.get('maioria'):
+                mediana = np.nanmedian(considerados, axis=1)
+                concorda = np.abs(considerados - mediana[:, None]) <= tolerancia * np.abs(mediana[:, None])
+                n_concordam, n_validos = concorda.sum(axis=1), validos.sum(axis=1)
+                vencedor_destoa = ~concorda[linhas, vencedor]
+                trocar = vencedor_destoa & (n_validos >= 3) & (n_concordam * 2 > n_validos)
+                vencedor = np.where(trocar, np.argmax(concorda, axis=1), vencedor)
+
+            escolhido = considerados[linhas, vencedor]
+            divergencia = np.nanmax(np.abs(considerados - escolhido[:, None]) / np.abs(escolhido[:, None]), axis=1)
+
+        saida[campo] = np.where(tem_valor, escolhido, np.nan)
+        saida[f'{campo}_fonte'] = np.where(tem_valor, np.array(nomes, dtype=object)[vencedor], None)
+        saida[f'{campo}_divergencia'] = np.where(tem_valor, divergencia, np.nan)
+        divergentes = divergentes + np.where(divergencia > tolerancia, f'{campo},', '')
+
+    saida['Campos_Divergentes'] = pd.Series(divergentes, index=tickers).str.rstrip(',').replace('', None)
+    return saida
+
+def salvar_consolidado(consolidado: pd.DataFrame, db_file: str = DB_FILE) -> int:
+    """
+    Substitui o conteúdo de 'fiis_consolidado' (uma linha por ticker, com a fonte vencedora de cada
+    campo). A tabela vem das migrações (banco._v7_consolidado); campos fora dela são ignorados.
+    """
+    df = consolidado.reset_index()
+    inicializar_db(db_file)
+    with conexoes(db_file).escrita() as conn:
+        colunas = [c for _, c, *_ in conn.execute("PRAGMA table_info(fiis_consolidado)") if c in df.columns]
+        df = df[colunas]
+        # DELETE + INSERT na mesma transação: quem lê nunca vê a tabela pela metade
+        conn.execute("DELETE FROM fiis_consolidado")
+        conn.executemany(f"INSERT INTO fiis_consolidado ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                         df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    return len(df)
+
+def ler_fontes_consolidadas(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Fonte do P/VP e campos divergentes da última reconciliação (indexado por Ticker)."""
+    return pd.read_sql_query("SELECT Ticker, P_VP_fonte, Campos_Divergentes FROM fiis_consolidado", conn, index_col='Ticker')